@@ -22,6 +22,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -52,6 +53,36 @@ TEMPLATES = [
 WSGI_APPLICATION = 'config.wsgi.application'
 
 
+# ASGI
+# config.asgi runs requests on a pool of WORKERS threads once their body has
+# arrived; each thread keeps its own database connection
+# Set ASGI to override keys of core.asgi.ASGI_DEFAULTS
+
+
+# Database connections
+# Applied to every database not setting its own. Connections are reused
+# across requests for CONN_MAX_AGE seconds (None never closes them) and
+# pinged before reuse when CONN_HEALTH_CHECKS is on. Behind PgBouncer in
+# transaction pooling mode set DB_PGBOUNCER=1 to disable the server-side
+# cursors of QuerySet.iterator(); the recipe export pages by keyset instead
+
+DATABASE_CONNECTIONS = {
+    'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+    'CONN_HEALTH_CHECKS': os.environ.get('DB_CONN_HEALTH_CHECKS', '1') == '1',
+    'DISABLE_SERVER_SIDE_CURSORS': os.environ.get('DB_PGBOUNCER') == '1',
+}
+
+
+# Read replicas
+# Aliases in DATABASES that safe requests to the recipe API read from. A
+# user's reads stay on the primary for STICKY_SECONDS after they write, so
+# keep it above the replication lag. The sticky marks live in CACHE, which
+# must be shared by all processes once replicas are in use
+# Set READ_REPLICAS to override keys of core.replicas.READ_REPLICAS_DEFAULTS
+
+DATABASE_ROUTERS = ['core.replicas.ReplicaRouter']
+
+
 # Password validation
 
 AUTH_PASSWORD_VALIDATORS = [
@@ -98,3 +129,78 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 # Users
 
 AUTH_USER_MODEL = 'core.User'
+
+AUTHENTICATION_BACKENDS = ['user.backends.PooledModelBackend']
+
+
+# Password hashing
+# The first hasher hashes new passwords; logins with a hash from any other
+# listed hasher, or with other costs, are rehashed transparently. Install
+# argon2-cffi or bcrypt before moving their hasher to the top. Costs left
+# as None keep Django's defaults; WORKERS None sizes the pool to the CPUs
+# Set PASSWORD_HASHING to override keys of
+# user.hashers.PASSWORD_HASHING_DEFAULTS
+
+PASSWORD_HASHERS = [
+    'user.hashers.TunablePBKDF2PasswordHasher',
+    'user.hashers.TunableArgon2PasswordHasher',
+    'user.hashers.TunableBCryptSHA256PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+]
+
+
+# Token authentication cache
+# SHARED_CACHE names an alias in CACHES to share tokens across processes
+# Set TOKEN_AUTH_CACHE to override keys of
+# user.authentication.TOKEN_AUTH_CACHE_DEFAULTS
+
+
+# Token expiry
+# Tokens stop authenticating TTL seconds after they are issued; clients get
+# an HMAC signed credential carrying the expiry. SIGNED_ONLY rejects bare
+# keys issued before signing. Run purge_tokens to delete expired rows
+# Set TOKEN_EXPIRY to override keys of
+# user.authentication.TOKEN_EXPIRY_DEFAULTS
+
+
+# Recipe image processing
+# Uploads are queued as RecipeImageJob rows and processed by a thread pool
+# Set IMAGE_PROCESSING to override keys of
+# recipe.images.IMAGE_PROCESSING_DEFAULTS
+
+
+# Recipe response cache
+# Versions and responses must live in a cache shared by every process
+# (e.g. Memcached or Redis) for invalidation to reach all of them
+# Set RESPONSE_CACHE to override keys of recipe.cache.RESPONSE_CACHE_DEFAULTS
+
+
+# Delta sync
+# The change feed holds back entries for SETTLE_SECONDS so a transaction
+# that took its sync token id earlier but commits later is never skipped.
+# Keep it above the longest write transaction and the clock skew between
+# app servers
+# Set SYNC to override keys of recipe.changes.SYNC_DEFAULTS
+
+
+# Recipe stats
+# /api/recipe/recipes/stats/ histograms cooking times into buckets ending
+# at each of TIME_BUCKETS minutes, plus one for anything longer. CACHE
+# serves it through the response cache above
+# Set RECIPE_STATS to override keys of recipe.stats.RECIPE_STATS_DEFAULTS
+
+
+# Tag and ingredient autocomplete
+# Each process keeps the sorted titles of its CACHED_USERS most recently
+# active users in memory for as-you-type lookups, invalidated through the
+# response cache versions, so RESPONSE_CACHE must be shared by every
+# process when there are several. 0 sends every lookup to the database's
+# title prefix index instead
+# Set AUTOCOMPLETE to override keys of
+# recipe.autocomplete.AUTOCOMPLETE_DEFAULTS
+
+
+# Request metrics
+# Per-view timings are served to staff at /api/metrics/; requests slower
+# than SLOW_REQUEST_MS log their SQL to the core.middleware logger
+# Set REQUEST_METRICS to override keys of core.metrics.REQUEST_METRICS_DEFAULTS
@@ -6,6 +6,8 @@ DEBUG = True
 
 ALLOWED_HOSTS = []
 
+REQUEST_METRICS = {'SERVER_TIMING': True}
+
 # Travis Setup
 if 'TRAVIS' in os.environ:
     DATABASES = {
@@ -30,5 +32,7 @@ else:
             }
         }
 
-
-
+DATABASES = {
+    alias: {**DATABASE_CONNECTIONS, **database}
+    for alias, database in DATABASES.items()
+}
@@ -5,3 +5,8 @@ from config.settings.local import *
 DEBUG = False
 
 ALLOWED_HOSTS = []
+
+DATABASES = {
+    alias: {**DATABASE_CONNECTIONS, **database}
+    for alias, database in DATABASES.items()
+}
@@ -0,0 +1,165 @@
+import asyncio
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.wsgi import get_wsgi_application
+
+from core.conf import feature_settings
+
+
+ASGI_DEFAULTS = {
+    'WORKERS': 32,
+}
+
+
+def asgi_settings():
+    '''Return the ASGI settings merged over the defaults'''
+    return feature_settings('ASGI', ASGI_DEFAULTS)
+
+
+class WSGIToASGI:
+
+    '''Serve a WSGI application to an ASGI server from a thread pool
+
+    The event loop receives each request body, spooling large uploads
+    to disk, before a thread is taken, so slow clients and idle
+    keep-alive connections cost no thread. The application then runs
+    on one pool thread for the whole response, iteration and close()
+    included, because Django's database connections belong to the
+    thread that opened them and streamed responses such as the export
+    query between chunks. Chunks are handed back to the loop as they
+    are produced and the thread waits for each send, so streamed
+    responses keep their backpressure.
+    '''
+
+    def __init__(self, wsgi_application, workers):
+        self.wsgi_application = wsgi_application
+        self.executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix='asgi'
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            raise ValueError(f'Unsupported ASGI scope type {scope["type"]}')
+
+        body = await self.read_body(receive)
+        if body is None:
+            return
+        loop = asyncio.get_event_loop()
+        try:
+            await loop.run_in_executor(
+                self.executor, self.run, self.environ(scope, body), send, loop
+            )
+        finally:
+            body.close()
+
+    async def lifespan(self, receive, send):
+        '''Acknowledge start up and shut the pool down with the server'''
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=True)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def read_body(self, receive):
+        '''Return the request body as a file, or None on disconnect'''
+        body = tempfile.SpooledTemporaryFile(
+            max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE
+        )
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                body.close()
+                return None
+            body.write(message.get('body', b''))
+            if not message.get('more_body', False):
+                break
+        body.seek(0)
+        return body
+
+    def environ(self, scope, body):
+        '''Return the WSGI environ of an ASGI http scope'''
+        server = scope.get('server') or ('localhost', 80)
+        client = scope.get('client') or ('', 0)
+        environ = {
+            'REQUEST_METHOD': scope['method'],
+            'SCRIPT_NAME': scope.get('root_path', '').encode().decode(
+                'latin1'
+            ),
+            'PATH_INFO': scope['path'].encode().decode('latin1'),
+            'QUERY_STRING': scope.get('query_string', b'').decode('latin1'),
+            'SERVER_NAME': server[0],
+            'SERVER_PORT': str(server[1]),
+            'SERVER_PROTOCOL': f'HTTP/{scope.get("http_version", "1.1")}',
+            'REMOTE_ADDR': client[0],
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': scope.get('scheme', 'http'),
+            'wsgi.input': body,
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': True,
+            'wsgi.run_once': False,
+        }
+        for name, value in scope.get('headers', []):
+            name = name.decode('latin1').upper().replace('-', '_')
+            if name not in ('CONTENT_LENGTH', 'CONTENT_TYPE'):
+                name = f'HTTP_{name}'
+            value = value.decode('latin1')
+            if name in environ:
+                value = f'{environ[name]},{value}'
+            environ[name] = value
+        return environ
+
+    def run(self, environ, send, loop):
+        '''Call the application on a pool thread and send its response'''
+        def send_message(message):
+            asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+        start = {}
+
+        def start_response(status, headers, exc_info=None):
+            start['message'] = {
+                'type': 'http.response.start',
+                'status': int(status.split(' ', 1)[0]),
+                'headers': [
+                    (name.lower().encode('latin1'), value.encode('latin1'))
+                    for name, value in headers
+                ],
+            }
+
+        def send_start():
+            if 'message' in start:
+                send_message(start.pop('message'))
+
+        iterable = self.wsgi_application(environ, start_response)
+        try:
+            for chunk in iterable:
+                if chunk:
+                    send_start()
+                    send_message({
+                        'type': 'http.response.body',
+                        'body': chunk,
+                        'more_body': True,
+                    })
+            send_start()
+            send_message({'type': 'http.response.body', 'body': b''})
+        finally:
+            close = getattr(iterable, 'close', None)
+            if close is not None:
+                close()
+
+
+def get_asgi_application():
+    '''Return the project served over ASGI, for Django before 3.0
+
+    Django only ships an ASGI handler, and async views, from 3.0 on.
+    '''
+    return WSGIToASGI(get_wsgi_application(), asgi_settings()['WORKERS'])
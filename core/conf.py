@@ -0,0 +1,10 @@
+from django.conf import settings
+
+
+def feature_settings(name, defaults):
+    '''Return the settings dict called name merged over defaults
+
+    Each feature keeps its defaults next to the code reading them, so
+    settings files and override_settings only set the keys they change.
+    '''
+    return {**defaults, **getattr(settings, name, {})}
@@ -0,0 +1,19 @@
+from django.db import connections
+
+
+def check_connections():
+    '''Close persistent connections that stopped working before reuse
+
+    Django 2 only tests a reused connection after a query on it failed,
+    so a connection dropped by the server, a pooler or a firewall while
+    idle would fail the first query of the next request. Databases with
+    CONN_HEALTH_CHECKS set are pinged instead, and a dead connection is
+    closed so the request opens a fresh one. Connections not opened yet
+    are left alone.
+    '''
+    for connection in connections.all():
+        if (connection.connection is not None and
+                connection.settings_dict.get('CONN_HEALTH_CHECKS') and
+                not connection.in_atomic_block and
+                not connection.is_usable()):
+            connection.close()
@@ -0,0 +1,131 @@
+import bisect
+import threading
+import time
+from collections import Counter
+
+from core.conf import feature_settings
+
+
+REQUEST_METRICS_DEFAULTS = {
+    'ENABLED': True,
+    'SERVER_TIMING': False,
+    'SLOW_REQUEST_MS': 1000,
+    'TIME_BUCKETS_MS': (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000),
+    'QUERY_BUCKETS': (0, 1, 2, 5, 10, 20, 50, 100),
+}
+
+
+def request_metrics_settings():
+    '''Return the request metrics settings merged over the defaults'''
+    return feature_settings('REQUEST_METRICS', REQUEST_METRICS_DEFAULTS)
+
+
+class QueryTimer:
+
+    '''Database execute wrapper counting and timing a request's queries'''
+
+    def __init__(self):
+        self.count = 0
+        self.duration_ms = 0.0
+        self.statements = []
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = (time.perf_counter() - start) * 1000
+            self.count += 1
+            self.duration_ms += elapsed
+            self.statements.append((elapsed, sql))
+
+
+class Histogram:
+
+    '''Counts of observations per upper bound, as cumulative buckets'''
+
+    def __init__(self, bounds):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def snapshot(self):
+        '''Return count, sum and cumulative counts keyed by upper bound'''
+        buckets = {}
+        running = 0
+        for bound, count in zip(self.bounds + ('+Inf',), self.counts):
+            running += count
+            buckets[str(bound)] = running
+        return {
+            'count': self.count,
+            'sum': round(self.sum, 3),
+            'buckets': buckets,
+        }
+
+
+class MetricsRegistry:
+
+    '''Per-view histograms of wall time, DB time and query count
+
+    Plus named event counters, such as the response cache's hits and
+    misses, kept under the same lock.
+    '''
+
+    def __init__(self):
+        self._views = {}
+        self._counters = Counter()
+        self._lock = threading.Lock()
+
+    def _histograms(self, view):
+        if view not in self._views:
+            config = request_metrics_settings()
+            self._views[view] = {
+                'duration_ms': Histogram(config['TIME_BUCKETS_MS']),
+                'db_ms': Histogram(config['TIME_BUCKETS_MS']),
+                'queries': Histogram(config['QUERY_BUCKETS']),
+            }
+        return self._views[view]
+
+    def record(self, view, duration_ms, db_ms, queries):
+        '''Add one request's measurements to its view's histograms'''
+        with self._lock:
+            histograms = self._histograms(view)
+            histograms['duration_ms'].observe(duration_ms)
+            histograms['db_ms'].observe(db_ms)
+            histograms['queries'].observe(queries)
+
+    def increment(self, name):
+        '''Count one occurrence of a named event'''
+        with self._lock:
+            self._counters[name] += 1
+
+    def counters(self):
+        '''Return every event counter by name'''
+        with self._lock:
+            return dict(sorted(self._counters.items()))
+
+    def snapshot(self):
+        '''Return every view's histograms as plain data'''
+        with self._lock:
+            return {
+                view: {
+                    name: histogram.snapshot()
+                    for name, histogram in histograms.items()
+                }
+                for view, histograms in sorted(self._views.items())
+            }
+
+    def reset(self):
+        '''Forget every measurement and count'''
+        with self._lock:
+            self._views.clear()
+            self._counters.clear()
+
+
+registry = MetricsRegistry()
@@ -0,0 +1,70 @@
+import logging
+import time
+from contextlib import ExitStack
+
+from django.db import connections
+
+from core.metrics import QueryTimer, registry, request_metrics_settings
+
+
+logger = logging.getLogger(__name__)
+
+
+class RequestMetricsMiddleware:
+
+    '''Time each request and its queries, per view
+
+    Every connection gets an execute wrapper for the duration of the
+    request, so query count and DB time are exact. Measurements go to
+    core.metrics.registry, keyed by method and url name. With
+    SERVER_TIMING on they are also sent as a Server-Timing header, and
+    requests slower than SLOW_REQUEST_MS log their SQL. Queries run
+    while a streaming response is consumed happen after the middleware
+    returns and aren't counted.
+    '''
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        config = request_metrics_settings()
+        if not config['ENABLED']:
+            return self.get_response(request)
+
+        timer = QueryTimer()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(timer))
+            response = self.get_response(request)
+        duration_ms = (time.perf_counter() - start) * 1000
+
+        view = self.view_name(request)
+        registry.record(view, duration_ms, timer.duration_ms, timer.count)
+
+        if config['SERVER_TIMING']:
+            response['Server-Timing'] = (
+                f'total;dur={duration_ms:.1f}, '
+                f'db;dur={timer.duration_ms:.1f};desc="{timer.count} queries"'
+            )
+        if duration_ms >= config['SLOW_REQUEST_MS']:
+            self.log_slow_request(view, request, duration_ms, timer)
+        return response
+
+    def view_name(self, request):
+        '''Return the method and url name a request was routed to'''
+        match = getattr(request, 'resolver_match', None)
+        name = match.view_name if match is not None else 'unresolved'
+        return f'{request.method} {name}'
+
+    def log_slow_request(self, view, request, duration_ms, timer):
+        '''Log a slow request with each of its queries, slowest first'''
+        statements = '\n'.join(
+            f'  {elapsed:8.1f} ms  {sql}'
+            for elapsed, sql in sorted(timer.statements, reverse=True)
+        )
+        logger.warning(
+            'Slow request %s %s (%s): %.1f ms, %d queries, %.1f ms in DB\n%s',
+            request.method, request.get_full_path(), view, duration_ms,
+            timer.count, timer.duration_ms, statements
+        )
@@ -0,0 +1,51 @@
+# Generated by Django 2.2.28 on 2026-10-17 04:22
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def log_existing_objects(apps, schema_editor):
+    '''Give every existing object an entry so a first sync returns it'''
+    ChangeLogEntry = apps.get_model('core', 'ChangeLogEntry')
+    for model_name in ('tag', 'ingredient', 'recipe'):
+        model = apps.get_model('core', model_name)
+        rows = model.objects.order_by('id').values_list('id', 'user_id')
+        ChangeLogEntry.objects.bulk_create(
+            ChangeLogEntry(
+                user_id=user_id,
+                model=model_name,
+                object_id=object_id,
+                action='upsert',
+            )
+            for object_id, user_id in rows.iterator()
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeLogEntry',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(max_length=20)),
+                ('object_id', models.IntegerField()),
+                ('action', models.CharField(choices=[('upsert', 'Created or updated'), ('delete', 'Deleted')], max_length=10)),
+                ('user', models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='changelogentry',
+            index=models.Index(fields=['user', 'id'], name='core_change_user_id_ce4e15_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='changelogentry',
+            index=models.Index(fields=['model', 'object_id'], name='core_change_model_af38b3_idx'),
+        ),
+        migrations.RunPython(log_existing_objects, migrations.RunPython.noop),
+    ]
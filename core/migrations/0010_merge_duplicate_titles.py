@@ -0,0 +1,69 @@
+# Generated by Django 2.2.28 on 2026-10-17 04:36
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def merge_duplicate_titles(apps, schema_editor):
+    '''Fold tags and ingredients sharing a user and title into the oldest
+
+    Recipes using a duplicate are moved over to the kept object, touched
+    and logged, and the duplicates are logged as deleted, so syncing
+    clients pick up the merge.
+    '''
+    Recipe = apps.get_model('core', 'Recipe')
+    ChangeLogEntry = apps.get_model('core', 'ChangeLogEntry')
+    for model_name, relation in (('tag', 'tags'),
+                                 ('ingredient', 'ingredients')):
+        model = apps.get_model('core', model_name)
+        through = Recipe._meta.get_field(relation).remote_field.through
+        column = f'{model_name}_id'
+        groups = model.objects.order_by().values('user_id', 'title').annotate(
+            keep=models.Min('id'), copies=models.Count('id')
+        ).filter(copies__gt=1)
+
+        for group in list(groups):
+            ids = list(model.objects.filter(
+                user_id=group['user_id'], title=group['title']
+            ).exclude(id=group['keep']).values_list('id', flat=True))
+            recipe_ids = set(through.objects.filter(**{
+                f'{column}__in': ids
+            }).values_list('recipe_id', flat=True))
+            linked = set(through.objects.filter(**{
+                column: group['keep'], 'recipe_id__in': recipe_ids
+            }).values_list('recipe_id', flat=True))
+
+            through.objects.bulk_create(
+                through(recipe_id=recipe_id, **{column: group['keep']})
+                for recipe_id in recipe_ids - linked
+            )
+            model.objects.filter(id__in=ids).delete()
+            Recipe.objects.filter(id__in=recipe_ids).update(
+                updated_at=timezone.now()
+            )
+
+            ChangeLogEntry.objects.filter(
+                model=model_name, object_id__in=ids
+            ).delete()
+            ChangeLogEntry.objects.filter(
+                model='recipe', object_id__in=recipe_ids
+            ).delete()
+            ChangeLogEntry.objects.bulk_create(
+                [ChangeLogEntry(user_id=group['user_id'], model=model_name,
+                                object_id=object_id, action='delete')
+                 for object_id in ids] +
+                [ChangeLogEntry(user_id=group['user_id'], model='recipe',
+                                object_id=recipe_id, action='upsert')
+                 for recipe_id in sorted(recipe_ids)]
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_change_log'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_titles, migrations.RunPython.noop),
+    ]
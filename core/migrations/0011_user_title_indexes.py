@@ -0,0 +1,32 @@
+# Generated by Django 2.2.28 on 2026-10-17 04:36
+
+from django.db import migrations, models
+
+
+# The duplicates are merged by 0010 in its own transaction: on PostgreSQL
+# the constraint can't be added in one with pending trigger events from
+# those deletes.
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_merge_duplicate_titles'),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='ingredient',
+            unique_together={('user', 'title')},
+        ),
+        migrations.AlterUniqueTogether(
+            name='tag',
+            unique_together={('user', 'title')},
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['user', 'id'], name='core_recipe_user_id_bf8313_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['user', 'title'], name='core_recipe_user_id_2eeb26_idx'),
+        ),
+    ]
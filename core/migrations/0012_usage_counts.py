@@ -0,0 +1,51 @@
+# Generated by Django 2.2.28 on 2026-10-17 04:51
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def count_usage(apps, schema_editor):
+    '''Set each tag and ingredient's counter from its recipe links'''
+    Recipe = apps.get_model('core', 'Recipe')
+    for model_name, relation in (('tag', 'tags'),
+                                 ('ingredient', 'ingredients')):
+        model = apps.get_model('core', model_name)
+        through = Recipe._meta.get_field(relation).remote_field.through
+        column = f'{model_name}_id'
+        count = through.objects.filter(
+            **{column: models.OuterRef('pk')}
+        ).order_by().values(column).annotate(
+            count=models.Count('pk')
+        ).values('count')
+        model.objects.update(usage_count=Coalesce(
+            models.Subquery(count, output_field=models.IntegerField()), 0
+        ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_user_title_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ingredient',
+            name='usage_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='tag',
+            name='usage_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(count_usage, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='ingredient',
+            index=models.Index(fields=['user', 'usage_count', 'title'], name='core_ingred_user_id_1e465d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tag',
+            index=models.Index(fields=['user', 'usage_count', 'title'], name='core_tag_user_id_63e77f_idx'),
+        ),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 2.2.28 on 2026-10-17 05:20
+
+from django.db import migrations
+
+
+TABLES = ('core_tag', 'core_ingredient')
+
+# Case-insensitive prefix lookups (title__istartswith) compile to
+# UPPER(title::text) LIKE UPPER(%s) on PostgreSQL and to a LIKE, which
+# ignores ASCII case, on SQLite. Each needs its own kind of index to turn
+# the prefix into a range scan within one user's rows.
+PREFIX_INDEXES = {
+    'postgresql': (
+        'CREATE INDEX {table}_title_prefix_idx '
+        'ON {table} (user_id, (UPPER(title::text)) text_pattern_ops);'
+    ),
+    'sqlite': (
+        'CREATE INDEX {table}_title_prefix_idx '
+        'ON {table} (user_id, title COLLATE NOCASE);'
+    ),
+}
+
+
+def create_prefix_indexes(apps, schema_editor):
+    sql = PREFIX_INDEXES.get(schema_editor.connection.vendor)
+    if sql is not None:
+        for table in TABLES:
+            schema_editor.execute(sql.format(table=table))
+
+
+def drop_prefix_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor in PREFIX_INDEXES:
+        for table in TABLES:
+            schema_editor.execute(f'DROP INDEX {table}_title_prefix_idx;')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_usage_counts'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_prefix_indexes, drop_prefix_indexes),
+    ]
@@ -16,6 +16,22 @@ def recipe_image_file_path(instance, filename):
     return os.path.join('uploads/recipe/', filename)
 
 
+def recipe_image_variant_file_path(instance, filename):
+    '''Generate file path with unique-identifier-name for image variants'''
+    ext = filename.split('.')[-1]
+    filename = f'{uuid.uuid4()}.{ext}'
+
+    return os.path.join('uploads/recipe/variants/', filename)
+
+
+def recipe_image_job_file_path(instance, filename):
+    '''Generate file path for raw uploads waiting to be processed'''
+    ext = filename.split('.')[-1]
+    filename = f'{uuid.uuid4()}.{ext}'
+
+    return os.path.join('uploads/pending/', filename)
+
+
 class UserManager(BaseUserManager):
 
     def create_user(self, email, password, **extra_fields):
@@ -61,6 +77,15 @@ class Tag(models.Model):
         on_delete=models.CASCADE,
     )
     title = models.CharField(max_length=30)
+    updated_at = models.DateTimeField(auto_now=True)
+    usage_count = models.PositiveIntegerField(default=0, editable=False)
+
+    class Meta:
+        unique_together = ('user', 'title')
+        indexes = [
+            models.Index(fields=['user', 'updated_at']),
+            models.Index(fields=['user', 'usage_count', 'title']),
+        ]
 
     def __str__(self):
         return self.title
@@ -74,6 +99,15 @@ class Ingredient(models.Model):
         on_delete=models.CASCADE,
     )
     title = models.CharField(max_length=50)
+    updated_at = models.DateTimeField(auto_now=True)
+    usage_count = models.PositiveIntegerField(default=0, editable=False)
+
+    class Meta:
+        unique_together = ('user', 'title')
+        indexes = [
+            models.Index(fields=['user', 'updated_at']),
+            models.Index(fields=['user', 'usage_count', 'title']),
+        ]
 
     def __str__(self):
         return self.title
@@ -93,6 +127,113 @@ class Recipe(models.Model):
     ingredients = models.ManyToManyField('Ingredient')
     tags = models.ManyToManyField('Tag')
     image = models.ImageField(upload_to=recipe_image_file_path, null=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'id']),
+            models.Index(fields=['user', 'title']),
+            models.Index(fields=['user', 'updated_at']),
+        ]
 
     def __str__(self):
         return self.title
+
+
+class RecipeImageVariant(models.Model):
+
+    '''Resized, re-encoded copy of a recipe image'''
+    recipe = models.ForeignKey(
+        'Recipe',
+        on_delete=models.CASCADE,
+        related_name='image_variants',
+    )
+    name = models.CharField(max_length=30)
+    format = models.CharField(max_length=10)
+    image = models.ImageField(
+        upload_to=recipe_image_variant_file_path,
+        width_field='width',
+        height_field='height',
+    )
+    width = models.PositiveIntegerField()
+    height = models.PositiveIntegerField()
+
+    class Meta:
+        unique_together = ('recipe', 'name', 'format')
+
+    def __str__(self):
+        return f'{self.recipe} ({self.name}, {self.format})'
+
+
+class RecipeImageJob(models.Model):
+
+    '''Queued processing of an uploaded recipe image'''
+    PENDING = 'pending'
+    PROCESSING = 'processing'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (PENDING, 'Pending'),
+        (PROCESSING, 'Processing'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    )
+
+    recipe = models.ForeignKey(
+        'Recipe',
+        on_delete=models.CASCADE,
+        related_name='image_jobs',
+    )
+    source = models.FileField(upload_to=recipe_image_job_file_path)
+    status = models.CharField(
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default=PENDING,
+        db_index=True,
+    )
+    error = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'{self.recipe} image job ({self.status})'
+
+
+class ChangeLogEntry(models.Model):
+
+    '''Latest change to one of a user's recipes, tags or ingredients
+
+    The auto-incrementing id is the sync token. Ids are handed out on
+    insert, not on commit, so the feed only serves entries older than
+    a settle window (see recipe.changes). Only the newest entry per
+    object is kept, so the log holds one row per live object plus a
+    tombstone per deleted one. The user is a bare reference so
+    tombstones written while a user's rows cascade away can't violate
+    a constraint; they are cleared once the user is gone.
+    '''
+    UPSERT = 'upsert'
+    DELETE = 'delete'
+    ACTION_CHOICES = (
+        (UPSERT, 'Created or updated'),
+        (DELETE, 'Deleted'),
+    )
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='+',
+    )
+    model = models.CharField(max_length=20)
+    object_id = models.IntegerField()
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'id']),
+            models.Index(fields=['model', 'object_id']),
+        ]
+
+    def __str__(self):
+        return f'{self.action} {self.model} {self.object_id}'
@@ -0,0 +1,113 @@
+import random
+import threading
+
+from django.core.cache import caches
+
+from rest_framework.permissions import SAFE_METHODS
+
+from core.conf import feature_settings
+
+
+READ_REPLICAS_DEFAULTS = {
+    'DATABASES': [],
+    'STICKY_SECONDS': 10,
+    'CACHE': 'default',
+}
+
+_local = threading.local()
+
+
+def read_replicas_settings():
+    '''Return the read replica settings merged over the defaults'''
+    return feature_settings('READ_REPLICAS', READ_REPLICAS_DEFAULTS)
+
+
+def sticky_key(user_id):
+    return f'read-replicas:sticky:{user_id}'
+
+
+def mark_written(user_id):
+    '''Pin a user's reads to the primary for the sticky window'''
+    options = read_replicas_settings()
+    caches[options['CACHE']].set(
+        sticky_key(user_id), True, options['STICKY_SECONDS']
+    )
+
+
+def recently_wrote(user_id):
+    '''Return whether a user wrote within the sticky window'''
+    cache = caches[read_replicas_settings()['CACHE']]
+    return cache.get(sticky_key(user_id)) is not None
+
+
+def current_replica():
+    '''Return the replica this thread's reads go to, or None'''
+    return getattr(_local, 'alias', None)
+
+
+def pick_replica(user_id):
+    '''Return a replica for a user's reads, or None to use the primary'''
+    replicas = read_replicas_settings()['DATABASES']
+    if not replicas or recently_wrote(user_id):
+        return None
+    return random.choice(replicas)
+
+
+class ReplicaRouter:
+
+    '''Send reads to the replica picked for the current request
+
+    Outside a view using ReplicaReadMixin no replica is picked and
+    everything goes to the primary, so management commands, signal
+    handlers and background workers always see their own writes.
+    Replicas are never migrated; they get their schema from the primary.
+    '''
+
+    def db_for_read(self, model, **hints):
+        return current_replica()
+
+    def db_for_write(self, model, **hints):
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        '''Replicas hold the same rows, so relations may cross them'''
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in read_replicas_settings()['DATABASES']:
+            return False
+        return None
+
+
+class ReplicaReadMixin:
+
+    '''Read from a replica on safe requests, unless the user just wrote
+
+    The replica is picked once authentication has run, so token lookups
+    stay on the primary, and one replica serves the whole request. Every
+    unsafe request marks its user sticky, both before the view writes
+    and after it returns, so the user's reads stay on the primary until
+    STICKY_SECONDS after the write finishes. The window should cover the
+    replication lag.
+    '''
+
+    writer_id = None
+
+    def initial(self, request, *args, **kwargs):
+        '''Authenticate, then choose where this request reads from'''
+        super().initial(request, *args, **kwargs)
+        if not request.user.is_authenticated:
+            return
+        if request.method in SAFE_METHODS:
+            _local.alias = pick_replica(request.user.pk)
+        else:
+            self.writer_id = request.user.pk
+            mark_written(self.writer_id)
+
+    def dispatch(self, request, *args, **kwargs):
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            _local.alias = None
+            if self.writer_id is not None:
+                mark_written(self.writer_id)
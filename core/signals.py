@@ -0,0 +1,10 @@
+from django.core.signals import request_started
+from django.dispatch import receiver
+
+from core.db import check_connections
+
+
+@receiver(request_started)
+def request_started_check_connections(sender, **kwargs):
+    '''Make sure a reused database connection still works'''
+    check_connections()
@@ -0,0 +1,161 @@
+import asyncio
+import json
+import threading
+
+from django.test import SimpleTestCase
+from django.urls import reverse
+
+from core.asgi import WSGIToASGI, get_asgi_application
+
+
+def http_scope(method='GET', path='/', query_string=b'', headers=()):
+    return {
+        'type': 'http',
+        'http_version': '1.1',
+        'method': method,
+        'scheme': 'http',
+        'path': path,
+        'query_string': query_string,
+        'headers': list(headers),
+        'server': ('testserver', 80),
+        'client': ('127.0.0.1', 5000),
+    }
+
+
+def call(application, scope, messages=({'type': 'http.request'},)):
+    '''Run an ASGI application to completion, return what it sent'''
+    received = list(messages)
+    sent = []
+
+    async def receive():
+        return received.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    loop = asyncio.new_event_loop()
+    try:
+        loop.run_until_complete(application(scope, receive, send))
+    finally:
+        loop.close()
+    return sent
+
+
+class EchoApplication:
+
+    '''WSGI app answering with its environ, in several chunks'''
+
+    def __init__(self):
+        self.threads = []
+        self.called = False
+
+    def __call__(self, environ, start_response):
+        self.called = True
+        self.threads.append(threading.current_thread())
+        start_response('201 Created', [('Content-Type', 'application/json'),
+                                       ('X-Echo', 'yes')])
+        keys = ('REQUEST_METHOD', 'PATH_INFO', 'QUERY_STRING',
+                'CONTENT_TYPE', 'HTTP_X_TRACE', 'SERVER_NAME')
+        echo = {key: environ.get(key) for key in keys}
+        echo['body'] = environ['wsgi.input'].read().decode()
+        return self.Body([json.dumps(echo).encode(), b'', b'\n'], self)
+
+    class Body(list):
+
+        def __init__(self, chunks, application):
+            super().__init__(chunks)
+            self.application = application
+
+        def close(self):
+            self.application.threads.append(threading.current_thread())
+
+
+class WSGIToASGITest(SimpleTestCase):
+
+    '''Test the ASGI adapter translates requests and responses'''
+
+    def setUp(self):
+        self.wsgi = EchoApplication()
+        self.application = WSGIToASGI(self.wsgi, workers=2)
+
+    def test_request_translated_to_environ(self):
+        '''Test method, path, headers and a chunked body reach the app'''
+        sent = call(
+            self.application,
+            http_scope('POST', '/api/recipe/tags/', b'page_size=2', [
+                (b'content-type', b'application/json'),
+                (b'x-trace', b'a'), (b'x-trace', b'b'),
+            ]),
+            [{'type': 'http.request', 'body': b'{"title": ',
+              'more_body': True},
+             {'type': 'http.request', 'body': b'"Vegan"}'}]
+        )
+
+        echo = json.loads(sent[1]['body'])
+        self.assertEqual(echo, {
+            'REQUEST_METHOD': 'POST',
+            'PATH_INFO': '/api/recipe/tags/',
+            'QUERY_STRING': 'page_size=2',
+            'CONTENT_TYPE': 'application/json',
+            'HTTP_X_TRACE': 'a,b',
+            'SERVER_NAME': 'testserver',
+            'body': '{"title": "Vegan"}',
+        })
+
+    def test_response_streamed_in_chunks(self):
+        '''Test status, headers and every non-empty chunk are sent'''
+        sent = call(self.application, http_scope())
+
+        self.assertEqual(sent[0]['type'], 'http.response.start')
+        self.assertEqual(sent[0]['status'], 201)
+        self.assertIn((b'x-echo', b'yes'), sent[0]['headers'])
+        self.assertEqual(
+            [message.get('more_body') for message in sent[1:]],
+            [True, True, None]
+        )
+        self.assertEqual(sent[-1]['body'], b'')
+
+    def test_one_pool_thread_per_request(self):
+        '''Test the app and its close() run on the same pool thread'''
+        call(self.application, http_scope())
+
+        called, closed = self.wsgi.threads
+        self.assertIs(called, closed)
+        self.assertTrue(called.name.startswith('asgi'))
+
+    def test_disconnect_before_body(self):
+        '''Test a client leaving mid-upload never reaches the app'''
+        sent = call(self.application, http_scope('POST'), [
+            {'type': 'http.request', 'body': b'part', 'more_body': True},
+            {'type': 'http.disconnect'},
+        ])
+
+        self.assertEqual(sent, [])
+        self.assertFalse(self.wsgi.called)
+
+    def test_lifespan(self):
+        '''Test start up and shut down are acknowledged'''
+        sent = call(self.application, {'type': 'lifespan'}, [
+            {'type': 'lifespan.startup'},
+            {'type': 'lifespan.shutdown'},
+        ])
+
+        self.assertEqual([message['type'] for message in sent], [
+            'lifespan.startup.complete', 'lifespan.shutdown.complete'
+        ])
+
+
+class ProjectASGITest(SimpleTestCase):
+
+    '''Test the project answers through its ASGI entry point'''
+
+    def test_api_served(self):
+        '''Test a recipe API request runs through the Django stack'''
+        sent = call(
+            get_asgi_application(),
+            http_scope(path=reverse('recipe:tag-list'))
+        )
+
+        self.assertEqual(sent[0]['status'], 401)
+        body = b''.join(message.get('body', b'') for message in sent[1:])
+        self.assertIn('detail', json.loads(body))
@@ -0,0 +1,30 @@
+from django.test import SimpleTestCase, override_settings
+
+from core.conf import feature_settings
+
+
+DEFAULTS = {'TTL': 60, 'MAX_SIZE': 100}
+
+
+class FeatureSettingsTest(SimpleTestCase):
+
+    '''Test feature settings are merged over their defaults'''
+
+    def test_defaults_when_unset(self):
+        '''Test the defaults apply when the setting is missing'''
+        self.assertEqual(feature_settings('FEATURE', DEFAULTS), DEFAULTS)
+
+    @override_settings(FEATURE={'TTL': 5, 'EXTRA': True})
+    def test_keys_override_defaults(self):
+        '''Test only the keys set replace their defaults'''
+        self.assertEqual(
+            feature_settings('FEATURE', DEFAULTS),
+            {'TTL': 5, 'MAX_SIZE': 100, 'EXTRA': True}
+        )
+
+    @override_settings(FEATURE={'TTL': 5})
+    def test_defaults_not_modified(self):
+        '''Test merging leaves the defaults dict untouched'''
+        feature_settings('FEATURE', DEFAULTS)
+
+        self.assertEqual(DEFAULTS, {'TTL': 60, 'MAX_SIZE': 100})
@@ -0,0 +1,57 @@
+from unittest.mock import patch
+
+from django.db import connection
+from django.test import TestCase
+from django.urls import reverse
+
+from core.db import check_connections
+
+
+class ConnectionHealthCheckTest(TestCase):
+
+    '''Test dead persistent connections are closed before reuse'''
+
+    def setUp(self):
+        connection.ensure_connection()
+        health_checks = patch.dict(
+            connection.settings_dict, {'CONN_HEALTH_CHECKS': True}
+        )
+        '''The test transaction must survive, so act as if outside it'''
+        outside_transaction = patch.object(
+            connection, 'in_atomic_block', False
+        )
+        close = patch.object(connection, 'close')
+        for patcher in (health_checks, outside_transaction, close):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.close = connection.close
+
+    def test_dead_connection_closed(self):
+        '''Test a connection failing its ping is closed'''
+        with patch.object(connection, 'is_usable', return_value=False):
+            check_connections()
+
+        self.close.assert_called_once_with()
+
+    def test_live_connection_kept(self):
+        '''Test a working connection is reused'''
+        with patch.object(connection, 'is_usable', return_value=True):
+            check_connections()
+
+        self.close.assert_not_called()
+
+    def test_health_checks_disabled(self):
+        '''Test connections aren't pinged without CONN_HEALTH_CHECKS'''
+        connection.settings_dict['CONN_HEALTH_CHECKS'] = False
+
+        with patch.object(connection, 'is_usable') as is_usable:
+            check_connections()
+
+        is_usable.assert_not_called()
+
+    def test_checked_when_request_starts(self):
+        '''Test every request checks the connections first'''
+        with patch('core.signals.check_connections') as check:
+            self.client.get(reverse('recipe:tag-list'))
+
+        check.assert_called_once_with()
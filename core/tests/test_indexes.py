@@ -0,0 +1,91 @@
+from unittest import skipUnless
+
+from django.db import connection
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+
+from core.models import ChangeLogEntry, Tag, Ingredient, Recipe
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Needs PostgreSQL plans')
+class PerUserIndexTest(TestCase):
+
+    '''Test the hot per-user queries are answered from an index
+
+    Sequential scans are disabled so the planner picks an index whenever
+    one can serve the query; a Seq Scan in the plan means none can.
+    '''
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'testuser@company.com',
+            'Test1234'
+        )
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+
+    def assertIndexScan(self, queryset, sorted_by_index=False):
+        '''Assert queryset is planned as an index scan'''
+        plan = queryset.explain()
+        self.assertIn('Index', plan)
+        self.assertNotIn('Seq Scan', plan)
+        if sorted_by_index:
+            self.assertNotIn('Sort', plan)
+
+    def test_title_listings(self):
+        '''Test tag and ingredient listings read the (user, title) index'''
+        for model in (Tag, Ingredient):
+            self.assertIndexScan(
+                model.objects.filter(user=self.user).order_by('-title')[:101],
+                sorted_by_index=True
+            )
+
+    def test_title_lookup(self):
+        '''Test checking a title is taken reads the (user, title) index'''
+        for model in (Tag, Ingredient, Recipe):
+            self.assertIndexScan(
+                model.objects.filter(user=self.user, title='Vegan')
+            )
+
+    def test_recipe_listing(self):
+        '''Test the newest-first recipe listing reads the (user, id) index'''
+        self.assertIndexScan(
+            Recipe.objects.filter(user=self.user).order_by('-id')[:101],
+            sorted_by_index=True
+        )
+
+    def test_modified_since(self):
+        '''Test modified_since filters read the (user, updated_at) index'''
+        for model in (Tag, Ingredient, Recipe):
+            self.assertIndexScan(
+                model.objects.filter(
+                    user=self.user, updated_at__gte='2020-01-01T00:00Z'
+                )
+            )
+
+    def test_change_feed(self):
+        '''Test the sync feed reads the (user, id) change log index'''
+        self.assertIndexScan(
+            ChangeLogEntry.objects.filter(
+                user=self.user, id__gt=0
+            ).order_by('id')[:501],
+            sorted_by_index=True
+        )
+
+
+@skipUnless(connection.vendor in ('postgresql', 'sqlite'),
+            'Needs a title prefix index')
+class TitlePrefixIndexTest(TestCase):
+
+    '''Test autocomplete lookups are range scans of the prefix index'''
+
+    def test_title_prefix(self):
+        '''Test case-insensitive title prefixes read the prefix index'''
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+        for model in (Tag, Ingredient):
+            plan = model.objects.filter(
+                user_id=1, title__istartswith='ve'
+            ).explain()
+            self.assertIn(f'{model._meta.db_table}_title_prefix_idx', plan)
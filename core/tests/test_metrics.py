@@ -0,0 +1,145 @@
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.metrics import Histogram, registry
+
+
+METRICS_URL = reverse('metrics')
+TAGS_URL = reverse('recipe:tag-list')
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+class HistogramTest(TestCase):
+
+    '''Test histogram bucketing'''
+
+    def test_cumulative_buckets(self):
+        '''Test observations land in cumulative upper-bound buckets'''
+        histogram = Histogram((10, 100))
+        for value in (1, 10, 50, 500):
+            histogram.observe(value)
+
+        snapshot = histogram.snapshot()
+
+        self.assertEqual(snapshot['count'], 4)
+        self.assertEqual(snapshot['sum'], 561)
+        self.assertEqual(snapshot['buckets'],
+                         {'10': 2, '100': 3, '+Inf': 4})
+
+
+class RequestMetricsMiddlewareTest(TestCase):
+
+    '''Test per-request timing and query instrumentation'''
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'testuser@company.com',
+            'Test1234'
+        )
+        self.client.force_authenticate(self.user)
+        registry.reset()
+
+    def test_request_recorded_per_view(self):
+        '''Test a request adds to its view's histograms'''
+        self.client.get(TAGS_URL)
+        self.client.get(TAGS_URL, {'assigned_only': 1})
+
+        metrics = registry.snapshot()['GET recipe:tag-list']
+
+        self.assertEqual(metrics['duration_ms']['count'], 2)
+        self.assertEqual(metrics['queries']['count'], 2)
+        self.assertGreater(metrics['queries']['sum'], 0)
+
+    @override_settings(REQUEST_METRICS={'SERVER_TIMING': True})
+    def test_server_timing_header(self):
+        '''Test Server-Timing reports total and DB time when enabled'''
+        response = self.client.get(TAGS_URL)
+
+        self.assertRegex(
+            response['Server-Timing'],
+            r'^total;dur=[\d.]+, db;dur=[\d.]+;desc="\d+ queries"$'
+        )
+
+    @override_settings(REQUEST_METRICS={'SERVER_TIMING': False})
+    def test_server_timing_header_disabled(self):
+        '''Test no Server-Timing header is sent when disabled'''
+        response = self.client.get(TAGS_URL)
+
+        self.assertFalse(response.has_header('Server-Timing'))
+
+    @override_settings(REQUEST_METRICS={'SLOW_REQUEST_MS': 0})
+    def test_slow_request_logs_sql(self):
+        '''Test requests over the threshold log their SQL'''
+        with self.assertLogs('core.middleware', 'WARNING') as logs:
+            self.client.get(TAGS_URL)
+
+        self.assertIn('recipe:tag-list', logs.output[0])
+        self.assertIn('SELECT', logs.output[0])
+
+    @override_settings(REQUEST_METRICS={'ENABLED': False})
+    def test_disabled(self):
+        '''Test nothing is recorded when metrics are disabled'''
+        self.client.get(TAGS_URL)
+
+        self.assertEqual(registry.snapshot(), {})
+
+
+class MetricsApiTest(TestCase):
+
+    '''Test the metrics endpoint'''
+
+    def setUp(self):
+        self.client = APIClient()
+        registry.reset()
+
+    def test_staff_required(self):
+        '''Test regular users can't read metrics'''
+        user = get_user_model().objects.create_user(
+            'testuser@company.com',
+            'Test1234'
+        )
+        self.client.force_authenticate(user)
+
+        response = self.client.get(METRICS_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_staff_reads_and_resets_metrics(self):
+        '''Test staff can read and reset the histograms'''
+        admin = get_user_model().objects.create_superuser(
+            'testadmin@company.com',
+            'Test1234'
+        )
+        self.client.force_authenticate(admin)
+        self.client.get(TAGS_URL)
+
+        response = self.client.get(METRICS_URL)
+        self.client.delete(METRICS_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('GET recipe:tag-list', response.data['views'])
+        self.assertNotIn('GET recipe:tag-list', registry.snapshot())
+
+    def test_response_cache_counters_reported(self):
+        '''Test the response cache's hits and misses are listed'''
+        admin = get_user_model().objects.create_superuser(
+            'testadmin@company.com',
+            'Test1234'
+        )
+        self.client.force_authenticate(admin)
+        self.client.get(RECIPES_URL)
+        self.client.get(RECIPES_URL)
+
+        response = self.client.get(METRICS_URL)
+        self.client.delete(METRICS_URL)
+
+        self.assertEqual(response.data['counters'], {
+            'response_cache.hit': 1,
+            'response_cache.miss': 1,
+        })
+        self.assertEqual(registry.counters(), {})
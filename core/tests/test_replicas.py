@@ -0,0 +1,106 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.models import Tag
+from core.replicas import ReplicaRouter, current_replica
+
+from user.authentication import token_cache
+
+
+TAGS_URL = reverse('recipe:tag-list')
+
+
+@override_settings(READ_REPLICAS={'DATABASES': ['default']})
+class ReplicaRoutingTest(TestCase):
+
+    '''Test safe requests read from a replica unless the user just wrote
+
+    The default database doubles as the replica, so the test transaction
+    is visible either way; what is checked is where each query was sent.
+    '''
+
+    def setUp(self):
+        cache.clear()
+        token_cache.clear()
+        self.user = get_user_model().objects.create_user(
+            'testuser@company.com',
+            'Test1234'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        Tag.objects.create(user=self.user, title='Vegan')
+
+    def routed(self, method, url, data=None, **kwargs):
+        '''Return the replica in effect for each query of a request'''
+        seen = []
+
+        def record(execute, sql, params, many, context):
+            seen.append(current_replica())
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(record):
+            getattr(self.client, method)(url, data, **kwargs)
+        return seen
+
+    def test_reads_go_to_replica(self):
+        '''Test a list request reads from the replica'''
+        self.assertEqual(set(self.routed('get', TAGS_URL)), {'default'})
+
+    def test_reads_after_write_stay_on_primary(self):
+        '''Test a user's reads are sticky to the primary after a write'''
+        self.routed('post', TAGS_URL, {'title': 'Dessert'})
+
+        self.assertEqual(
+            set(self.routed('get', TAGS_URL, {'fresh': 1})), {None}
+        )
+
+    def test_reads_return_to_replica_after_window(self):
+        '''Test reads use the replica again once the window has passed'''
+        self.routed('post', TAGS_URL, {'title': 'Dessert'})
+        cache.clear()
+
+        self.assertEqual(
+            set(self.routed('get', TAGS_URL, {'fresh': 1})), {'default'}
+        )
+
+    def test_stickiness_is_per_user(self):
+        '''Test one user's write doesn't pin another user to the primary'''
+        self.routed('post', TAGS_URL, {'title': 'Dessert'})
+        other = get_user_model().objects.create_user(
+            'other@company.com',
+            'Test1234'
+        )
+        self.client.force_authenticate(other)
+
+        self.assertEqual(set(self.routed('get', TAGS_URL)), {'default'})
+
+    def test_authentication_reads_primary(self):
+        '''Test the token lookup happens before a replica is picked'''
+        token = Token.objects.create(user=self.user)
+        self.client.force_authenticate(None)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+        seen = self.routed('get', TAGS_URL)
+
+        self.assertIsNone(seen[0])
+        self.assertEqual(seen[-1], 'default')
+
+    def test_state_cleared_after_request(self):
+        '''Test queries outside a request go to the primary'''
+        self.routed('get', TAGS_URL)
+
+        self.assertIsNone(current_replica())
+
+    def test_replicas_not_migrated(self):
+        '''Test migrations only run against the primary'''
+        router = ReplicaRouter()
+
+        self.assertFalse(router.allow_migrate('default', 'core'))
+        with self.settings(READ_REPLICAS={'DATABASES': []}):
+            self.assertIsNone(router.allow_migrate('default', 'core'))
@@ -0,0 +1,27 @@
+from rest_framework import status
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from core.metrics import registry
+
+from user.authentication import CachedTokenAuthentication
+
+
+class MetricsView(APIView):
+
+    '''Per-view request histograms and event counters, for staff only'''
+    authentication_classes = (CachedTokenAuthentication,)
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request):
+        '''Return the metrics collected since start up or last reset'''
+        return Response({
+            'views': registry.snapshot(),
+            'counters': registry.counters(),
+        })
+
+    def delete(self, request):
+        '''Reset the histograms and counters'''
+        registry.reset()
+        return Response(status=status.HTTP_204_NO_CONTENT)
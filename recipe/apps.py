@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class RecipeConfig(AppConfig):
     name = 'recipe'
+
+    def ready(self):
+        '''Register the search index update handlers'''
+        import recipe.signals  # noqa: F401
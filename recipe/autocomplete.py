@@ -0,0 +1,121 @@
+import bisect
+import threading
+from collections import OrderedDict
+
+from django.db.models.functions import Upper
+
+from core.conf import feature_settings
+
+from recipe import cache
+
+
+AUTOCOMPLETE_DEFAULTS = {
+    'LIMIT': 10,
+    'MAX_LIMIT': 50,
+    'CACHED_USERS': 1000,
+}
+
+
+def autocomplete_settings():
+    '''Return the autocomplete settings merged over the defaults'''
+    return feature_settings('AUTOCOMPLETE', AUTOCOMPLETE_DEFAULTS)
+
+
+class TitleIndex:
+
+    '''One user's tag or ingredient titles, sorted ignoring case
+
+    Entries are sorted by upper-cased title, then id, the order query()
+    reads from the database, so both return the same suggestions.
+    Titles starting with a prefix are adjacent in the sorted list, so a
+    lookup is a binary search for the first of them followed by a slice.
+    '''
+
+    def __init__(self, rows):
+        entries = sorted((title.upper(), pk, title) for pk, title in rows)
+        self.keys = [key for key, _, _ in entries]
+        self.entries = [
+            {'id': pk, 'title': title} for _, pk, title in entries
+        ]
+
+    def search(self, prefix, limit):
+        '''Return up to limit entries whose title starts with prefix'''
+        prefix = prefix.upper()
+        start = bisect.bisect_left(self.keys, prefix)
+        end = min(start + limit, len(self.keys))
+        return [
+            self.entries[i] for i in range(start, end)
+            if self.keys[i].startswith(prefix)
+        ]
+
+
+class TitleIndexCache:
+
+    '''Least recently used TitleIndexes of this process
+
+    Each index is stored with the user's response cache version, which
+    every write to their recipes, tags or ingredients bumps, so an
+    index loaded before a write is never served after it. That only
+    holds across processes when the RESPONSE_CACHE alias is shared by
+    all of them; with a per-process cache such as the default LocMem
+    one, another process's writes go unseen until its index is evicted.
+    '''
+
+    def __init__(self):
+        self._indexes = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, version):
+        '''Return the index stored under key for version, or None'''
+        with self._lock:
+            found = self._indexes.get(key)
+            if found is None or found[0] != version:
+                return None
+            self._indexes.move_to_end(key)
+            return found[1]
+
+    def put(self, key, version, index, size):
+        '''Store an index, evicting the least recently used past size'''
+        with self._lock:
+            self._indexes[key] = (version, index)
+            self._indexes.move_to_end(key)
+            while len(self._indexes) > size:
+                self._indexes.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._indexes.clear()
+
+
+indexes = TitleIndexCache()
+
+
+def query(model, user_id, prefix, limit):
+    '''Return titles starting with prefix, read through the prefix index'''
+    return list(model.objects.filter(
+        user_id=user_id, title__istartswith=prefix
+    ).order_by(Upper('title'), 'id').values('id', 'title')[:limit])
+
+
+def suggest(model, user_id, prefix, limit):
+    '''Return up to limit of a user's titles starting with prefix
+
+    The first lookup for a user loads all of their titles, one indexed
+    query, into an in-memory TitleIndex, and the following keystrokes
+    are answered from it. The index is only invalidated everywhere
+    when RESPONSE_CACHE is a shared cache; with CACHED_USERS set to 0
+    every lookup queries the database instead.
+    '''
+    size = autocomplete_settings()['CACHED_USERS']
+    if not size:
+        return query(model, user_id, prefix, limit)
+
+    key = (model._meta.label_lower, user_id)
+    version = cache.get_version(user_id)
+    index = indexes.get(key, version)
+    if index is None:
+        index = TitleIndex(
+            model.objects.filter(user_id=user_id).values_list('id', 'title')
+        )
+        indexes.put(key, version, index, size)
+    return index.search(prefix, limit)
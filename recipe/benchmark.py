@@ -0,0 +1,338 @@
+import io
+import json
+import math
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from PIL import Image
+
+from rest_framework.test import APIClient
+
+
+'''Latency growth always tolerated, sub-millisecond timings are noise'''
+LATENCY_SLACK_MS = 1.0
+
+
+def percentile(values, pct):
+    '''Return the nearest-rank percentile of a list of numbers'''
+    ordered = sorted(values)
+    rank = max(math.ceil(pct / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+def allowed_host():
+    '''Return a host name the running settings accept
+
+    An empty ALLOWED_HOSTS accepts localhost while DEBUG is on.
+    '''
+    for host in settings.ALLOWED_HOSTS:
+        host = host.lstrip('.')
+        if host and host != '*':
+            return host
+    return 'localhost'
+
+
+def sample_png():
+    '''Return a small PNG file for upload scenarios'''
+    image = io.BytesIO()
+    Image.new('RGB', (64, 64), (200, 80, 40)).save(image, 'PNG')
+    image.seek(0)
+    image.name = 'bench.png'
+    return image
+
+
+class TestClientTransport:
+
+    '''Send requests in-process through DRF's test client
+
+    Runs the full middleware, authentication and view stack without a
+    socket, and counts the queries each request makes.
+    '''
+    counts_queries = True
+
+    def __init__(self, token):
+        self.client = APIClient(SERVER_NAME=allowed_host())
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token}')
+
+    def request(self, method, path, data=None, multipart=False):
+        '''Return the status code and query count of one request'''
+        send = getattr(self.client, method.lower())
+        kwargs = {} if multipart else {'format': 'json'}
+        with CaptureQueriesContext(connection) as queries:
+            response = send(path, data, **kwargs)
+            if response.streaming:
+                b''.join(response.streaming_content)
+        return response.status_code, len(queries)
+
+
+class ServerTransport:
+
+    '''Send requests over HTTP to a running server
+
+    Query counts can't be seen from outside the server, so they are
+    reported as None. Connections refused, reset or timed out under load
+    count as errors, with status 599.
+    '''
+    counts_queries = False
+    timeout = 60
+
+    def __init__(self, base_url, token):
+        self.base_url = base_url.rstrip('/')
+        self.token = token
+
+    def request(self, method, path, data=None, multipart=False):
+        '''Return the status code of one request, and no query count'''
+        headers = {'Authorization': f'Token {self.token}'}
+        body = None
+        if multipart:
+            boundary = 'bench-boundary'
+            body = self._multipart(data, boundary)
+            headers['Content-Type'] = (
+                f'multipart/form-data; boundary={boundary}'
+            )
+        elif data is not None:
+            body = json.dumps(data).encode('utf-8')
+            headers['Content-Type'] = 'application/json'
+
+        request = urllib.request.Request(
+            self.base_url + path, data=body, headers=headers, method=method
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) \
+                    as response:
+                response.read()
+                return response.status, None
+        except urllib.error.HTTPError as error:
+            return error.code, None
+        except (urllib.error.URLError, OSError):
+            return 599, None
+
+    def _multipart(self, data, boundary):
+        '''Encode a dict of file objects as a multipart body'''
+        parts = []
+        for name, upload in data.items():
+            upload.seek(0)
+            parts.append(
+                f'--{boundary}\r\n'
+                f'Content-Disposition: form-data; name="{name}"; '
+                f'filename="{upload.name}"\r\n'
+                'Content-Type: application/octet-stream\r\n\r\n'.encode()
+                + upload.read() + b'\r\n'
+            )
+        return b''.join(parts) + f'--{boundary}--\r\n'.encode()
+
+
+class Scenario:
+
+    '''One endpoint call, parametrised by the iteration number
+
+    `build(context, i)` returns the path and request body for the i-th
+    call; context holds the seeded ids and credentials.
+    '''
+
+    def __init__(self, name, method, build, multipart=False):
+        self.name = name
+        self.method = method
+        self.build = build
+        self.multipart = multipart
+
+
+def recipe_payload(context, i):
+    '''Return a recipe body using a few of the seeded relations'''
+    return {
+        'title': f'Bench recipe {i}',
+        'time_minutes': 10,
+        'price': '5.00',
+        'tags': context['tag_ids'][:3],
+        'ingredients': context['ingredient_ids'][:5],
+    }
+
+
+def detail(name, context, i):
+    '''Return the detail url of a seeded object chosen by iteration'''
+    ids = context['recipe_ids']
+    return reverse(name, args=[ids[i % context['read_ids']]])
+
+
+def take(context, count):
+    '''Remove and return recipe ids reserved for destructive scenarios'''
+    ids = context['recipe_ids']
+    if len(ids) - count < context['read_ids']:
+        raise ValueError('Seed more recipes to cover the delete scenarios.')
+    return [ids.pop() for _ in range(count)]
+
+
+SCENARIOS = (
+    Scenario('user.create', 'POST', lambda c, i: (
+        reverse('user:create'),
+        {'email': f'bench{c["run"]}-{i}@company.com',
+         'password': 'bench1234', 'name': 'Bench'}
+    )),
+    Scenario('user.token', 'POST', lambda c, i: (
+        reverse('user:token'),
+        {'email': c['email'], 'password': c['password']}
+    )),
+    Scenario('user.me', 'GET', lambda c, i: (reverse('user:me'), None)),
+    Scenario('user.me.update', 'PATCH', lambda c, i: (
+        reverse('user:me'), {'name': f'Bench {i}'}
+    )),
+    Scenario('tags.list', 'GET', lambda c, i: (
+        reverse('recipe:tag-list'), None
+    )),
+    Scenario('tags.list.assigned', 'GET', lambda c, i: (
+        reverse('recipe:tag-list') + '?assigned_only=1', None
+    )),
+    Scenario('tags.autocomplete', 'GET', lambda c, i: (
+        reverse('recipe:tag-autocomplete') + f'?prefix=tag+{i % 10}', None
+    )),
+    Scenario('tags.create', 'POST', lambda c, i: (
+        reverse('recipe:tag-list'), {'title': f'Bench tag {i}'}
+    )),
+    Scenario('tags.bulk', 'POST', lambda c, i: (
+        reverse('recipe:tag-bulk'),
+        [{'title': f'Bench tag {i}-{n}'} for n in range(10)]
+    )),
+    Scenario('ingredients.list', 'GET', lambda c, i: (
+        reverse('recipe:ingredient-list'), None
+    )),
+    Scenario('ingredients.create', 'POST', lambda c, i: (
+        reverse('recipe:ingredient-list'),
+        {'title': f'Bench ingredient {i}'}
+    )),
+    Scenario('ingredients.bulk', 'POST', lambda c, i: (
+        reverse('recipe:ingredient-bulk'),
+        [{'title': f'Bench ingredient {i}-{n}'} for n in range(10)]
+    )),
+    Scenario('recipes.list', 'GET', lambda c, i: (
+        reverse('recipe:recipe-list'), None
+    )),
+    Scenario('recipes.list.tags', 'GET', lambda c, i: (
+        reverse('recipe:recipe-list') + '?tags=' +
+        ','.join(str(pk) for pk in c['tag_ids'][:3]), None
+    )),
+    Scenario('recipes.list.tags.all', 'GET', lambda c, i: (
+        reverse('recipe:recipe-list') + '?match=all&tags=' +
+        ','.join(str(pk) for pk in c['tag_ids'][:2]), None
+    )),
+    Scenario('recipes.search', 'GET', lambda c, i: (
+        reverse('recipe:recipe-list') + f'?search=Recipe+{i}', None
+    )),
+    Scenario('recipes.stats', 'GET', lambda c, i: (
+        reverse('recipe:recipe-stats'), None
+    )),
+    Scenario('recipes.detail', 'GET', lambda c, i: (
+        detail('recipe:recipe-detail', c, i), None
+    )),
+    Scenario('recipes.create', 'POST', lambda c, i: (
+        reverse('recipe:recipe-list'), recipe_payload(c, i)
+    )),
+    Scenario('recipes.update', 'PATCH', lambda c, i: (
+        detail('recipe:recipe-detail', c, i), {'title': f'Renamed {i}'}
+    )),
+    Scenario('recipes.delete', 'DELETE', lambda c, i: (
+        reverse('recipe:recipe-detail', args=take(c, 1)), None
+    )),
+    Scenario('recipes.bulk.create', 'POST', lambda c, i: (
+        reverse('recipe:recipe-bulk'),
+        [recipe_payload(c, f'{i}-{n}') for n in range(10)]
+    )),
+    Scenario('recipes.bulk.update', 'PATCH', lambda c, i: (
+        reverse('recipe:recipe-bulk'),
+        [
+            {'id': pk, 'price': '6.00'}
+            for pk in c['recipe_ids'][i * 10 % c['read_ids']:][:10]
+        ]
+    )),
+    Scenario('recipes.bulk.delete', 'DELETE', lambda c, i: (
+        reverse('recipe:recipe-bulk'), {'ids': take(c, 10)}
+    )),
+    Scenario('recipes.upload_image', 'POST', lambda c, i: (
+        detail('recipe:recipe-upload-image', c, i),
+        {'image': sample_png()}
+    ), multipart=True),
+    Scenario('recipes.export', 'GET', lambda c, i: (
+        reverse('recipe:recipe-export'), None
+    )),
+    Scenario('recipes.sync', 'GET', lambda c, i: (
+        reverse('recipe:sync'), None
+    )),
+)
+
+
+def run_scenario(transport, scenario, context, iterations, warmup=0,
+                 before_request=None, concurrency=1):
+    '''Call one scenario repeatedly and summarise its latency and queries
+
+    With concurrency above 1 the timed calls are spread over that many
+    client threads, so rps shows how many requests the server completes
+    in parallel and latency includes any time spent queued there.
+    '''
+    def call(i):
+        path, data = scenario.build(context, i)
+        if before_request is not None:
+            before_request()
+        start = time.perf_counter()
+        status_code, query_count = transport.request(
+            scenario.method, path, data, scenario.multipart
+        )
+        return (time.perf_counter() - start) * 1000, status_code, query_count
+
+    for i in range(warmup):
+        call(i)
+
+    started = time.perf_counter()
+    timed = range(warmup, warmup + iterations)
+    if concurrency > 1:
+        with ThreadPoolExecutor(max_workers=concurrency) as clients:
+            calls = list(clients.map(call, timed))
+    else:
+        calls = [call(i) for i in timed]
+    total = time.perf_counter() - started
+
+    latencies = [elapsed for elapsed, _, _ in calls]
+    queries = [count for _, _, count in calls if count is not None]
+    errors = sum(status_code >= 400 for _, status_code, _ in calls)
+
+    return {
+        'p50_ms': round(percentile(latencies, 50), 2),
+        'p99_ms': round(percentile(latencies, 99), 2),
+        'rps': round(iterations / total, 1),
+        'queries': max(queries) if queries else None,
+        'errors': errors,
+    }
+
+
+def compare(results, baseline, tolerance):
+    '''Return regressions of results against a baseline, as messages
+
+    More queries per request than the baseline is always a regression.
+    Latency is judged on p50, as p99 of a short run is its slowest call,
+    and only counts when it grows by more than `tolerance`, a fraction,
+    plus LATENCY_SLACK_MS, since timings vary between runs and machines.
+    '''
+    regressions = []
+    for name, result in results.items():
+        expected = baseline.get(name)
+        if expected is None:
+            continue
+        if (result['queries'] is not None and
+                expected.get('queries') is not None and
+                result['queries'] > expected['queries']):
+            regressions.append(
+                f'{name}: {result["queries"]} queries per request, '
+                f'baseline {expected["queries"]}'
+            )
+        limit = expected['p50_ms'] * (1 + tolerance) + LATENCY_SLACK_MS
+        if result['p50_ms'] > limit:
+            regressions.append(
+                f'{name}: p50 {result["p50_ms"]} ms, '
+                f'baseline {expected["p50_ms"]} ms'
+            )
+    return regressions
@@ -0,0 +1,376 @@
+from django.db import transaction
+from django.db.models import prefetch_related_objects
+
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+from recipe.titles import get_or_create_titles
+
+
+INVALID_ID = {'id': ['A valid integer is required.']}
+
+
+def is_id(value):
+    '''Return whether a JSON value can be an object id
+
+    Booleans are ints to Python but never ids, and lists or objects
+    can't be looked up at all.
+    '''
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def save_new(model, user, instances):
+    '''bulk_create a user's instances and make sure each has its pk set
+
+    PostgreSQL returns the new ids from the INSERT. SQLite can't, but
+    holds the write lock until the transaction ends and hands out
+    increasing ids, so the user's newest rows are exactly these.
+    '''
+    model.objects.bulk_create(instances)
+    if instances and instances[0].pk is None:
+        ids = model.objects.filter(user=user).order_by('-id').values_list(
+            'id', flat=True
+        )[:len(instances)]
+        for instance, pk in zip(instances, reversed(ids)):
+            instance.pk = pk
+
+
+def update_many(queryset, instances, fields):
+    '''bulk_update fields of many instances, stamping auto_now fields
+
+    bulk_update skips pre_save, so auto_now fields such as updated_at
+    are stamped here and always written, as a save() would, and
+    relation-only changes still move them.
+    '''
+    auto_now = [
+        field for field in queryset.model._meta.concrete_fields
+        if getattr(field, 'auto_now', False)
+    ]
+    for field in auto_now:
+        for instance in instances:
+            field.pre_save(instance, add=False)
+    fields = list(fields) + [field.name for field in auto_now]
+    if instances and fields:
+        queryset.bulk_update(instances, fields)
+
+
+class BulkModelMixin:
+
+    '''Batch create, update and delete of the viewset's objects
+
+    POST, PATCH and DELETE on the `bulk/` route take a list of objects
+    (or of ids for DELETE), validate every item, check referenced
+    relations with one query per relation and write everything with
+    bulk queries in one transaction. The response lists a result per
+    item, in request order.
+    '''
+    bulk_max_items = 1000
+    bulk_relations = ()
+    bulk_unique_fields = ()
+    bulk_title_fields = {}
+
+    @action(methods=['POST', 'PATCH', 'DELETE'], detail=False,
+            url_path='bulk')
+    def bulk(self, request):
+        '''Dispatch a bulk request to the handler for its method'''
+        handlers = {
+            'POST': self.bulk_create,
+            'PATCH': self.bulk_update,
+            'DELETE': self.bulk_destroy,
+        }
+        return handlers[request.method](request)
+
+    def get_bulk_serializer_class(self):
+        '''Return the serializer used to validate each bulk item'''
+        return getattr(self, 'bulk_serializer_class', self.serializer_class)
+
+    def get_bulk_queryset(self):
+        '''Return the objects bulk updates and deletes may touch'''
+        return self.queryset.model.objects.filter(user=self.request.user)
+
+    def bulk_written(self, instances):
+        '''Hook called inside the transaction after instances are saved'''
+
+    def bulk_relations_written(self, name, ids):
+        '''Hook called with the related ids a relation gained or lost'''
+
+    def perform_bulk_destroy(self, queryset, ids):
+        '''Delete the matched objects, whose ids are given'''
+        queryset.delete()
+
+    def _bulk_items(self, data):
+        '''Check the request body is a list of a permitted length'''
+        if not isinstance(data, list):
+            raise ValidationError({'detail': 'Expected a list of items.'})
+        if len(data) > self.bulk_max_items:
+            raise ValidationError({
+                'detail': f'At most {self.bulk_max_items} items per request.'
+            })
+        return data
+
+    def _validate_relations(self, valid, results):
+        '''Reject items referring to related objects the user doesn't own'''
+        model = self.queryset.model
+        for name in self.bulk_relations:
+            related_model = model._meta.get_field(name).related_model
+            wanted = {
+                pk for _, serializer in valid
+                for pk in serializer.validated_data.get(name, ())
+            }
+            existing = set(
+                related_model.objects.filter(
+                    user=self.request.user, pk__in=wanted
+                ).values_list('pk', flat=True)
+            )
+
+            for index, serializer in list(valid):
+                missing = [
+                    pk for pk in serializer.validated_data.get(name, ())
+                    if pk not in existing
+                ]
+                if missing:
+                    results[index] = {
+                        'status': status.HTTP_400_BAD_REQUEST,
+                        'errors': {name: [
+                            f'Invalid pk "{pk}" - object does not exist.'
+                            for pk in missing
+                        ]},
+                    }
+                    valid.remove((index, serializer))
+
+    def _validate_unique(self, valid, results):
+        '''Reject items taking a value unique among the user's objects
+
+        Values are checked against the user's objects with one query per
+        field and against earlier items of the same request.
+        '''
+        model = self.queryset.model
+        for name in self.bulk_unique_fields:
+            wanted = {
+                serializer.validated_data[name] for _, serializer in valid
+                if name in serializer.validated_data
+            }
+            owners = dict(
+                model.objects.filter(**{
+                    'user': self.request.user, f'{name}__in': wanted
+                }).values_list(name, 'pk')
+            )
+
+            for index, serializer in list(valid):
+                if name not in serializer.validated_data:
+                    continue
+                pk = getattr(serializer.instance, 'pk', None)
+                owner = pk if pk is not None else ('new', index)
+                value = serializer.validated_data[name]
+                if owners.setdefault(value, owner) != owner:
+                    results[index] = {
+                        'status': status.HTTP_400_BAD_REQUEST,
+                        'errors': {name: [
+                            f'{model._meta.verbose_name} with this {name} '
+                            'already exists.'
+                        ]},
+                    }
+                    valid.remove((index, serializer))
+
+    def _resolve_titles(self, validated):
+        '''Add related objects named by title to the items' relation ids
+
+        Titles are collected across all items, so each relation costs the
+        same few queries however many items and titles there are.
+        '''
+        model = self.queryset.model
+        for titles_name, name in self.bulk_title_fields.items():
+            wanted = {
+                title for data in validated
+                for title in data.get(titles_name, ())
+            }
+            ids = get_or_create_titles(
+                model._meta.get_field(name).related_model,
+                self.request.user.pk,
+                wanted
+            )
+            for data in validated:
+                if titles_name in data:
+                    data[name] = list(data.get(name, ())) + [
+                        ids[title] for title in data.pop(titles_name)
+                    ]
+
+    def _set_relations(self, instances, validated, replace):
+        '''Write the M2M through rows for the given relations in bulk'''
+        model = self.queryset.model
+        for name in self.bulk_relations:
+            field = model._meta.get_field(name)
+            through = field.remote_field.through
+            source = f'{field.m2m_field_name()}_id'
+            target = f'{field.m2m_reverse_field_name()}_id'
+            changed = [
+                (instance, data[name])
+                for instance, data in zip(instances, validated)
+                if name in data
+            ]
+
+            if not changed:
+                continue
+
+            touched = {pk for _, pks in changed for pk in pks}
+            if replace:
+                old = through.objects.filter(**{
+                    f'{source}__in': [instance.pk for instance, _ in changed]
+                })
+                touched.update(old.values_list(target, flat=True))
+                old.delete()
+            through.objects.bulk_create([
+                through(**{source: instance.pk, target: pk})
+                for instance, pks in changed
+                for pk in dict.fromkeys(pks)
+            ])
+            self.bulk_relations_written(name, touched)
+
+    def _bulk_response(self, results, success_status):
+        '''Return the per-item results, 207 unless every item succeeded'''
+        if all(result['status'] == success_status for result in results):
+            return Response(results, status=success_status)
+        return Response(results, status=status.HTTP_207_MULTI_STATUS)
+
+    def _add_data(self, results, valid, instances):
+        '''Serialize the written instances into their results'''
+        prefetch_related_objects(instances, *self.bulk_relations)
+        data = self.serializer_class(instances, many=True).data
+        for (index, _), item in zip(valid, data):
+            results[index]['data'] = item
+
+    def bulk_create(self, request):
+        '''Create many objects, returning a result per item'''
+        items = self._bulk_items(request.data)
+        serializer_class = self.get_bulk_serializer_class()
+        results = [None] * len(items)
+        valid = []
+
+        for index, item in enumerate(items):
+            serializer = serializer_class(data=item)
+            if serializer.is_valid():
+                valid.append((index, serializer))
+            else:
+                results[index] = {
+                    'status': status.HTTP_400_BAD_REQUEST,
+                    'errors': serializer.errors,
+                }
+        self._validate_relations(valid, results)
+        self._validate_unique(valid, results)
+
+        model = self.queryset.model
+        validated = [serializer.validated_data for _, serializer in valid]
+        with transaction.atomic():
+            self._resolve_titles(validated)
+            instances = [
+                model(user=request.user, **{
+                    key: value for key, value in data.items()
+                    if key not in self.bulk_relations
+                })
+                for data in validated
+            ]
+            save_new(model, request.user, instances)
+            self._set_relations(instances, validated, replace=False)
+            self.bulk_written(instances)
+
+        for index, _ in valid:
+            results[index] = {'status': status.HTTP_201_CREATED}
+        self._add_data(results, valid, instances)
+        return self._bulk_response(results, status.HTTP_201_CREATED)
+
+    def bulk_update(self, request):
+        '''Partially update many objects, identified by their ids'''
+        items = self._bulk_items(request.data)
+        serializer_class = self.get_bulk_serializer_class()
+        ids = [
+            item.get('id') if isinstance(item, dict) else None
+            for item in items
+        ]
+        with transaction.atomic():
+            existing = self.get_bulk_queryset().select_for_update().in_bulk(
+                [pk for pk in ids if is_id(pk)]
+            )
+            results = [None] * len(items)
+            valid = []
+
+            for index, (item, pk) in enumerate(zip(items, ids)):
+                if not is_id(pk):
+                    results[index] = {
+                        'status': status.HTTP_400_BAD_REQUEST,
+                        'errors': INVALID_ID,
+                    }
+                    continue
+                instance = existing.get(pk)
+                if instance is None:
+                    results[index] = {
+                        'status': status.HTTP_404_NOT_FOUND,
+                        'errors': {'id': ['Not found.']},
+                    }
+                    continue
+
+                serializer = serializer_class(
+                    instance, data=item, partial=True
+                )
+                if serializer.is_valid():
+                    valid.append((index, serializer))
+                else:
+                    results[index] = {
+                        'status': status.HTTP_400_BAD_REQUEST,
+                        'errors': serializer.errors,
+                    }
+            self._validate_relations(valid, results)
+            self._validate_unique(valid, results)
+
+            self._resolve_titles(
+                [serializer.validated_data for _, serializer in valid]
+            )
+            instances = []
+            fields = set()
+            validated = []
+            for index, serializer in valid:
+                instance = serializer.instance
+                for key, value in serializer.validated_data.items():
+                    if key not in self.bulk_relations:
+                        setattr(instance, key, value)
+                        fields.add(key)
+                instances.append(instance)
+                validated.append(serializer.validated_data)
+                results[index] = {'status': status.HTTP_200_OK}
+
+            update_many(self.get_bulk_queryset(), instances, sorted(fields))
+            self._set_relations(instances, validated, replace=True)
+            self.bulk_written(instances)
+
+        self._add_data(results, valid, instances)
+        return self._bulk_response(results, status.HTTP_200_OK)
+
+    def bulk_destroy(self, request):
+        '''Delete many objects by id, in one query'''
+        ids = None
+        if isinstance(request.data, dict):
+            ids = request.data.get('ids')
+        ids = self._bulk_items(ids)
+        with transaction.atomic():
+            queryset = self.get_bulk_queryset().filter(pk__in=[
+                pk for pk in ids if is_id(pk)
+            ])
+            existing = set(queryset.values_list('pk', flat=True))
+            self.perform_bulk_destroy(queryset, existing)
+
+        results = []
+        for pk in ids:
+            if not is_id(pk):
+                results.append({
+                    'id': pk,
+                    'status': status.HTTP_400_BAD_REQUEST,
+                    'errors': INVALID_ID,
+                })
+            elif pk in existing:
+                results.append({'id': pk, 'status': status.HTTP_200_OK})
+            else:
+                results.append(
+                    {'id': pk, 'status': status.HTTP_404_NOT_FOUND}
+                )
+        return self._bulk_response(results, status.HTTP_200_OK)
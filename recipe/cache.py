@@ -0,0 +1,164 @@
+import hashlib
+import time
+
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.http import (http_date, parse_etags,
+                               parse_http_date_safe, quote_etag)
+
+from rest_framework import status
+from rest_framework.response import Response
+
+from core.conf import feature_settings
+from core.metrics import registry
+
+
+RESPONSE_CACHE_DEFAULTS = {
+    'ALIAS': 'default',
+    'TTL': 300,
+}
+
+
+def response_cache_settings():
+    '''Return the response cache settings merged over the defaults'''
+    return feature_settings('RESPONSE_CACHE', RESPONSE_CACHE_DEFAULTS)
+
+
+def get_cache():
+    '''Return the cache holding versions and responses'''
+    return caches[response_cache_settings()['ALIAS']]
+
+
+def record(event):
+    '''Count a cache hit, miss or not_modified in the metrics registry'''
+    registry.increment(f'response_cache.{event}')
+
+
+def stats():
+    '''Return the hit, miss and not_modified counts'''
+    counters = registry.counters()
+    return {
+        event: counters.get(f'response_cache.{event}', 0)
+        for event in ('hit', 'miss', 'not_modified')
+    }
+
+
+def version_key(user_id):
+    return f'recipe-api:version:{user_id}'
+
+
+def get_version(user_id):
+    '''Return the current cache version of a user's recipe data
+
+    A missing version, never written or evicted, starts from the clock
+    rather than from 1, so it can't collide with an older version whose
+    responses may still be cached.
+    '''
+    cache = get_cache()
+    version = cache.get(version_key(user_id))
+    if version is None:
+        version = int(time.time() * 1000)
+        if not cache.add(version_key(user_id), version, None):
+            version = cache.get(version_key(user_id), version)
+    return version
+
+
+def _bump(user_id):
+    cache = get_cache()
+    try:
+        cache.incr(version_key(user_id))
+    except ValueError:
+        get_version(user_id)
+
+
+def bump_version(user_id):
+    '''Invalidate every cached response for a user
+
+    The version is bumped straight away and again once the surrounding
+    transaction commits, so a read racing the commit can't leave stale
+    data cached under the new version.
+    '''
+    _bump(user_id)
+    transaction.on_commit(lambda: _bump(user_id))
+
+
+class CachedResponseMixin:
+
+    '''Serve reads from a per-user versioned response cache
+
+    Keys combine the user, their current version, the path and the
+    query string. Any write to the user's recipes, tags or ingredients
+    bumps the version, orphaning every older entry. The key doubles as
+    the ETag, so If-None-Match is answered with a 304 without touching
+    the database or the cached body. Views that can cheaply tell when
+    a resource last changed implement get_last_modified() to also send
+    Last-Modified and answer If-Modified-Since.
+    '''
+    cached_headers = ('Link', 'Last-Modified')
+
+    def get_last_modified(self, request):
+        '''Return when the requested resource last changed, if known'''
+        return None
+
+    def cache_key(self, request):
+        '''Return the cache key for this request'''
+        params = sorted(request.query_params.lists())
+        raw = f'{request.path}:{params}'
+        digest = hashlib.md5(raw.encode('utf-8')).hexdigest()
+        version = get_version(request.user.pk)
+        return f'recipe-api:response:{request.user.pk}:{version}:{digest}'
+
+    def cached_response(self, request, handler, *args, **kwargs):
+        '''Return a cached response, or call handler and cache its result'''
+        key = self.cache_key(request)
+        etag = quote_etag(hashlib.md5(key.encode('utf-8')).hexdigest())
+        headers = {'ETag': etag, 'Cache-Control': 'private, no-cache'}
+
+        if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+        if_modified_since = parse_http_date_safe(
+            request.META.get('HTTP_IF_MODIFIED_SINCE', '')
+        )
+        if if_none_match is not None:
+            '''If-Modified-Since is ignored whenever If-None-Match is sent'''
+            if etag in parse_etags(if_none_match):
+                record('not_modified')
+                return Response(status=status.HTTP_304_NOT_MODIFIED,
+                                headers=headers)
+        elif if_modified_since is not None:
+            last_modified = self.get_last_modified(request)
+            if (last_modified is not None and
+                    int(last_modified.timestamp()) <= if_modified_since):
+                record('not_modified')
+                headers['Last-Modified'] = http_date(
+                    last_modified.timestamp()
+                )
+                return Response(status=status.HTTP_304_NOT_MODIFIED,
+                                headers=headers)
+
+        cache = get_cache()
+        cached = cache.get(key)
+        if cached is not None:
+            record('hit')
+            data, cached_headers = cached
+            return Response(data, headers={**cached_headers, **headers})
+
+        record('miss')
+        response = handler(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            last_modified = self.get_last_modified(request)
+            if last_modified is not None:
+                response['Last-Modified'] = http_date(
+                    last_modified.timestamp()
+                )
+            cached_headers = {
+                name: response[name] for name in self.cached_headers
+                if response.has_header(name)
+            }
+            cache.set(
+                key,
+                (response.data, cached_headers),
+                response_cache_settings()['TTL']
+            )
+            for name, value in headers.items():
+                response[name] = value
+        return response
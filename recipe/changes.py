@@ -0,0 +1,72 @@
+from datetime import timedelta
+
+from django.utils import timezone
+
+from core.conf import feature_settings
+from core.models import ChangeLogEntry
+
+
+SYNC_DEFAULTS = {
+    'SETTLE_SECONDS': 5,
+}
+
+
+def sync_settings():
+    '''Return the sync settings merged over the defaults'''
+    return feature_settings('SYNC', SYNC_DEFAULTS)
+
+
+'''Largest id list passed to a single change log statement'''
+LOG_BATCH_SIZE = 500
+
+
+def record(user_id, model, object_ids, action=ChangeLogEntry.UPSERT):
+    '''Log a change to objects of model, replacing their older entries'''
+    object_ids = list(dict.fromkeys(object_ids))
+    name = model._meta.model_name
+    for start in range(0, len(object_ids), LOG_BATCH_SIZE):
+        batch = object_ids[start:start + LOG_BATCH_SIZE]
+        ChangeLogEntry.objects.filter(
+            model=name, object_id__in=batch
+        ).delete()
+        ChangeLogEntry.objects.bulk_create([
+            ChangeLogEntry(
+                user_id=user_id,
+                model=name,
+                object_id=object_id,
+                action=action,
+            )
+            for object_id in batch
+        ])
+
+
+def settled_before():
+    '''Return the time entries must be written before to be served'''
+    window = timedelta(seconds=sync_settings()['SETTLE_SECONDS'])
+    return timezone.now() - window
+
+
+def changes_since(user, token, limit):
+    '''Return up to limit entries after token, and whether more remain
+
+    Entry ids are handed out on insert but only seen on commit, so a
+    transaction holding id N can commit after the one holding N + 1,
+    and a client given N + 1 as its token would never see N. The feed
+    therefore stops at the first entry written within SETTLE_SECONDS,
+    by which time every earlier id has committed or rolled back; the
+    held back entries are returned by a later sync.
+    '''
+    settled = settled_before()
+    entries = list(
+        ChangeLogEntry.objects.filter(user=user, id__gt=token)
+        .order_by('id')[:limit + 1]
+    )
+    for index, entry in enumerate(entries):
+        if entry.created_at > settled:
+            return entries[:index], False
+    return entries[:limit], len(entries) > limit
+
+
+def forget_user(user_id):
+    '''Drop every entry of a deleted user'''
+    ChangeLogEntry.objects.filter(user_id=user_id).delete()
@@ -0,0 +1,58 @@
+import json
+
+from rest_framework import renderers
+from rest_framework.utils import encoders
+
+
+class NDJSONRenderer(renderers.BaseRenderer):
+
+    '''Renders data as a single line of newline delimited JSON'''
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return to_ndjson_line(data)
+
+
+def to_ndjson_line(data):
+    '''Encode one object as a line of UTF-8 JSON'''
+    return json.dumps(
+        data,
+        cls=encoders.JSONEncoder,
+        ensure_ascii=False,
+        separators=(',', ':')
+    ).encode('utf-8') + b'\n'
+
+
+def iter_chunks(queryset, chunk_size, prefetch=()):
+    '''Yield lists of rows from queryset, seeking by id between chunks
+
+    Each chunk is a fresh `id > last_id` query with its own prefetch, so
+    only one chunk of rows and relations is ever held in memory. This is
+    keyset chunking, not a server-side cursor: QuerySet.iterator() skips
+    prefetch_related in this Django version, and separate queries keep
+    no cursor or transaction open while the client reads.
+    '''
+    last_id = 0
+    while True:
+        chunk = list(
+            queryset.filter(id__gt=last_id)
+            .order_by('id')
+            .prefetch_related(*prefetch)[:chunk_size]
+        )
+        if not chunk:
+            return
+
+        yield chunk
+        last_id = chunk[-1].id
+
+
+def stream_ndjson(queryset, serializer_class, context, chunk_size,
+                  prefetch=()):
+    '''Yield the serialized rows as NDJSON, one chunk of lines at a time'''
+    for chunk in iter_chunks(queryset, chunk_size, prefetch):
+        data = serializer_class(chunk, many=True, context=context).data
+        yield b''.join(to_ndjson_line(item) for item in data)
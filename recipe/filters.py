@@ -0,0 +1,77 @@
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from rest_framework.exceptions import ValidationError
+
+from core.models import Recipe
+
+
+MATCH_ANY = 'any'
+MATCH_ALL = 'all'
+MATCH_CHOICES = (MATCH_ANY, MATCH_ALL)
+
+
+def filter_by_related(queryset, field, ids, match=MATCH_ANY):
+    '''Filter recipes related to any or all of ids through an M2M field
+
+    Both modes compile to a semi-join, `id IN (SELECT recipe_id ...)`,
+    on the through table instead of a join, so each recipe is returned
+    at most once. match=all groups the through rows per recipe and keeps
+    those matching every id. The subquery is driven by the
+    (tag_id, recipe_id) style indexes added in core migration 0006.
+    '''
+    m2m = queryset.model._meta.get_field(field)
+    ids = set(ids)
+    recipe_column = f'{m2m.m2m_field_name()}_id'
+    related = m2m.remote_field.through.objects.filter(
+        **{f'{m2m.m2m_reverse_field_name()}_id__in': ids}
+    ).values(recipe_column)
+
+    if match == MATCH_ALL:
+        related = related.annotate(
+            matched=Count('pk')
+        ).filter(matched=len(ids)).values(recipe_column)
+
+    return queryset.filter(pk__in=related)
+
+
+def _recipe_links(relation):
+    '''Return the through rows of a recipe M2M pointing at the outer row'''
+    m2m = Recipe._meta.get_field(relation)
+    column = f'{m2m.m2m_reverse_field_name()}_id'
+    links = m2m.remote_field.through.objects.filter(
+        **{column: OuterRef('pk')}
+    )
+    return links, column
+
+
+def count_recipes(relation):
+    '''Return an expression counting the recipes using the outer row'''
+    links, column = _recipe_links(relation)
+    count = links.order_by().values(column).annotate(
+        count=Count('pk')
+    ).values('count')
+    return Coalesce(Subquery(count, output_field=IntegerField()), 0)
+
+
+def filter_modified_since(queryset, value):
+    '''Filter to rows updated at or after an ISO 8601 timestamp
+
+    The bound is inclusive, so a client passing back the newest
+    updated_at it has seen may receive that row again but never misses
+    one written in the same instant. Naive timestamps are read in the
+    server's time zone.
+    '''
+    try:
+        since = parse_datetime(value)
+    except ValueError:
+        since = None
+    if since is None:
+        raise ValidationError(
+            {'modified_since': 'Must be an ISO 8601 date and time.'}
+        )
+    if timezone.is_naive(since):
+        since = timezone.make_aware(since)
+    return queryset.filter(updated_at__gte=since)
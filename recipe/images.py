@@ -0,0 +1,188 @@
+import io
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image, ImageOps
+
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from core.conf import feature_settings
+from core.db import check_connections
+from core.models import RecipeImageJob, RecipeImageVariant
+
+
+logger = logging.getLogger(__name__)
+
+IMAGE_PROCESSING_DEFAULTS = {
+    'ASYNC': True,
+    'WORKERS': 2,
+    'MAX_PIXELS': 40000000,
+    'MAX_SIZE': 2048,
+    'VARIANTS': {'thumbnail': 200, 'medium': 800},
+    'FORMATS': ('jpeg', 'webp'),
+    'QUALITY': 85,
+}
+
+EXTENSIONS = {'jpeg': 'jpg', 'webp': 'webp'}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def image_settings():
+    '''Return the image processing settings merged over the defaults'''
+    return feature_settings('IMAGE_PROCESSING', IMAGE_PROCESSING_DEFAULTS)
+
+
+def get_executor():
+    '''Return the process wide worker pool, creating it on first use'''
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=image_settings()['WORKERS'],
+                thread_name_prefix='recipe-images'
+            )
+        return _executor
+
+
+def enqueue(job):
+    '''Hand a saved job to the worker pool once its row is committed
+
+    With ASYNC disabled the job is processed inline, which is what the
+    tests and the process_image_jobs command rely on.
+    '''
+    if not image_settings()['ASYNC']:
+        process_job(job.pk)
+        return
+
+    transaction.on_commit(
+        lambda: get_executor().submit(_run_in_worker, job.pk)
+    )
+
+
+def _run_in_worker(job_id):
+    '''Process a job on a pool thread, which owns its own DB connection'''
+    close_old_connections()
+    check_connections()
+    try:
+        process_job(job_id)
+    except Exception:
+        logger.exception('Recipe image job %s crashed', job_id)
+    finally:
+        close_old_connections()
+
+
+def process_job(job_id):
+    '''Validate, clean and resize the upload for a pending job'''
+    claimed = RecipeImageJob.objects.filter(
+        pk=job_id, status=RecipeImageJob.PENDING
+    ).update(status=RecipeImageJob.PROCESSING, updated_at=timezone.now())
+    if not claimed:
+        return
+
+    job = RecipeImageJob.objects.select_related('recipe').get(pk=job_id)
+    try:
+        image = load_clean_image(job.source)
+        save_recipe_images(job.recipe, image)
+    except (OSError, ValueError, Image.DecompressionBombError) as exc:
+        job.status = RecipeImageJob.FAILED
+        job.error = str(exc)[:255]
+    else:
+        job.status = RecipeImageJob.DONE
+
+    job.source.delete(save=False)
+    job.save()
+
+
+def load_clean_image(source):
+    '''Decode an upload into an RGB image carrying no metadata'''
+    options = image_settings()
+    with source.open('rb') as file:
+        image = Image.open(file)
+        width, height = image.size
+        if width * height > options['MAX_PIXELS']:
+            raise ValueError(f'Image is too large ({width}x{height})')
+
+        image.load()
+
+    image = ImageOps.exif_transpose(image).convert('RGB')
+
+    '''Copy only the pixels, leaving EXIF, ICC and comments behind'''
+    clean = Image.new('RGB', image.size)
+    clean.paste(image)
+    clean.thumbnail((options['MAX_SIZE'], options['MAX_SIZE']))
+    return clean
+
+
+def encode(image, image_format):
+    '''Encode an image and return it as a named ContentFile'''
+    buffer = io.BytesIO()
+    image.save(
+        buffer,
+        format=image_format.upper(),
+        quality=image_settings()['QUALITY']
+    )
+    return ContentFile(
+        buffer.getvalue(),
+        name=f'image.{EXTENSIONS[image_format]}'
+    )
+
+
+def delete_files(files):
+    '''Delete stored files given as (storage, name) pairs'''
+    for storage, name in files:
+        storage.delete(name)
+
+
+def save_recipe_images(recipe, image):
+    '''Replace a recipe's image and variants with ones rendered from image
+
+    The replaced files are only deleted once the new rows are committed,
+    and the files written are deleted again if rendering or saving
+    fails, so the rows never point at missing files and no file is left
+    without a row.
+    '''
+    options = image_settings()
+    previous = recipe.image.name
+    replaced = [
+        (variant.image.storage, variant.image.name)
+        for variant in recipe.image_variants.all()
+    ]
+    if previous:
+        replaced.append((recipe.image.storage, previous))
+    written = []
+
+    try:
+        with transaction.atomic():
+            recipe.image_variants.all().delete()
+
+            content = encode(image, 'jpeg')
+            recipe.image.save(content.name, content, save=False)
+            written.append((recipe.image.storage, recipe.image.name))
+            recipe.save(update_fields=['image', 'updated_at'])
+
+            for name, size in options['VARIANTS'].items():
+                resized = image.copy()
+                resized.thumbnail((size, size), Image.LANCZOS)
+                for image_format in options['FORMATS']:
+                    content = encode(resized, image_format)
+                    variant = RecipeImageVariant(
+                        recipe=recipe,
+                        name=name,
+                        format=image_format,
+                    )
+                    variant.image.save(content.name, content, save=False)
+                    written.append(
+                        (variant.image.storage, variant.image.name)
+                    )
+                    variant.save()
+
+            transaction.on_commit(lambda: delete_files(replaced))
+    except Exception:
+        delete_files(written)
+        recipe.image.name = previous
+        raise
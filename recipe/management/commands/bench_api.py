@@ -0,0 +1,246 @@
+import json
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from rest_framework.authtoken.models import Token
+
+from core.models import (ChangeLogEntry, Tag, Ingredient, Recipe,
+                         RecipeImageJob, RecipeImageVariant)
+
+from recipe import benchmark, cache, changes, search
+from recipe.seed import seed_library
+from user.authentication import remember_token, token_cache
+
+
+class Command(BaseCommand):
+
+    '''Load test every recipe and user endpoint on a seeded library'''
+    help = (
+        'Report p50/p99 latency, queries per request and throughput of '
+        'each API endpoint, optionally against a baseline file'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1)
+        parser.add_argument('--recipes', type=int, default=2000)
+        parser.add_argument('--tags', type=int, default=100)
+        parser.add_argument('--ingredients', type=int, default=200)
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--warmup', type=int, default=2)
+        parser.add_argument('--only', default='',
+                            help='Comma separated scenario name prefixes')
+        parser.add_argument('--cold', action='store_true',
+                            help='Invalidate the response cache each call')
+        parser.add_argument('--server', default='',
+                            help='Base url of a running server to load')
+        parser.add_argument('--concurrency', type=int, default=1,
+                            help='Parallel clients, needs --server')
+        parser.add_argument('--baseline', default='',
+                            help='Baseline JSON file to compare against')
+        parser.add_argument('--save-baseline', default='',
+                            help='Write the results to this JSON file')
+        parser.add_argument('--tolerance', type=float, default=0.5,
+                            help='Allowed p50 growth over the baseline')
+
+    def handle(self, *args, **options):
+        '''Seed, run the scenarios, report and compare'''
+        scenarios = self.select(options['only'])
+        if options['concurrency'] > 1 and not options['server']:
+            raise CommandError(
+                '--concurrency needs --server, the test client runs '
+                'in a single transaction.'
+            )
+        if options['server']:
+            '''The server needs committed data, removed again afterwards'''
+            context = self.seed(options)
+            try:
+                results = self.run(scenarios, context, options)
+            finally:
+                uploads = self.uploads(context['run'])
+                get_user_model().objects.filter(
+                    email__startswith=f'bench{context["run"]}'
+                ).delete()
+                self.remove_uploads(uploads)
+        else:
+            '''Rolling back drops the rows but not the files uploaded'''
+            with transaction.atomic():
+                context = self.seed(options)
+                results = self.run(scenarios, context, options)
+                uploads = self.uploads(context['run'])
+                transaction.set_rollback(True)
+            self.remove_uploads(uploads)
+
+        self.finish(results, options)
+
+    def select(self, only):
+        '''Return the scenarios whose names start with one of the prefixes'''
+        prefixes = tuple(prefix for prefix in only.split(',') if prefix)
+        scenarios = [
+            scenario for scenario in benchmark.SCENARIOS
+            if not prefixes or scenario.name.startswith(prefixes)
+        ]
+        if not scenarios:
+            raise CommandError(f'No scenario matches "{only}".')
+        return scenarios
+
+    def seed(self, options):
+        '''Create the benchmark users and libraries, return the context'''
+        run = int(time.time())
+        password = 'bench1234'
+        self.stdout.write(
+            f'Seeding {options["users"]} users with {options["recipes"]} '
+            f'recipes, {options["tags"]} tags, '
+            f'{options["ingredients"]} ingredients each...'
+        )
+        for index in range(options['users']):
+            user = get_user_model().objects.create_user(
+                f'bench{run}-seed{index}@company.com', password
+            )
+            recipe_ids, tag_ids, ingredient_ids = seed_library(
+                user,
+                recipes=options['recipes'],
+                tags=options['tags'],
+                ingredients=options['ingredients'],
+                seed=index
+            )
+            search.index_recipes(recipe_ids)
+            changes.record(user.pk, Tag, tag_ids)
+            changes.record(user.pk, Ingredient, ingredient_ids)
+            changes.record(user.pk, Recipe, recipe_ids)
+            '''The seeded library is history, outside the sync window'''
+            ChangeLogEntry.objects.filter(user=user).update(
+                created_at=changes.settled_before()
+            )
+            if index == 0:
+                context = {
+                    'run': run,
+                    'user': user,
+                    'email': user.email,
+                    'password': password,
+                    'token': Token.objects.create(user=user).key,
+                    'recipe_ids': list(recipe_ids),
+                    'tag_ids': tag_ids,
+                    'ingredient_ids': ingredient_ids,
+                }
+
+        '''Reads use the first half of the recipes, deletes eat the rest'''
+        context['read_ids'] = max(len(context['recipe_ids']) // 2, 1)
+        return context
+
+    def uploads(self, run):
+        '''Return the names of the files stored for the run's images
+
+        Pending job sources, plus the images and variants of processed
+        jobs when processing ran inline or on the loaded server.
+        '''
+        recipes = Recipe.objects.filter(user__email__startswith=f'bench{run}')
+        names = set(RecipeImageJob.objects.filter(
+            recipe__in=recipes
+        ).values_list('source', flat=True))
+        names.update(recipes.values_list('image', flat=True))
+        names.update(RecipeImageVariant.objects.filter(
+            recipe__in=recipes
+        ).values_list('image', flat=True))
+        return names - {'', None}
+
+    def remove_uploads(self, names):
+        '''Delete the given files from media storage'''
+        for name in names:
+            default_storage.delete(name)
+
+    def run(self, scenarios, context, options):
+        '''Run each scenario and print its summary line'''
+        if options['server']:
+            transport = benchmark.ServerTransport(
+                options['server'], context['token']
+            )
+        else:
+            transport = benchmark.TestClientTransport(context['token'])
+        hooks = []
+        if not options['server']:
+            key = context['token']
+            hooks.append(lambda: self.warm_token(key))
+        if options['cold']:
+            user_id = context['user'].pk
+            hooks.append(lambda: cache.bump_version(user_id))
+
+        def before_request():
+            for hook in hooks:
+                hook()
+
+        self.stdout.write(
+            f'{"scenario":<24}{"p50 ms":>9}{"p99 ms":>9}'
+            f'{"req/s":>9}{"queries":>9}{"errors":>8}'
+        )
+        results = {}
+        for scenario in scenarios:
+            try:
+                result = benchmark.run_scenario(
+                    transport, scenario, context, options['iterations'],
+                    options['warmup'], before_request,
+                    options['concurrency']
+                )
+            except ValueError as error:
+                raise CommandError(f'{scenario.name}: {error}')
+
+            results[scenario.name] = result
+            queries = result['queries']
+            self.stdout.write(
+                f'{scenario.name:<24}{result["p50_ms"]:>9}'
+                f'{result["p99_ms"]:>9}{result["rps"]:>9}'
+                f'{"-" if queries is None else queries:>9}'
+                f'{result["errors"]:>8}'
+            )
+        return results
+
+    def warm_token(self, key):
+        '''Cache the run's token, untimed, if it has expired or been dropped
+
+        Query counts then leave out the token lookup, which would
+        otherwise land on whichever call follows the cache TTL running
+        out or a scenario invalidating the user's tokens.
+        '''
+        if token_cache.get(key) is None:
+            remember_token(Token.objects.select_related('user').get(key=key))
+
+    def scale(self, options):
+        '''Return the options a baseline is only comparable under'''
+        return {
+            name: options[name] for name in (
+                'users', 'recipes', 'tags', 'ingredients', 'cold',
+                'concurrency'
+            )
+        }
+
+    def finish(self, results, options):
+        '''Save and compare against baselines, failing on regressions'''
+        if options['save_baseline']:
+            with open(options['save_baseline'], 'w') as baseline_file:
+                json.dump(
+                    {'scale': self.scale(options), 'results': results},
+                    baseline_file, indent=2, sort_keys=True
+                )
+                baseline_file.write('\n')
+            self.stdout.write(f'Saved baseline to {options["save_baseline"]}')
+
+        if not options['baseline']:
+            return
+        with open(options['baseline']) as baseline_file:
+            baseline = json.load(baseline_file)
+        if baseline['scale'] != self.scale(options):
+            self.stderr.write(
+                f'Warning: baseline was recorded at {baseline["scale"]}'
+            )
+
+        regressions = benchmark.compare(
+            results, baseline['results'], options['tolerance']
+        )
+        if regressions:
+            raise CommandError(
+                'Regressions against the baseline:\n' + '\n'.join(regressions)
+            )
+        self.stdout.write(self.style.SUCCESS('No regressions.'))
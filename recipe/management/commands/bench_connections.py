@@ -0,0 +1,104 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connections
+from django.db.backends.signals import connection_created
+from django.urls import reverse
+
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from recipe import benchmark
+from recipe.seed import seed_library
+
+
+'''Connection settings compared, applied to the database in turn'''
+MODES = (
+    ('connection per request', {
+        'CONN_MAX_AGE': 0, 'CONN_HEALTH_CHECKS': False,
+    }),
+    ('persistent', {
+        'CONN_MAX_AGE': 60, 'CONN_HEALTH_CHECKS': False,
+    }),
+    ('persistent, health checks', {
+        'CONN_MAX_AGE': 60, 'CONN_HEALTH_CHECKS': True,
+    }),
+)
+
+
+class Command(BaseCommand):
+
+    '''Benchmark request latency with and without persistent connections'''
+    help = (
+        'Time a tag listing, one query per request, opening a database '
+        'connection per request and reusing one. Run it against '
+        'PostgreSQL; connecting to SQLite is only a file open'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--warmup', type=int, default=10)
+
+    def handle(self, *args, **options):
+        '''Seed a user, time each mode, then delete the user'''
+        connection = connections['default']
+        if connection.vendor != 'postgresql':
+            self.stderr.write(
+                f'Database is {connection.vendor}, numbers will not '
+                'reflect PostgreSQL connection setup.'
+            )
+
+        user = get_user_model().objects.create_user(
+            f'bench{int(time.time())}-connections@company.com', 'bench1234'
+        )
+        original = dict(connection.settings_dict)
+        try:
+            seed_library(user, recipes=20, tags=20, ingredients=20)
+            token = Token.objects.create(user=user)
+
+            self.stdout.write(
+                f'{"mode":<28}{"p50 ms":>9}{"p99 ms":>9}{"connects":>10}'
+            )
+            for name, settings_dict in MODES:
+                connection.close()
+                connection.settings_dict.update(settings_dict)
+                latencies, connects = self.run(token, options)
+                self.stdout.write(
+                    f'{name:<28}'
+                    f'{benchmark.percentile(latencies, 50):>9.2f}'
+                    f'{benchmark.percentile(latencies, 99):>9.2f}'
+                    f'{connects:>10}'
+                )
+        finally:
+            connection.close()
+            connection.settings_dict.update(original)
+            user.delete()
+
+    def run(self, token, options):
+        '''Return request latencies and the number of connections opened'''
+        client = APIClient(SERVER_NAME=benchmark.allowed_host())
+        client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+        url = reverse('recipe:tag-list')
+        connects = []
+
+        def count(sender, **kwargs):
+            connects.append(sender)
+
+        latencies = []
+        for i in range(options['warmup'] + options['requests']):
+            if i == options['warmup']:
+                connection_created.connect(count)
+            start = time.perf_counter()
+            '''The test client skips the handler's connection upkeep'''
+            close_old_connections()
+            '''A fresh query string each time misses the response cache'''
+            response = client.get(url, {'bench': i})
+            close_old_connections()
+            elapsed = (time.perf_counter() - start) * 1000
+            assert response.status_code == 200, response.status_code
+            if i >= options['warmup']:
+                latencies.append(elapsed)
+
+        connection_created.disconnect(count)
+        return latencies, len(connects)
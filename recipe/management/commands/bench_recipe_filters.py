@@ -0,0 +1,88 @@
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F
+
+from core.models import Tag, Recipe
+
+from recipe import filters
+from recipe.seed import seed_library
+
+
+class Command(BaseCommand):
+
+    '''Benchmark recipe tag filtering against a large synthetic library'''
+    help = (
+        'Time the join, match=any and match=all recipe tag filters, and '
+        'the assigned_only and recipe_count tag listings. Use few --tags '
+        'to attach each tag to tens of thousands of recipes'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=100000)
+        parser.add_argument('--tags', type=int, default=1000)
+        parser.add_argument('--filter-tags', type=int, default=3)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        '''Seed inside a transaction, time each filter, then roll back'''
+        with transaction.atomic():
+            user = get_user_model().objects.create_user(
+                'bench@company.com', 'bench1234'
+            )
+            self.stdout.write(
+                f'Seeding {options["recipes"]} recipes, '
+                f'{options["tags"]} tags...'
+            )
+            _, tag_ids, _ = seed_library(
+                user,
+                recipes=options['recipes'],
+                tags=options['tags'],
+                ingredients=10
+            )
+            ids = tag_ids[:options['filter_tags']]
+            queryset = Recipe.objects.filter(user=user)
+
+            cases = (
+                ('join (tags__id__in)', queryset.filter(tags__id__in=ids)),
+                ('semi-join (match=any)', filters.filter_by_related(
+                    queryset, 'tags', ids, filters.MATCH_ANY
+                )),
+                ('grouped (match=all)', filters.filter_by_related(
+                    queryset, 'tags', ids, filters.MATCH_ALL
+                )),
+            )
+            for name, case in cases:
+                self.report(name, case, options['repeat'])
+
+            tags = Tag.objects.filter(user=user).order_by('-title')
+            listings = (
+                ('assigned (join)', tags.filter(recipe__isnull=False)),
+                ('counted (group by)', tags.annotate(
+                    recipe_count=Count('recipe')
+                )),
+                ('assigned (counter)', tags.filter(usage_count__gt=0)),
+                ('counted (counter)', tags.annotate(
+                    recipe_count=F('usage_count')
+                )),
+            )
+            for name, case in listings:
+                self.report(name, case, options['repeat'])
+
+            transaction.set_rollback(True)
+
+    def report(self, name, queryset, repeat):
+        '''Print median wall time and row counts for a queryset'''
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            rows = [row['id'] for row in queryset.values()]
+            timings.append((time.perf_counter() - start) * 1000)
+
+        self.stdout.write(
+            f'{name:<23} median {statistics.median(timings):8.1f} ms  '
+            f'rows {len(rows):>7}  distinct {len(set(rows)):>7}'
+        )
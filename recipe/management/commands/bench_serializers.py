@@ -0,0 +1,81 @@
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import RequestFactory
+
+from core.models import Recipe
+
+from recipe import serializers, values
+from recipe.seed import seed_library
+
+
+class Command(BaseCommand):
+
+    '''Benchmark model serializers against values serializers'''
+    help = 'Compare recipe serialization throughput on both read paths'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='100,1000,10000')
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        '''Seed inside a transaction, time each path, then roll back'''
+        sizes = [int(size) for size in options['sizes'].split(',')]
+        context = {'request': RequestFactory().get('/')}
+        with transaction.atomic():
+            user = get_user_model().objects.create_user(
+                'bench@company.com', 'bench1234'
+            )
+            self.stdout.write(f'Seeding {max(sizes)} recipes...')
+            seed_library(user, recipes=max(sizes))
+
+            for size in sizes:
+                queryset = Recipe.objects.filter(
+                    user=user
+                ).order_by('id')[:size]
+                cases = (
+                    ('list', serializers.RecipeSerializer,
+                     values.RecipeValuesSerializer, ('ingredients', 'tags')),
+                    ('detail', serializers.RecipeDetailSerializer,
+                     values.RecipeDetailValuesSerializer,
+                     ('ingredients', 'tags', 'image_variants')),
+                )
+                for name, model_class, values_class, prefetch in cases:
+                    model_ms = self.time(
+                        lambda: model_class(
+                            queryset.prefetch_related(*prefetch),
+                            many=True, context=context
+                        ).data,
+                        options['repeat']
+                    )
+                    values_ms = self.time(
+                        lambda: values_class(
+                            values_class.prepare(queryset),
+                            many=True, context=context
+                        ).data,
+                        options['repeat']
+                    )
+                    self.report(size, name, model_ms, values_ms)
+
+            transaction.set_rollback(True)
+
+    def time(self, serialize, repeat):
+        '''Return the median wall time of serialize(), queries included'''
+        timings = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            serialize()
+            timings.append((time.perf_counter() - start) * 1000)
+        return statistics.median(timings)
+
+    def report(self, size, name, model_ms, values_ms):
+        '''Print both timings as objects per second and the speedup'''
+        self.stdout.write(
+            f'{size:>6} {name:<7} '
+            f'model {size / model_ms * 1000:>9.0f}/s  '
+            f'values {size / values_ms * 1000:>9.0f}/s  '
+            f'x{model_ms / values_ms:.1f}'
+        )
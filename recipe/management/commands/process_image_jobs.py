@@ -0,0 +1,40 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.models import RecipeImageJob
+
+from recipe import images
+
+
+class Command(BaseCommand):
+
+    '''Drain the recipe image job queue'''
+    help = 'Process pending recipe image jobs, e.g. after a restart'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--stale-minutes',
+            type=int,
+            default=10,
+            help='Requeue jobs stuck in processing for this long'
+        )
+
+    def handle(self, *args, **options):
+        '''Requeue stale jobs, then process every pending job in order'''
+        cutoff = timezone.now() - timedelta(minutes=options['stale_minutes'])
+        requeued = RecipeImageJob.objects.filter(
+            status=RecipeImageJob.PROCESSING,
+            updated_at__lt=cutoff
+        ).update(status=RecipeImageJob.PENDING)
+
+        pending = RecipeImageJob.objects.filter(
+            status=RecipeImageJob.PENDING
+        ).order_by('id').values_list('id', flat=True)
+        for job_id in pending:
+            images.process_job(job_id)
+
+        self.stdout.write(
+            f'Processed {len(pending)} jobs ({requeued} requeued)'
+        )
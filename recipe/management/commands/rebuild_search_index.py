@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from recipe.search import get_backend
+
+
+class Command(BaseCommand):
+
+    '''Rebuild the recipe full text search index'''
+    help = 'Regenerate the search document of every recipe'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS,
+                            help='Database alias to rebuild the index of')
+
+    def handle(self, *args, **options):
+        backend = get_backend(connections[options['database']])
+        backend.rebuild()
+        self.stdout.write(f'Rebuilt search index ({type(backend).__name__})')
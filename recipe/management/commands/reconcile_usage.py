@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+
+from recipe import usage
+
+
+class Command(BaseCommand):
+
+    '''Repair tag and ingredient usage counters'''
+    help = (
+        'Recount the tags and ingredients whose usage counter disagrees '
+        'with their recipe links, e.g. after raw SQL writes or a restore'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Recount this many rows per query'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report how many counters drifted'
+        )
+
+    def handle(self, *args, **options):
+        '''Find drifted counters and recount them in batches'''
+        batch_size = options['batch_size']
+        for relation in usage.RELATIONS:
+            ids = list(
+                usage.drifted(relation).order_by('pk').values_list(
+                    'pk', flat=True
+                )
+            )
+            if not options['dry_run']:
+                for start in range(0, len(ids), batch_size):
+                    usage.refresh(relation, ids[start:start + batch_size])
+            verb = 'drifted' if options['dry_run'] else 'reconciled'
+            self.stdout.write(f'{relation}: {len(ids)} counters {verb}')
@@ -0,0 +1,31 @@
+# Generated by Django 2.2.28 on 2026-10-17 05:02
+
+from django.db import migrations
+
+
+def install_search_index(apps, schema_editor):
+    from recipe.search import get_backend
+
+    backend = get_backend(schema_editor.connection)
+    backend.install(schema_editor)
+    backend.rebuild()
+
+
+def uninstall_search_index(apps, schema_editor):
+    from recipe.search import get_backend
+
+    get_backend(schema_editor.connection).uninstall(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_recipe_image_processing'),
+    ]
+
+    # The search table is backend specific (a tsvector table with a GIN
+    # index on PostgreSQL, an FTS5 virtual table on SQLite), so it is
+    # managed by recipe.search rather than by a model.
+    operations = [
+        migrations.RunPython(install_search_index, uninstall_search_index),
+    ]
@@ -0,0 +1,154 @@
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination
+from rest_framework.response import Response
+
+
+class LinkHeaderCursorPagination(CursorPagination):
+
+    '''Keyset pagination that returns cursors in the Link header
+
+    Each page seeks from the last row of the previous one instead of
+    counting past an OFFSET, so deep pages cost the same as the first.
+    The body stays a plain list; next/previous page urls, carrying an
+    opaque cursor token, are sent as RFC 5988 Link headers.
+
+    An ordering of several fields, the last of them unique, is paged by
+    its whole key: the cursor holds every field of the boundary row and
+    the next page seeks past that row, so rows tied on the leading
+    fields are never paged by an offset, which is capped at
+    offset_cutoff.
+    '''
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+
+    def get_ordering(self, request, queryset, view):
+        '''Use the view's ordering for this request when it provides one'''
+        get_ordering = getattr(view, 'get_pagination_ordering', None)
+        ordering = get_ordering() if get_ordering else None
+        return ordering or super().get_ordering(request, queryset, view)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        '''Seek past a composite cursor position before paging'''
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.key_position = None
+        if len(self.ordering) > 1:
+            cursor = self.decode_cursor(request)
+            if self.key_position is not None:
+                key = self._clean_key(queryset, self.key_position)
+                queryset = queryset.filter(self._seek(key, cursor.reverse))
+
+        page = super().paginate_queryset(queryset, request, view)
+        if page is not None and self.key_position is not None:
+            position = self._encode_position(self.key_position)
+            if self.cursor.reverse:
+                self.has_next = True
+                self.next_position = position
+            else:
+                self.has_previous = True
+                self.previous_position = position
+            self.display_page_controls = True
+        return page
+
+    def decode_cursor(self, request):
+        '''Keep a composite position for paginate_queryset to seek past
+
+        The base class compares its position against the first ordering
+        field only, so it is given a cursor without one.
+        '''
+        cursor = super().decode_cursor(request)
+        if cursor is None or len(self.ordering) == 1:
+            return cursor
+        if cursor.position is not None:
+            try:
+                key = json.loads(cursor.position)
+            except ValueError:
+                raise NotFound(self.invalid_cursor_message)
+            if not isinstance(key, list) or len(key) != len(self.ordering):
+                raise NotFound(self.invalid_cursor_message)
+            self.key_position = key
+        return cursor._replace(position=None)
+
+    def _clean_key(self, queryset, key):
+        '''Convert a composite position to its ordering fields' types
+
+        The position comes from the client, so a value its field cannot
+        take is rejected as an invalid cursor rather than left to fail
+        in the query.
+        '''
+        cleaned = []
+        for order, value in zip(self.ordering, key):
+            name = order.lstrip('-')
+            annotation = queryset.query.annotations.get(name)
+            if annotation is not None:
+                field = annotation.output_field
+            else:
+                field = queryset.model._meta.get_field(name)
+            try:
+                value = field.to_python(value)
+            except (TypeError, ValueError, ValidationError):
+                raise NotFound(self.invalid_cursor_message)
+            if value is None:
+                raise NotFound(self.invalid_cursor_message)
+            cleaned.append(value)
+        return cleaned
+
+    def _seek(self, key, reverse):
+        '''Return a filter for rows after key in the ordering
+
+        (a, b, c) > (x, y, z) is a > x, or a = x and b > y, or a = x,
+        b = y and c > z, with each comparison flipped for descending
+        fields and again when paging backwards.
+        '''
+        seek = Q()
+        for index, order in enumerate(self.ordering):
+            descending = order.startswith('-')
+            lookup = 'lt' if descending != reverse else 'gt'
+            ties = {
+                field.lstrip('-'): value
+                for field, value in zip(self.ordering[:index], key)
+            }
+            seek |= Q(**ties, **{f'{order.lstrip("-")}__{lookup}': key[index]})
+        return seek
+
+    def _encode_position(self, key):
+        return json.dumps(key, separators=(',', ':'))
+
+    def _get_position_from_instance(self, instance, ordering):
+        '''Return the row's whole ordering key for composite orderings'''
+        if len(ordering) == 1:
+            return super()._get_position_from_instance(instance, ordering)
+        position = super()._get_position_from_instance
+        return self._encode_position(
+            [position(instance, (field,)) for field in ordering]
+        )
+
+    def get_paginated_response(self, data):
+        '''Return the page as a list with next/previous links in headers'''
+        links = []
+        next_link = self.get_next_link()
+        previous_link = self.get_previous_link()
+        if next_link:
+            links.append(f'<{next_link}>; rel="next"')
+        if previous_link:
+            links.append(f'<{previous_link}>; rel="previous"')
+
+        headers = {'Link': ', '.join(links)} if links else None
+        return Response(data, headers=headers)
+
+
+class TitleCursorPagination(LinkHeaderCursorPagination):
+
+    '''Paginate tags and ingredients by title, unique for each user'''
+    ordering = '-title'
+
+
+class RecipeCursorPagination(LinkHeaderCursorPagination):
+
+    '''Paginate recipes by primary key, newest first'''
+    ordering = '-id'
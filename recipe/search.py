@@ -0,0 +1,276 @@
+import re
+
+from django.db import connection, connections
+from django.db.models import FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+
+SEARCH_TABLE = 'recipe_search'
+
+'''Largest id list passed to a single indexing statement'''
+INDEX_BATCH_SIZE = 500
+
+TAGS_SQL = (
+    'SELECT {agg} FROM core_tag t '
+    'JOIN core_recipe_tags rt ON rt.tag_id = t.id '
+    'WHERE rt.recipe_id = r.id'
+)
+INGREDIENTS_SQL = (
+    'SELECT {agg} FROM core_ingredient i '
+    'JOIN core_recipe_ingredients ri ON ri.ingredient_id = i.id '
+    'WHERE ri.recipe_id = r.id'
+)
+
+
+def _batches(ids):
+    '''Split ids into lists small enough for one statement'''
+    ids = list(ids)
+    for start in range(0, len(ids), INDEX_BATCH_SIZE):
+        yield ids[start:start + INDEX_BATCH_SIZE]
+
+
+class FallbackSearchBackend:
+
+    '''Unindexed substring search for databases without full text support
+
+    Backends write through the connection of the database alias they
+    were made for, so a migration of any database fills its own index.
+    '''
+
+    def __init__(self, alias):
+        self.alias = alias
+
+    def cursor(self):
+        '''Return a cursor on this backend's database'''
+        return connections[self.alias].cursor()
+
+    def install(self, schema_editor):
+        pass
+
+    def uninstall(self, schema_editor):
+        pass
+
+    def index(self, recipe_ids):
+        pass
+
+    def remove(self, recipe_ids):
+        pass
+
+    def rebuild(self):
+        pass
+
+    def search(self, queryset, query):
+        '''Filter recipes whose title, tags or ingredients contain query'''
+        matches = queryset.model.objects.filter(
+            Q(title__icontains=query) |
+            Q(tags__title__icontains=query) |
+            Q(ingredients__title__icontains=query)
+        ).values('id')
+        return queryset.filter(pk__in=matches).annotate(
+            search_rank=Value(0.0, output_field=FloatField())
+        )
+
+
+class PostgresSearchBackend(FallbackSearchBackend):
+
+    '''tsvector documents in a side table, served by a GIN index
+
+    The recipe title, tag titles and ingredient titles are weighted
+    A, B and C so ts_rank favours title matches.
+    '''
+    DOCUMENT_SQL = (
+        "setweight(to_tsvector('english', r.title), 'A') || "
+        "setweight(to_tsvector('english', coalesce(({tags}), '')), 'B') || "
+        "setweight(to_tsvector('english', coalesce(({ingredients}), '')), "
+        "'C')"
+    ).format(
+        tags=TAGS_SQL.format(agg="string_agg(t.title, ' ')"),
+        ingredients=INGREDIENTS_SQL.format(agg="string_agg(i.title, ' ')"),
+    )
+
+    def install(self, schema_editor):
+        schema_editor.execute(
+            f'CREATE TABLE {SEARCH_TABLE} ('
+            'recipe_id integer PRIMARY KEY '
+            'REFERENCES core_recipe (id) ON DELETE CASCADE, '
+            'document tsvector NOT NULL)'
+        )
+        schema_editor.execute(
+            f'CREATE INDEX {SEARCH_TABLE}_document_idx '
+            f'ON {SEARCH_TABLE} USING GIN (document)'
+        )
+
+    def uninstall(self, schema_editor):
+        schema_editor.execute(f'DROP TABLE {SEARCH_TABLE}')
+
+    def _upsert(self, where, params):
+        with self.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {SEARCH_TABLE} (recipe_id, document) '
+                f'SELECT r.id, {self.DOCUMENT_SQL} FROM core_recipe r '
+                f'{where} '
+                'ON CONFLICT (recipe_id) '
+                'DO UPDATE SET document = EXCLUDED.document',
+                params
+            )
+
+    def index(self, recipe_ids):
+        for batch in _batches(recipe_ids):
+            self._upsert('WHERE r.id = ANY(%s)', [batch])
+
+    def remove(self, recipe_ids):
+        '''Rows go with their recipe through ON DELETE CASCADE'''
+
+    def rebuild(self):
+        with self.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+        self._upsert('', [])
+
+    def search(self, queryset, query):
+        '''Join the matching documents once, ranked by ts_rank
+
+        The GIN index finds the matches and the rank is computed from
+        the joined row's document, not looked up again for every recipe.
+        '''
+        from django.contrib.postgres.search import (
+            SearchQuery, SearchRank, SearchVectorField
+        )
+
+        table = queryset.model._meta.db_table
+        document = RawSQL(
+            f'{SEARCH_TABLE}.document', [], output_field=SearchVectorField()
+        )
+        tsquery = SearchQuery(query, config='english')
+        return queryset.extra(
+            tables=[SEARCH_TABLE],
+            where=[
+                f'{SEARCH_TABLE}.recipe_id = {table}.id',
+                f"{SEARCH_TABLE}.document @@ "
+                "plainto_tsquery('english', %s)",
+            ],
+            params=[query]
+        ).annotate(search_rank=SearchRank(document, tsquery))
+
+
+class SQLiteSearchBackend(FallbackSearchBackend):
+
+    '''FTS5 table keyed by recipe id, ranked with bm25'''
+    COLUMN_WEIGHTS = '10.0, 5.0, 2.0'
+
+    def install(self, schema_editor):
+        schema_editor.execute(
+            f'CREATE VIRTUAL TABLE {SEARCH_TABLE} USING fts5('
+            "title, tags, ingredients, tokenize='porter unicode61')"
+        )
+
+    def uninstall(self, schema_editor):
+        schema_editor.execute(f'DROP TABLE {SEARCH_TABLE}')
+
+    def _insert(self, where, params):
+        tags = TAGS_SQL.format(agg="group_concat(t.title, ' ')")
+        ingredients = INGREDIENTS_SQL.format(agg="group_concat(i.title, ' ')")
+        with self.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {SEARCH_TABLE} '
+                '(rowid, title, tags, ingredients) '
+                f"SELECT r.id, r.title, coalesce(({tags}), ''), "
+                f"coalesce(({ingredients}), '') FROM core_recipe r {where}",
+                params
+            )
+
+    def index(self, recipe_ids):
+        for batch in _batches(recipe_ids):
+            self.remove(batch)
+            placeholders = ', '.join(['%s'] * len(batch))
+            self._insert(f'WHERE r.id IN ({placeholders})', batch)
+
+    def remove(self, recipe_ids):
+        for batch in _batches(recipe_ids):
+            placeholders = ', '.join(['%s'] * len(batch))
+            with self.cursor() as cursor:
+                cursor.execute(
+                    f'DELETE FROM {SEARCH_TABLE} '
+                    f'WHERE rowid IN ({placeholders})',
+                    batch
+                )
+
+    def rebuild(self):
+        with self.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+        self._insert('', [])
+
+    def match_expression(self, query):
+        '''Turn free text into an FTS5 query of quoted prefix terms'''
+        terms = re.findall(r'\w+', query)
+        return ' '.join(f'"{term}"*' for term in terms)
+
+    def search(self, queryset, query):
+        '''Join the FTS5 table once, ranked by its bm25 score
+
+        A single MATCH drives the join from the full text index and bm25
+        reads the score of the joined row, where a correlated rank
+        subquery would rerun the MATCH for every candidate recipe.
+        '''
+        table = queryset.model._meta.db_table
+        expression = self.match_expression(query)
+        if not expression:
+            return queryset.none().annotate(
+                search_rank=Value(0.0, output_field=FloatField())
+            )
+
+        rank = RawSQL(
+            f'-bm25({SEARCH_TABLE}, {self.COLUMN_WEIGHTS})',
+            [],
+            output_field=FloatField()
+        )
+        return queryset.extra(
+            tables=[SEARCH_TABLE],
+            where=[
+                f'{SEARCH_TABLE}.rowid = {table}.id',
+                f'{SEARCH_TABLE} MATCH %s',
+            ],
+            params=[expression]
+        ).annotate(search_rank=rank)
+
+
+def sqlite_has_fts5(db_connection):
+    '''Return whether the SQLite library was compiled with FTS5'''
+    with db_connection.cursor() as cursor:
+        cursor.execute('PRAGMA compile_options')
+        return ('ENABLE_FTS5',) in cursor.fetchall()
+
+
+_backends = {}
+
+
+def get_backend(db_connection=connection):
+    '''Return the search backend suited to the database in use'''
+    key = (db_connection.alias, db_connection.settings_dict['NAME'])
+    if key not in _backends:
+        if db_connection.vendor == 'postgresql':
+            _backends[key] = PostgresSearchBackend(db_connection.alias)
+        elif (db_connection.vendor == 'sqlite' and
+              sqlite_has_fts5(db_connection)):
+            _backends[key] = SQLiteSearchBackend(db_connection.alias)
+        else:
+            _backends[key] = FallbackSearchBackend(db_connection.alias)
+    return _backends[key]
+
+
+def index_recipes(recipe_ids):
+    '''Refresh the search documents of the given recipes'''
+    recipe_ids = list(recipe_ids)
+    if recipe_ids:
+        get_backend().index(recipe_ids)
+
+
+def remove_recipes(recipe_ids):
+    '''Drop the search documents of deleted recipes'''
+    recipe_ids = list(recipe_ids)
+    if recipe_ids:
+        get_backend().remove(recipe_ids)
+
+
+def search_recipes(queryset, query):
+    '''Filter queryset to recipes matching query, annotated search_rank'''
+    return get_backend().search(queryset, query)
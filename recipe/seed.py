@@ -0,0 +1,62 @@
+import random
+
+from core.models import Tag, Ingredient, Recipe
+
+from recipe import usage
+
+
+def _bulk_create(model, user, objects):
+    '''Bulk insert a user's objects and return all of their ids'''
+    model.objects.bulk_create(objects)
+    return list(
+        model.objects.filter(user=user).values_list('id', flat=True)
+    )
+
+
+def seed_library(user, recipes=1000, tags=100, ingredients=100,
+                 tags_per_recipe=3, ingredients_per_recipe=5, seed=0):
+    '''Fill an empty user library with synthetic recipes, tags, ingredients
+
+    Rows are written with bulk_create, including the M2M through rows,
+    and usage counters are recounted once at the end, so libraries of
+    hundreds of thousands of recipes seed in seconds. The same seed
+    always produces the same library.
+    '''
+    rng = random.Random(seed)
+    tag_ids = _bulk_create(Tag, user, [
+        Tag(user=user, title=f'Tag {i}') for i in range(tags)
+    ])
+    ingredient_ids = _bulk_create(Ingredient, user, [
+        Ingredient(user=user, title=f'Ingredient {i}')
+        for i in range(ingredients)
+    ])
+    recipe_ids = _bulk_create(Recipe, user, [
+        Recipe(
+            user=user,
+            title=f'Recipe {i}',
+            time_minutes=rng.randint(5, 240),
+            price=rng.randint(100, 99999) / 100
+        )
+        for i in range(recipes)
+    ])
+
+    RecipeTag = Recipe.tags.through
+    RecipeIngredient = Recipe.ingredients.through
+    tags_per_recipe = min(tags_per_recipe, len(tag_ids))
+    ingredients_per_recipe = min(ingredients_per_recipe, len(ingredient_ids))
+    RecipeTag.objects.bulk_create([
+        RecipeTag(recipe_id=recipe_id, tag_id=tag_id)
+        for recipe_id in recipe_ids
+        for tag_id in rng.sample(tag_ids, tags_per_recipe)
+    ])
+    RecipeIngredient.objects.bulk_create([
+        RecipeIngredient(recipe_id=recipe_id, ingredient_id=ingredient_id)
+        for recipe_id in recipe_ids
+        for ingredient_id in rng.sample(
+            ingredient_ids, ingredients_per_recipe
+        )
+    ])
+    usage.refresh('tags', tag_ids)
+    usage.refresh('ingredients', ingredient_ids)
+
+    return recipe_ids, tag_ids, ingredient_ids
@@ -1,43 +1,189 @@
+from django.db import IntegrityError, transaction
+
 from rest_framework import serializers
 
-from core.models import Tag, Ingredient, Recipe
+from core.models import (Tag, Ingredient, Recipe, RecipeImageJob,
+                         RecipeImageVariant)
+
+from recipe.signals import recipe_writes
+from recipe.titles import get_or_create_titles
+
+
+def unique_title_message(model):
+    '''Return the error for a title the user already has'''
+    return f'{model._meta.verbose_name} with this title already exists.'
+
 
+class UserTitleSerializer(serializers.ModelSerializer):
 
-class TagSerializer(serializers.ModelSerializer):
+    '''Rejects a title the requesting user already uses'''
+
+    def validate_title(self, title):
+        request = self.context.get('request')
+        if request is None:
+            return title
+
+        queryset = self.Meta.model.objects.filter(
+            user=request.user, title=title
+        )
+        if self.instance is not None:
+            queryset = queryset.exclude(pk=self.instance.pk)
+        if queryset.exists():
+            raise serializers.ValidationError(
+                unique_title_message(self.Meta.model)
+            )
+        return title
+
+    def save(self, **kwargs):
+        '''Report a title a concurrent request took first as invalid
+
+        validate_title can pass for two requests at once; the (user,
+        title) unique constraint then fails the second write, which is
+        rolled back to a savepoint and rejected like a taken title.
+        '''
+        try:
+            with transaction.atomic():
+                return super().save(**kwargs)
+        except IntegrityError:
+            request = self.context.get('request')
+            title = self.validated_data.get('title')
+            if request is None or not self.Meta.model.objects.filter(
+                user=request.user, title=title
+            ).exists():
+                raise
+            raise serializers.ValidationError(
+                {'title': [unique_title_message(self.Meta.model)]}
+            )
+
+    def to_representation(self, instance):
+        '''Add the recipe count when the queryset was annotated with it'''
+        data = super().to_representation(instance)
+        if hasattr(instance, 'recipe_count'):
+            data['recipe_count'] = instance.recipe_count
+        return data
+
+
+class TagSerializer(UserTitleSerializer):
 
     class Meta:
         model = Tag
-        fields = ('id', 'title')
-        read_only_fields = ('id',)
+        fields = ('id', 'title', 'updated_at')
+        read_only_fields = ('id', 'updated_at')
 
 
-class IngredientSerializer(serializers.ModelSerializer):
+class IngredientSerializer(UserTitleSerializer):
 
     class Meta:
         model = Ingredient
-        fields = ('id', 'title')
-        read_only_fields = ('id',)
+        fields = ('id', 'title', 'updated_at')
+        read_only_fields = ('id', 'updated_at')
+
+
+def titles_field(model):
+    '''Return a write-only list of titles of model'''
+    return serializers.ListField(
+        child=serializers.CharField(
+            max_length=model._meta.get_field('title').max_length
+        ),
+        write_only=True,
+        required=False
+    )
 
 
 class RecipeSerializer(serializers.ModelSerializer):
 
+    '''Tags and ingredients are given by id, by title, or both
+
+    Titles the user has no tag or ingredient for yet are created. Ids
+    and titles together make up the new set, replacing the old one.
+    '''
     ingredients = serializers.PrimaryKeyRelatedField(
         many=True,
-        queryset=Ingredient.objects.all()
+        queryset=Ingredient.objects.all(),
+        required=False
     )
+    ingredient_titles = titles_field(Ingredient)
 
     tags = serializers.PrimaryKeyRelatedField(
         many=True,
-        queryset=Tag.objects.all()
+        queryset=Tag.objects.all(),
+        required=False
     )
+    tag_titles = titles_field(Tag)
+
+    title_fields = {
+        'ingredient_titles': 'ingredients',
+        'tag_titles': 'tags',
+    }
 
     class Meta:
         model = Recipe
         fields = (
             'id', 'title', 'ingredients', 'tags',
-            'time_minutes', 'price', 'link'
+            'time_minutes', 'price', 'link', 'updated_at',
+            'ingredient_titles', 'tag_titles'
         )
-        read_only_fields = ('id',)
+        read_only_fields = ('id', 'updated_at')
+
+    def resolve_titles(self, validated_data, user_id):
+        '''Add the objects named by title to their relation's ids'''
+        for titles_name, relation in self.title_fields.items():
+            titles = validated_data.pop(titles_name, None)
+            if titles is None:
+                continue
+            ids = get_or_create_titles(
+                Recipe._meta.get_field(relation).related_model,
+                user_id,
+                titles
+            )
+            validated_data[relation] = (
+                list(validated_data.get(relation, ())) +
+                [ids[title] for title in titles]
+            )
+
+    def has_titles(self, validated_data):
+        '''Return whether any relation is given by title'''
+        return any(name in validated_data for name in self.title_fields)
+
+    def create(self, validated_data):
+        with recipe_writes():
+            if not self.has_titles(validated_data):
+                return super().create(validated_data)
+            with transaction.atomic():
+                self.resolve_titles(
+                    validated_data, validated_data['user'].pk
+                )
+                return super().create(validated_data)
+
+    def update(self, instance, validated_data):
+        with recipe_writes():
+            if not self.has_titles(validated_data):
+                return super().update(instance, validated_data)
+            with transaction.atomic():
+                self.resolve_titles(validated_data, instance.user_id)
+                return super().update(instance, validated_data)
+
+
+class RecipeBulkSerializer(RecipeSerializer):
+
+    '''Validates bulk recipe items, tag/ingredient ids are checked in bulk'''
+    ingredients = serializers.ListField(
+        child=serializers.IntegerField(),
+        required=False
+    )
+    tags = serializers.ListField(
+        child=serializers.IntegerField(),
+        required=False
+    )
+
+
+class RecipeImageVariantSerializer(serializers.ModelSerializer):
+
+    '''Serializer for the processed sizes and formats of a recipe image'''
+    class Meta:
+        model = RecipeImageVariant
+        fields = ('name', 'format', 'width', 'height', 'image')
+        read_only_fields = fields
 
 
 class RecipeDetailSerializer(RecipeSerializer):
@@ -45,12 +191,19 @@ class RecipeDetailSerializer(RecipeSerializer):
     '''Now since we need to modify few things in detail view'''
     ingredients = IngredientSerializer(many=True, read_only=True)
     tags = TagSerializer(many=True, read_only=True)
+    image_variants = RecipeImageVariantSerializer(many=True, read_only=True)
+
+    class Meta(RecipeSerializer.Meta):
+        fields = RecipeSerializer.Meta.fields + ('image', 'image_variants')
+        read_only_fields = ('id', 'image', 'updated_at')
 
 
 class RecipeImageSerializer(serializers.ModelSerializer):
 
-    '''Serializer for uploading images to recipe'''
+    '''Serializer for queueing an uploaded image for processing'''
+    image = serializers.ImageField(source='source', write_only=True)
+
     class Meta:
-        model = Recipe
-        fields = ('id', 'image')
-        read_only_fields = ('id',)
+        model = RecipeImageJob
+        fields = ('id', 'recipe', 'image', 'status', 'error')
+        read_only_fields = ('id', 'recipe', 'status', 'error')
@@ -0,0 +1,243 @@
+import threading
+from contextlib import contextmanager
+
+from django.contrib.auth import get_user_model
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete, pre_save)
+from django.dispatch import receiver
+from django.utils import timezone
+
+from core.models import (ChangeLogEntry, Tag, Ingredient, Recipe,
+                         RecipeImageVariant)
+
+from recipe import changes, usage
+from recipe.cache import bump_version
+from recipe.search import index_recipes, remove_recipes
+
+
+_local = threading.local()
+
+
+def recipes_changed(user_id, recipe_ids):
+    '''Reindex, touch and log recipes after a change to their relations'''
+    recipe_ids = list(recipe_ids)
+    if recipe_ids:
+        index_recipes(recipe_ids)
+        Recipe.objects.filter(pk__in=recipe_ids).update(
+            updated_at=timezone.now()
+        )
+        changes.record(user_id, Recipe, recipe_ids)
+
+
+@contextmanager
+def recipe_writes():
+    '''Reindex and log the recipes written in a block once, after it
+
+    Writing a recipe saves its row and then sets its tags and
+    ingredients, each step signalling a change. Inside the block those
+    signals only note the recipe; afterwards each is reindexed and
+    logged once, and only recipes whose relations changed without a
+    save of their own are touched, a save having set updated_at.
+    '''
+    if getattr(_local, 'writes', None) is not None:
+        yield
+        return
+    writes = _local.writes = {'saved': {}, 'related': {}}
+    try:
+        yield
+    finally:
+        _local.writes = None
+
+    written = {**writes['related'], **writes['saved']}
+    if not written:
+        return
+    index_recipes(list(written))
+    touched = [pk for pk in writes['related'] if pk not in writes['saved']]
+    if touched:
+        Recipe.objects.filter(pk__in=touched).update(
+            updated_at=timezone.now()
+        )
+    for user_id in set(written.values()):
+        changes.record(user_id, Recipe, [
+            pk for pk, owner in written.items() if owner == user_id
+        ])
+
+
+def _note_write(kind, recipe):
+    '''Note a recipe written inside recipe_writes(), if in one'''
+    writes = getattr(_local, 'writes', None)
+    if writes is None:
+        return False
+    writes[kind][recipe.pk] = recipe.user_id
+    return True
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_saved(sender, instance, update_fields=None, **kwargs):
+    '''Reindex a recipe when its title may have changed'''
+    if _note_write('saved', instance):
+        return
+    if update_fields and 'title' not in update_fields:
+        return
+    index_recipes([instance.pk])
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(sender, instance, **kwargs):
+    '''Drop a deleted recipe from the search index'''
+    remove_recipes([instance.pk])
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def recipe_relations_changed(sender, instance, action, reverse, pk_set,
+                             **kwargs):
+    '''Reindex and touch recipes whose tags or ingredients changed'''
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            if not _note_write('related', instance):
+                recipes_changed(instance.user_id, [instance.pk])
+        return
+
+    '''Changed from the tag/ingredient side, e.g. tag.recipe_set.add()'''
+    if action == 'pre_clear':
+        instance._search_recipe_ids = list(
+            instance.recipe_set.values_list('id', flat=True)
+        )
+    elif action in ('post_add', 'post_remove'):
+        recipes_changed(instance.user_id, pk_set)
+    elif action == 'post_clear':
+        recipes_changed(
+            instance.user_id, getattr(instance, '_search_recipe_ids', ())
+        )
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def usage_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    '''Recount the tags or ingredients whose recipes changed'''
+    relation = usage.relation_of(sender)
+    if reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            usage.refresh(relation, [instance.pk])
+        return
+
+    if action == 'pre_clear':
+        cleared = instance.__dict__.setdefault('_usage_cleared', {})
+        cleared[relation] = usage.related_ids(relation, [instance.pk])
+    elif action in ('post_add', 'post_remove'):
+        usage.refresh(relation, pk_set)
+    elif action == 'post_clear':
+        usage.refresh(
+            relation,
+            getattr(instance, '_usage_cleared', {}).pop(relation, ())
+        )
+
+
+@receiver(pre_delete, sender=Recipe)
+def recipe_deleting(sender, instance, **kwargs):
+    '''Uncount a recipe from its tags and ingredients'''
+    usage.release(instance.pk)
+
+
+@receiver(pre_save, sender=Tag)
+@receiver(pre_save, sender=Ingredient)
+def title_saving(sender, instance, update_fields=None, **kwargs):
+    '''Remember whether a saved tag or ingredient is being renamed'''
+    instance._title_renamed = False
+    if instance.pk is None:
+        return
+    if update_fields is not None and 'title' not in update_fields:
+        return
+    stored = sender.objects.filter(pk=instance.pk).values_list(
+        'title', flat=True
+    ).first()
+    instance._title_renamed = stored is not None and stored != instance.title
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+def title_saved(sender, instance, created, **kwargs):
+    '''Reindex and touch the recipes using a renamed tag or ingredient'''
+    if not created and getattr(instance, '_title_renamed', False):
+        recipes_changed(
+            instance.user_id,
+            instance.recipe_set.values_list('id', flat=True)
+        )
+
+
+@receiver(pre_delete, sender=Tag)
+@receiver(pre_delete, sender=Ingredient)
+def title_deleting(sender, instance, **kwargs):
+    '''Remember which recipes a tag or ingredient is leaving'''
+    instance._search_recipe_ids = list(
+        instance.recipe_set.values_list('id', flat=True)
+    )
+
+
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def title_deleted(sender, instance, **kwargs):
+    '''Reindex and touch the recipes a deleted tag or ingredient was on'''
+    recipes_changed(
+        instance.user_id, getattr(instance, '_search_recipe_ids', ())
+    )
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def owned_object_changed(sender, instance, **kwargs):
+    '''Invalidate the owner's cached recipe responses'''
+    bump_version(instance.user_id)
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredient)
+def owned_object_saved(sender, instance, **kwargs):
+    '''Log a created or updated object for delta sync'''
+    if sender is Recipe and _note_write('saved', instance):
+        return
+    changes.record(instance.user_id, sender, [instance.pk])
+
+
+@receiver(post_delete, sender=Recipe)
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredient)
+def owned_object_deleted(sender, instance, **kwargs):
+    '''Leave a tombstone for a deleted object'''
+    changes.record(
+        instance.user_id, sender, [instance.pk], ChangeLogEntry.DELETE
+    )
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredients.through)
+def relations_changed(sender, instance, action, **kwargs):
+    '''Invalidate cached responses when tags or ingredients are linked'''
+    if action.startswith('post_'):
+        bump_version(instance.user_id)
+
+
+@receiver(post_save, sender=RecipeImageVariant)
+@receiver(post_delete, sender=RecipeImageVariant)
+def image_variant_changed(sender, instance, **kwargs):
+    '''Invalidate cached responses when a recipe's images change'''
+    bump_version(instance.recipe.user_id)
+
+
+@receiver(post_save, sender=get_user_model())
+def user_created(sender, instance, created, **kwargs):
+    '''Start new users on a fresh version, in case their id is reused'''
+    if created:
+        bump_version(instance.pk)
+
+
+@receiver(post_delete, sender=get_user_model())
+def user_deleted(sender, instance, **kwargs):
+    '''Clear the change log of a deleted user'''
+    changes.forget_user(instance.pk)
@@ -0,0 +1,127 @@
+from decimal import Decimal
+
+from django.db.models import Avg, Count, Max, Min, Q
+
+from core.conf import feature_settings
+from core.models import Recipe
+
+
+RECIPE_STATS_DEFAULTS = {
+    'TIME_BUCKETS': (15, 30, 60, 120),
+    'CACHE': True,
+}
+
+CENTS = Decimal('0.01')
+
+
+def recipe_stats_settings():
+    '''Return the recipe stats settings merged over the defaults'''
+    return feature_settings('RECIPE_STATS', RECIPE_STATS_DEFAULTS)
+
+
+def time_buckets():
+    '''Return (lower, upper) bounds in minutes, upper None for the last'''
+    bounds = sorted(recipe_stats_settings()['TIME_BUCKETS'])
+    return list(zip([0] + bounds, bounds + [None]))
+
+
+def _price(value):
+    '''Format a price the way the recipe serializers do'''
+    if value is None:
+        return None
+    return str(Decimal(value).quantize(CENTS))
+
+
+def _minutes(value):
+    return None if value is None else round(value, 1)
+
+
+def summary(recipes):
+    '''Return counts, price and time aggregates and a time histogram
+
+    Everything is computed by one aggregate query, the histogram with a
+    filtered COUNT per bucket rather than a query per bucket. The
+    recipes are selected by a semi-join on their ids, so annotations of
+    the listing such as the search rank, which full text functions only
+    allow next to their MATCH, stay out of the aggregate.
+    '''
+    buckets = time_buckets()
+    aggregates = {
+        'count': Count('pk'),
+        'avg_price': Avg('price'),
+        'min_price': Min('price'),
+        'max_price': Max('price'),
+        'avg_time': Avg('time_minutes'),
+        'min_time': Min('time_minutes'),
+        'max_time': Max('time_minutes'),
+    }
+    for i, (lower, upper) in enumerate(buckets):
+        bucket = Q(time_minutes__gt=lower) if i else Q()
+        if upper is not None:
+            bucket &= Q(time_minutes__lte=upper)
+        aggregates[f'bucket_{i}'] = Count('pk', filter=bucket)
+    row = Recipe.objects.filter(
+        pk__in=recipes.order_by().values('pk')
+    ).aggregate(**aggregates)
+
+    return {
+        'count': row['count'],
+        'price': {
+            'avg': _price(row['avg_price']),
+            'min': _price(row['min_price']),
+            'max': _price(row['max_price']),
+        },
+        'time_minutes': {
+            'avg': _minutes(row['avg_time']),
+            'min': row['min_time'],
+            'max': row['max_time'],
+        },
+        'time_histogram': [
+            {
+                'min_minutes': lower + 1 if i else 0,
+                'max_minutes': upper,
+                'count': row[f'bucket_{i}'],
+            }
+            for i, (lower, upper) in enumerate(buckets)
+        ],
+    }
+
+
+def breakdown(recipes, relation):
+    '''Return per tag or ingredient counts and averages over recipes
+
+    One GROUP BY over the through table joined to both sides, limited
+    to the given recipes by a semi-join, most used first.
+    '''
+    m2m = Recipe._meta.get_field(relation)
+    recipe_field = m2m.m2m_field_name()
+    related_field = m2m.m2m_reverse_field_name()
+    rows = m2m.remote_field.through.objects.filter(**{
+        f'{recipe_field}__in': recipes.order_by().values('pk')
+    }).values(
+        f'{related_field}_id', f'{related_field}__title'
+    ).annotate(
+        count=Count('pk'),
+        avg_price=Avg(f'{recipe_field}__price'),
+        avg_time=Avg(f'{recipe_field}__time_minutes'),
+    ).order_by('-count', f'{related_field}__title')
+
+    return [
+        {
+            'id': row[f'{related_field}_id'],
+            'title': row[f'{related_field}__title'],
+            'count': row['count'],
+            'avg_price': _price(row['avg_price']),
+            'avg_time_minutes': _minutes(row['avg_time']),
+        }
+        for row in rows
+    ]
+
+
+def recipe_stats(recipes):
+    '''Return the stats of a queryset of recipes, in three queries'''
+    return {
+        **summary(recipes),
+        'tags': breakdown(recipes, 'tags'),
+        'ingredients': breakdown(recipes, 'ingredients'),
+    }
@@ -0,0 +1,13 @@
+from core.models import Recipe
+
+
+def sample_recipe(user, **kwargs):
+    '''Creates and returns a sample recipe'''
+    defaults = {
+        'title': 'Sample Recipe',
+        'time_minutes': 10,
+        'price': 5.00
+    }
+    defaults.update(kwargs)
+
+    return Recipe.objects.create(user=user, **defaults)
@@ -0,0 +1,164 @@
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Tag, Ingredient
+
+from recipe import autocomplete
+
+
+TAGS_AUTOCOMPLETE_URL = reverse('recipe:tag-autocomplete')
+INGREDIENTS_AUTOCOMPLETE_URL = reverse('recipe:ingredient-autocomplete')
+
+
+class TitleIndexTest(TestCase):
+
+    '''Test the in-memory title index and its cache'''
+
+    def test_search(self):
+        '''Test lookups ignore case and stop at the limit'''
+        index = autocomplete.TitleIndex(
+            [(1, 'vegetable'), (2, 'Vegan'), (3, 'Beef'), (4, 'VEAL')]
+        )
+
+        self.assertEqual(
+            [entry['title'] for entry in index.search('ve', 10)],
+            ['VEAL', 'Vegan', 'vegetable']
+        )
+        self.assertEqual(len(index.search('VE', 2)), 2)
+        self.assertEqual(index.search('x', 10), [])
+
+    def test_least_recently_used_evicted(self):
+        '''Test the cache keeps the most recently used indexes'''
+        indexes = autocomplete.TitleIndexCache()
+        indexes.put('a', 1, 'index a', 2)
+        indexes.put('b', 1, 'index b', 2)
+        indexes.get('a', 1)
+        indexes.put('c', 1, 'index c', 2)
+
+        self.assertEqual(indexes.get('a', 1), 'index a')
+        self.assertIsNone(indexes.get('b', 1))
+        self.assertIsNone(indexes.get('a', 2))
+
+
+class PrivateAutocompleteApiTest(TestCase):
+
+    '''Test title suggestions for the authenticated user'''
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'testuser@company.com',
+            'Test1234'
+        )
+        self.client.force_authenticate(self.user)
+        autocomplete.indexes.clear()
+
+        for title in ('Vegan', 'vegetarian', 'Dessert', 'Veal'):
+            Tag.objects.create(user=self.user, title=title)
+        other = get_user_model().objects.create_user(
+            'other@company.com',
+            'Test1234'
+        )
+        Tag.objects.create(user=other, title='Venison')
+
+    def titles(self, response):
+        return [item['title'] for item in response.data]
+
+    def test_prefix_ignores_case(self):
+        '''Test the user's titles starting with the prefix are suggested'''
+        response = self.client.get(TAGS_AUTOCOMPLETE_URL, {'prefix': 'vE'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            self.titles(response), ['Veal', 'Vegan', 'vegetarian']
+        )
+        self.assertEqual(set(response.data[0]), {'id', 'title'})
+
+    def test_limit(self):
+        '''Test limit caps the suggestions, up to MAX_LIMIT'''
+        response = self.client.get(
+            TAGS_AUTOCOMPLETE_URL, {'prefix': 've', 'limit': 2}
+        )
+
+        self.assertEqual(self.titles(response), ['Veal', 'Vegan'])
+
+        with override_settings(AUTOCOMPLETE={'MAX_LIMIT': 1}):
+            response = self.client.get(
+                TAGS_AUTOCOMPLETE_URL, {'prefix': 've', 'limit': 5}
+            )
+
+        self.assertEqual(self.titles(response), ['Veal'])
+
+    def test_invalid_params(self):
+        '''Test a missing prefix or a bad limit is rejected'''
+        missing = self.client.get(TAGS_AUTOCOMPLETE_URL)
+        limit = self.client.get(
+            TAGS_AUTOCOMPLETE_URL, {'prefix': 've', 'limit': 0}
+        )
+
+        self.assertEqual(missing.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(limit.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_keystrokes_served_from_memory(self):
+        '''Test lookups after the first don't query the database'''
+        with self.assertNumQueries(1):
+            self.client.get(TAGS_AUTOCOMPLETE_URL, {'prefix': 'v'})
+        with self.assertNumQueries(0):
+            response = self.client.get(
+                TAGS_AUTOCOMPLETE_URL, {'prefix': 'veg'}
+            )
+
+        self.assertEqual(self.titles(response), ['Vegan', 'vegetarian'])
+
+    def test_write_invalidates(self):
+        '''Test a new tag is suggested straight after it is created'''
+        self.client.get(TAGS_AUTOCOMPLETE_URL, {'prefix': 've'})
+        Tag.objects.create(user=self.user, title='Veggie')
+
+        response = self.client.get(TAGS_AUTOCOMPLETE_URL, {'prefix': 've'})
+
+        self.assertIn('Veggie', self.titles(response))
+
+    @override_settings(AUTOCOMPLETE={'CACHED_USERS': 0})
+    def test_database_lookup(self):
+        '''Test lookups query the prefix index when nothing is cached'''
+        for _ in range(2):
+            with self.assertNumQueries(1):
+                response = self.client.get(
+                    TAGS_AUTOCOMPLETE_URL, {'prefix': 'vE'}
+                )
+
+        self.assertEqual(
+            self.titles(response), ['Veal', 'Vegan', 'vegetarian']
+        )
+
+    def test_memory_and_database_agree(self):
+        '''Test titles equal ignoring case come in the same order'''
+        for title in ('VEGAN', 'vegan', 'VeGaN'):
+            Tag.objects.create(user=self.user, title=title)
+
+        memory = self.client.get(TAGS_AUTOCOMPLETE_URL, {'prefix': 'veg'})
+        with override_settings(AUTOCOMPLETE={'CACHED_USERS': 0}):
+            database = self.client.get(
+                TAGS_AUTOCOMPLETE_URL, {'prefix': 'veg'}
+            )
+
+        self.assertEqual(memory.data, database.data)
+        self.assertEqual(
+            self.titles(memory),
+            ['Vegan', 'VEGAN', 'vegan', 'VeGaN', 'vegetarian']
+        )
+
+    def test_ingredients(self):
+        '''Test ingredient titles are suggested from their own index'''
+        Ingredient.objects.create(user=self.user, title='Vanilla')
+
+        response = self.client.get(
+            INGREDIENTS_AUTOCOMPLETE_URL, {'prefix': 'v'}
+        )
+
+        self.assertEqual(self.titles(response), ['Vanilla'])
@@ -0,0 +1,163 @@
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase, override_settings
+
+from recipe import benchmark
+from user.authentication import token_cache
+
+
+def result(p50_ms, queries):
+    '''Return a scenario result with the given p50 and query count'''
+    return {'p50_ms': p50_ms, 'p99_ms': p50_ms * 2, 'rps': 100.0,
+            'queries': queries, 'errors': 0}
+
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def stored_files():
+    '''Return the paths of every file under MEDIA_ROOT'''
+    return [
+        os.path.join(root, name)
+        for root, _, names in os.walk(MEDIA_ROOT) for name in names
+    ]
+
+
+class BenchmarkHelpersTest(TestCase):
+
+    '''Test the percentile and baseline comparison helpers'''
+
+    def test_percentile_nearest_rank(self):
+        '''Test percentiles pick an observed value by nearest rank'''
+        values = list(range(1, 101))
+
+        self.assertEqual(benchmark.percentile(values, 50), 50)
+        self.assertEqual(benchmark.percentile(values, 99), 99)
+        self.assertEqual(benchmark.percentile([7], 99), 7)
+
+    def test_compare_flags_extra_queries(self):
+        '''Test any increase in queries per request is a regression'''
+        regressions = benchmark.compare(
+            {'recipes.list': result(1.0, 4)},
+            {'recipes.list': result(1.0, 3)},
+            tolerance=0.5
+        )
+
+        self.assertEqual(len(regressions), 1)
+        self.assertIn('4 queries', regressions[0])
+
+    def test_compare_tolerates_latency_noise(self):
+        '''Test p50 only regresses beyond the tolerance and slack'''
+        baseline = {'recipes.list': result(10.0, 3)}
+
+        within = benchmark.compare(
+            {'recipes.list': result(15.5, 3)}, baseline, tolerance=0.5
+        )
+        beyond = benchmark.compare(
+            {'recipes.list': result(16.5, 3)}, baseline, tolerance=0.5
+        )
+
+        self.assertEqual(within, [])
+        self.assertEqual(len(beyond), 1)
+
+
+@override_settings(
+    MEDIA_ROOT=MEDIA_ROOT,
+    IMAGE_PROCESSING={'ASYNC': False},
+)
+class BenchApiCommandTest(TestCase):
+
+    '''Smoke test the load test command on a tiny library'''
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def run_command(self, *args, stderr=None):
+        '''Run bench_api at a tiny scale and return its output'''
+        out = StringIO()
+        call_command(
+            'bench_api', '--recipes', '60', '--tags', '5',
+            '--ingredients', '5', '--iterations', '2', '--warmup', '0',
+            *args, stdout=out, stderr=stderr or StringIO()
+        )
+        return out.getvalue()
+
+    def test_every_scenario_succeeds(self):
+        '''Test each endpoint scenario runs without errors'''
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'baseline.json')
+            self.run_command('--save-baseline', path)
+            with open(path) as baseline_file:
+                baseline = json.load(baseline_file)
+
+        names = {scenario.name for scenario in benchmark.SCENARIOS}
+        self.assertEqual(set(baseline['results']), names)
+        for name, summary in baseline['results'].items():
+            self.assertEqual(summary['errors'], 0, name)
+            self.assertIsNotNone(summary['queries'], name)
+
+    def test_regression_against_baseline_fails(self):
+        '''Test a baseline with fewer queries makes the command fail'''
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'baseline.json')
+            with open(path, 'w') as baseline_file:
+                json.dump({
+                    'scale': {},
+                    'results': {'recipes.detail': result(1000.0, 0)},
+                }, baseline_file)
+
+            err = StringIO()
+            with self.assertRaises(CommandError):
+                self.run_command('--only', 'recipes.detail',
+                                 '--baseline', path, stderr=err)
+
+        self.assertIn('Warning: baseline was recorded at', err.getvalue())
+
+    def test_token_lookup_not_counted(self):
+        '''Test query counts don't change when the token cache expires'''
+        request = benchmark.TestClientTransport.request
+
+        def request_then_expire(transport, *args, **kwargs):
+            try:
+                return request(transport, *args, **kwargs)
+            finally:
+                token_cache.clear()
+
+        with tempfile.TemporaryDirectory() as directory:
+            counts = []
+            for transport_request in (request, request_then_expire):
+                path = os.path.join(directory, 'baseline.json')
+                with mock.patch.object(benchmark.TestClientTransport,
+                                       'request', transport_request):
+                    self.run_command('--only', 'recipes',
+                                     '--save-baseline', path)
+                with open(path) as baseline_file:
+                    results = json.load(baseline_file)['results']
+                counts.append({
+                    name: summary['queries']
+                    for name, summary in results.items()
+                })
+
+        self.assertEqual(counts[0], counts[1])
+
+    def test_uploads_removed(self):
+        '''Test the images uploaded by the run are deleted afterwards'''
+        self.run_command('--only', 'recipes.upload_image')
+
+        self.assertEqual(stored_files(), [])
+
+    @override_settings(IMAGE_PROCESSING={'ASYNC': True})
+    def test_pending_uploads_removed(self):
+        '''Test uploads queued but never processed are deleted too'''
+        self.run_command('--only', 'recipes.upload_image')
+
+        self.assertEqual(stored_files(), [])
@@ -0,0 +1,294 @@
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Tag, Ingredient, Recipe
+
+from recipe.tests.helpers import sample_recipe
+
+
+RECIPES_BULK_URL = reverse('recipe:recipe-bulk')
+TAGS_BULK_URL = reverse('recipe:tag-bulk')
+INGREDIENTS_BULK_URL = reverse('recipe:ingredient-bulk')
+
+
+class PublicBulkApiTest(TestCase):
+
+    '''Test unauthenticated bulk API access'''
+
+    def test_auth_required(self):
+        '''Test that authentication is required for bulk endpoints'''
+        response = APIClient().post(RECIPES_BULK_URL, [], format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PrivateBulkApiTest(TestCase):
+
+    '''Test authenticated bulk create, update and delete'''
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'testuser@company.com',
+            'Test1234'
+        )
+        self.client.force_authenticate(self.user)
+        self.tag = Tag.objects.create(user=self.user, title='Vegan')
+        self.ingredient = Ingredient.objects.create(
+            user=self.user,
+            title='Tofu'
+        )
+
+    def test_bulk_create_recipes(self):
+        '''Test creating many recipes with relations in one request'''
+        payload = [
+            {
+                'title': f'Recipe {i}',
+                'time_minutes': 10,
+                'price': '5.00',
+                'tags': [self.tag.id],
+                'ingredients': [self.ingredient.id],
+            }
+            for i in range(3)
+        ]
+
+        response = self.client.post(RECIPES_BULK_URL, payload, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(response.data), 3)
+        for item, result in zip(payload, response.data):
+            recipe = Recipe.objects.get(id=result['data']['id'])
+            self.assertEqual(recipe.title, item['title'])
+            self.assertEqual(list(recipe.tags.all()), [self.tag])
+            self.assertEqual(result['data']['tags'], [self.tag.id])
+
+    def test_bulk_create_query_count_is_flat(self):
+        '''Test bulk create does not query once per recipe'''
+        def payload(count):
+            return [
+                {
+                    'title': f'Recipe {i}',
+                    'time_minutes': 10,
+                    'price': '5.00',
+                    'tags': [self.tag.id],
+                    'ingredients': [self.ingredient.id],
+                }
+                for i in range(count)
+            ]
+
+        with self.assertNumQueries(16):
+            self.client.post(RECIPES_BULK_URL, payload(2), format='json')
+        with self.assertNumQueries(16):
+            self.client.post(RECIPES_BULK_URL, payload(50), format='json')
+
+        self.assertEqual(Recipe.objects.count(), 52)
+
+    def test_bulk_create_reports_invalid_items(self):
+        '''Test invalid items are reported while valid ones are created'''
+        user2 = get_user_model().objects.create_user(
+            'testuser2@company.com',
+            'Test4567'
+        )
+        other_tag = Tag.objects.create(user=user2, title='Not mine')
+        payload = [
+            {'title': 'Good', 'time_minutes': 10, 'price': '5.00'},
+            {'title': 'No price', 'time_minutes': 10},
+            {
+                'title': 'Foreign tag',
+                'time_minutes': 10,
+                'price': '5.00',
+                'tags': [other_tag.id]
+            },
+        ]
+
+        response = self.client.post(RECIPES_BULK_URL, payload, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual(
+            [result['status'] for result in response.data],
+            [201, 400, 400]
+        )
+        self.assertIn('price', response.data[1]['errors'])
+        self.assertIn('tags', response.data[2]['errors'])
+        self.assertEqual(
+            list(Recipe.objects.values_list('title', flat=True)),
+            ['Good']
+        )
+
+    def test_bulk_requires_list(self):
+        '''Test a body that is not a list is rejected'''
+        response = self.client.post(
+            RECIPES_BULK_URL,
+            {'title': 'Single'},
+            format='json'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_update_recipes(self):
+        '''Test partially updating many recipes in one request'''
+        recipe1 = sample_recipe(self.user, title='Old 1')
+        recipe2 = sample_recipe(self.user, title='Old 2')
+        recipe2.tags.add(self.tag)
+        new_tag = Tag.objects.create(user=self.user, title='Dessert')
+        payload = [
+            {'id': recipe1.id, 'title': 'New 1', 'price': '7.50'},
+            {'id': recipe2.id, 'tags': [new_tag.id]},
+            {'id': 999999, 'title': 'Missing'},
+        ]
+
+        response = self.client.patch(RECIPES_BULK_URL, payload, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual(
+            [result['status'] for result in response.data],
+            [200, 200, 404]
+        )
+        recipe1.refresh_from_db()
+        recipe2.refresh_from_db()
+        self.assertEqual(recipe1.title, 'New 1')
+        self.assertEqual(str(recipe1.price), '7.50')
+        self.assertEqual(recipe2.title, 'Old 2')
+        self.assertEqual(list(recipe2.tags.all()), [new_tag])
+        self.assertEqual(response.data[1]['data']['tags'], [new_tag.id])
+
+    def test_bulk_update_other_users_recipe(self):
+        '''Test recipes of other users can't be updated'''
+        user2 = get_user_model().objects.create_user(
+            'testuser2@company.com',
+            'Test4567'
+        )
+        recipe = sample_recipe(user2, title='Theirs')
+
+        response = self.client.patch(
+            RECIPES_BULK_URL,
+            [{'id': recipe.id, 'title': 'Mine'}],
+            format='json'
+        )
+
+        self.assertEqual(response.data[0]['status'], 404)
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.title, 'Theirs')
+
+    def test_bulk_delete_recipes(self):
+        '''Test deleting many recipes in one request'''
+        recipe1 = sample_recipe(self.user)
+        recipe2 = sample_recipe(self.user)
+        keep = sample_recipe(self.user)
+
+        response = self.client.delete(
+            RECIPES_BULK_URL,
+            {'ids': [recipe1.id, recipe2.id, 999999]},
+            format='json'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual(
+            [result['status'] for result in response.data],
+            [200, 200, 404]
+        )
+        self.assertEqual(list(Recipe.objects.all()), [keep])
+
+    def test_bulk_invalid_ids(self):
+        '''Test ids that aren't integers fail their item with a 400'''
+        recipe = sample_recipe(self.user, title='Kept')
+
+        update = self.client.patch(RECIPES_BULK_URL, [
+            {'id': [recipe.id], 'title': 'List'},
+            {'id': True, 'title': 'Bool'},
+            {'title': 'Missing'},
+            {'id': recipe.id, 'title': 'Renamed'},
+        ], format='json')
+        delete = self.client.delete(
+            RECIPES_BULK_URL, {'ids': [[recipe.id], False, {}]},
+            format='json'
+        )
+
+        self.assertEqual(update.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual(
+            [result['status'] for result in update.data],
+            [400, 400, 400, 200]
+        )
+        self.assertIn('id', update.data[0]['errors'])
+        self.assertEqual(delete.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual(
+            [result['status'] for result in delete.data], [400, 400, 400]
+        )
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.title, 'Renamed')
+
+    def test_bulk_create_tags(self):
+        '''Test creating many tags in one request'''
+        response = self.client.post(
+            TAGS_BULK_URL,
+            [{'title': 'Breakfast'}, {'title': 'Dinner'}],
+            format='json'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            [result['data']['title'] for result in response.data],
+            ['Breakfast', 'Dinner']
+        )
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 3)
+
+    def test_bulk_create_tags_duplicate_titles(self):
+        '''Test titles already used, or repeated in the batch, are rejected'''
+        response = self.client.post(
+            TAGS_BULK_URL,
+            [{'title': 'Vegan'}, {'title': 'Dinner'}, {'title': 'Dinner'}],
+            format='json'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_207_MULTI_STATUS)
+        self.assertEqual(
+            [result['status'] for result in response.data],
+            [400, 201, 400]
+        )
+        self.assertIn('title', response.data[0]['errors'])
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+
+    def test_bulk_update_ingredients(self):
+        '''Test renaming many ingredients in one request'''
+        response = self.client.patch(
+            INGREDIENTS_BULK_URL,
+            [{'id': self.ingredient.id, 'title': 'Silken Tofu'}],
+            format='json'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.ingredient.refresh_from_db()
+        self.assertEqual(self.ingredient.title, 'Silken Tofu')
+
+    def test_bulk_update_ingredient_keeps_own_title(self):
+        '''Test an item may keep its title but not take another's'''
+        other = Ingredient.objects.create(user=self.user, title='Rice')
+
+        response = self.client.patch(
+            INGREDIENTS_BULK_URL,
+            [{'id': self.ingredient.id, 'title': 'Tofu'},
+             {'id': other.id, 'title': 'Tofu'}],
+            format='json'
+        )
+
+        self.assertEqual(
+            [result['status'] for result in response.data],
+            [200, 400]
+        )
+        other.refresh_from_db()
+        self.assertEqual(other.title, 'Rice')
+
+    def test_bulk_delete_tags(self):
+        '''Test deleting many tags in one request'''
+        response = self.client.delete(
+            TAGS_BULK_URL,
+            {'ids': [self.tag.id]},
+            format='json'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(Tag.objects.exists())
@@ -0,0 +1,186 @@
+from datetime import timedelta
+
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import http_date
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Tag, Recipe
+
+from recipe.tests.helpers import sample_recipe
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+RECIPES_BULK_URL = reverse('recipe:recipe-bulk')
+TAGS_URL = reverse('recipe:tag-list')
+
+
+def detail_url(recipe_id):
+    '''Return recipe detail URL'''
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+def age(model, days, **filters):
+    '''Move updated_at of matching rows into the past'''
+    past = timezone.now() - timedelta(days=days)
+    model.objects.filter(**filters).update(updated_at=past)
+    return past
+
+
+class UpdatedAtTrackingTest(TestCase):
+
+    '''Test updated_at follows changes to recipes and their relations'''
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'testuser@company.com',
+            'Test1234'
+        )
+
+    def test_adding_tag_touches_recipe(self):
+        '''Test linking a tag moves the recipe's updated_at'''
+        recipe = sample_recipe(self.user)
+        past = age(Recipe, 1, pk=recipe.pk)
+
+        recipe.tags.add(Tag.objects.create(user=self.user, title='Vegan'))
+
+        recipe.refresh_from_db()
+        self.assertGreater(recipe.updated_at, past)
+
+    def test_renaming_tag_touches_recipe(self):
+        '''Test renaming a tag moves updated_at of recipes using it'''
+        tag = Tag.objects.create(user=self.user, title='Vegan')
+        recipe = sample_recipe(self.user)
+        recipe.tags.add(tag)
+        past = age(Recipe, 1, pk=recipe.pk)
+
+        tag.title = 'Plant based'
+        tag.save()
+
+        recipe.refresh_from_db()
+        self.assertGreater(recipe.updated_at, past)
+
+    def test_resaving_tag_leaves_recipe(self):
+        '''Test saving a tag without renaming it leaves its recipes'''
+        tag = Tag.objects.create(user=self.user, title='Vegan')
+        recipe = sample_recipe(self.user)
+        recipe.tags.add(tag)
+        past = age(Recipe, 1, pk=recipe.pk)
+
+        tag.save()
+
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.updated_at, past)
+
+    def test_bulk_relation_update_touches_recipe(self):
+        '''Test a bulk update changing only tags moves updated_at'''
+        client = APIClient()
+        client.force_authenticate(self.user)
+        tag = Tag.objects.create(user=self.user, title='Vegan')
+        recipe = sample_recipe(self.user)
+        past = age(Recipe, 1, pk=recipe.pk)
+
+        response = client.patch(
+            RECIPES_BULK_URL, [{'id': recipe.id, 'tags': [tag.id]}],
+            format='json'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        recipe.refresh_from_db()
+        self.assertGreater(recipe.updated_at, past)
+
+
+class ConditionalRequestTest(TestCase):
+
+    '''Test modified_since filtering and conditional GETs'''
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'testuser@company.com',
+            'Test1234'
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_modified_since_filters_recipes(self):
+        '''Test only recipes changed since the timestamp are listed'''
+        old = sample_recipe(self.user, title='Old')
+        age(Recipe, 2, pk=old.pk)
+        sample_recipe(self.user, title='New')
+        since = (timezone.now() - timedelta(days=1)).isoformat()
+
+        response = self.client.get(RECIPES_URL, {'modified_since': since})
+
+        self.assertEqual([r['title'] for r in response.data], ['New'])
+
+    def test_modified_since_filters_tags(self):
+        '''Test only tags changed since the timestamp are listed'''
+        Tag.objects.create(user=self.user, title='Old')
+        age(Tag, 2, user=self.user)
+        Tag.objects.create(user=self.user, title='New')
+        since = (timezone.now() - timedelta(days=1)).isoformat()
+
+        response = self.client.get(TAGS_URL, {'modified_since': since})
+
+        self.assertEqual([t['title'] for t in response.data], ['New'])
+
+    def test_invalid_modified_since_rejected(self):
+        '''Test a malformed modified_since is a 400'''
+        response = self.client.get(RECIPES_URL, {'modified_since': 'soon'})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_detail_sends_last_modified(self):
+        '''Test recipe detail carries a Last-Modified header'''
+        recipe = sample_recipe(self.user)
+
+        response = self.client.get(detail_url(recipe.id))
+
+        self.assertEqual(response['Last-Modified'],
+                         http_date(recipe.updated_at.timestamp()))
+
+    def test_if_modified_since_not_modified(self):
+        '''Test an unchanged recipe is a 304 without serializing it'''
+        recipe = sample_recipe(self.user)
+        last_modified = self.client.get(
+            detail_url(recipe.id)
+        )['Last-Modified']
+
+        with self.assertNumQueries(1):
+            response = self.client.get(detail_url(recipe.id),
+                                       HTTP_IF_MODIFIED_SINCE=last_modified)
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertFalse(response.content)
+
+    def test_if_modified_since_after_change(self):
+        '''Test a recipe changed after If-Modified-Since is returned'''
+        recipe = sample_recipe(self.user)
+        past = age(Recipe, 1, pk=recipe.pk)
+
+        response = self.client.get(
+            detail_url(recipe.id),
+            HTTP_IF_MODIFIED_SINCE=http_date(past.timestamp() - 60)
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['id'], recipe.id)
+
+    def test_tag_list_etag_not_modified(self):
+        '''Test the tag list answers If-None-Match until a tag changes'''
+        tag = Tag.objects.create(user=self.user, title='Vegan')
+        etag = self.client.get(TAGS_URL)['ETag']
+
+        unchanged = self.client.get(TAGS_URL, HTTP_IF_NONE_MATCH=etag)
+        tag.title = 'Plant based'
+        tag.save()
+        changed = self.client.get(TAGS_URL, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(unchanged.status_code,
+                         status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(changed.status_code, status.HTTP_200_OK)
+        self.assertEqual(changed.data[0]['title'], 'Plant based')
@@ -0,0 +1,101 @@
+import json
+from unittest.mock import patch
+
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Tag, Ingredient
+
+from recipe.serializers import RecipeDetailSerializer
+from recipe.tests.helpers import sample_recipe
+from recipe.views import RecipeViewSet
+
+
+EXPORT_URL = reverse('recipe:recipe-export')
+
+
+def read_lines(response):
+    '''Consume a streaming response and parse each NDJSON line'''
+    body = b''.join(response.streaming_content).decode('utf-8')
+    return [json.loads(line) for line in body.splitlines()]
+
+
+class PublicExportApiTest(TestCase):
+
+    '''Test unauthenticated export access'''
+
+    def test_auth_required(self):
+        '''Test that authentication is required to export'''
+        response = APIClient().get(EXPORT_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PrivateExportApiTest(TestCase):
+
+    '''Test streaming export of a user's recipes'''
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'testuser@company.com',
+            'Test1234'
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_export_streams_nested_recipes(self):
+        '''Test every recipe is exported with its tags and ingredients'''
+        recipe = sample_recipe(self.user, title='Dal Tadka')
+        recipe.tags.add(Tag.objects.create(user=self.user, title='Indian'))
+        recipe.ingredients.add(
+            Ingredient.objects.create(user=self.user, title='Daal')
+        )
+        recipe.refresh_from_db()
+        sample_recipe(self.user, title='Crab Curry')
+
+        response = self.client.get(EXPORT_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = read_lines(response)
+        self.assertEqual([line['title'] for line in lines],
+                         ['Dal Tadka', 'Crab Curry'])
+        expected = json.loads(json.dumps(
+            RecipeDetailSerializer(recipe).data
+        ))
+        self.assertEqual(lines[0], expected)
+
+    def test_export_limited_to_user(self):
+        '''Test only the authenticated user's recipes are exported'''
+        user2 = get_user_model().objects.create_user(
+            'testuser2@company.com',
+            'Test4567'
+        )
+        sample_recipe(user2, title='Not mine')
+        sample_recipe(self.user, title='Mine')
+
+        lines = read_lines(self.client.get(EXPORT_URL))
+
+        self.assertEqual([line['title'] for line in lines], ['Mine'])
+
+    @patch.object(RecipeViewSet, 'export_chunk_size', 2)
+    def test_export_queries_per_chunk(self):
+        '''Test recipes are fetched in chunks with prefetched relations'''
+        for i in range(5):
+            recipe = sample_recipe(self.user, title=f'Recipe {i}')
+            recipe.tags.add(
+                Tag.objects.create(user=self.user, title=f'Tag {i}')
+            )
+
+        response = self.client.get(EXPORT_URL)
+
+        '''3 chunks of 4 queries each, plus the final empty chunk'''
+        with self.assertNumQueries(13):
+            lines = read_lines(response)
+        self.assertEqual(len(lines), 5)
+        self.assertEqual(lines[4]['tags'][0]['title'], 'Tag 4')
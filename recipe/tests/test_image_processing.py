@@ -0,0 +1,250 @@
+import io
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from unittest import mock
+
+from PIL import Image
+
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.db import transaction
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, RecipeImageJob
+
+from recipe import images
+
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def recipe_detail_url(recipe_id):
+    '''Creates and returns recipe detail url'''
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+def recipe_image_url(recipe_id):
+    '''Creates and returns recipe image upload url'''
+    return reverse('recipe:recipe-upload-image', args=[recipe_id])
+
+
+def sample_image(size=(1200, 900), image_format='JPEG', **save_kwargs):
+    '''Returns an in-memory image file of the given size'''
+    file = io.BytesIO()
+    Image.new('RGB', size, color='red').save(
+        file, format=image_format, **save_kwargs
+    )
+    file.name = f'upload.{image_format.lower()}'
+    file.seek(0)
+    return file
+
+
+@override_settings(
+    MEDIA_ROOT=MEDIA_ROOT,
+    IMAGE_PROCESSING={'ASYNC': False, 'MAX_SIZE': 1000}
+)
+class RecipeImageProcessingTest(TestCase):
+
+    '''Test background processing of uploaded recipe images'''
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'testuser@company.com',
+            'Test1234'
+        )
+        self.client.force_authenticate(self.user)
+        self.recipe = Recipe.objects.create(
+            user=self.user,
+            title='Sample Recipe',
+            time_minutes=10,
+            price=5
+        )
+
+    def upload(self, file):
+        '''Upload file as the recipe image and return the response'''
+        return self.client.post(
+            recipe_image_url(self.recipe.id),
+            {'image': file},
+            format='multipart'
+        )
+
+    def test_variants_generated(self):
+        '''Test every configured size is generated in every format'''
+        response = self.upload(sample_image())
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        variants = self.recipe.image_variants.all()
+        self.assertEqual(
+            sorted((v.name, v.format) for v in variants),
+            [
+                ('medium', 'jpeg'), ('medium', 'webp'),
+                ('thumbnail', 'jpeg'), ('thumbnail', 'webp'),
+            ]
+        )
+        thumbnail = variants.get(name='thumbnail', format='webp')
+        self.assertEqual((thumbnail.width, thumbnail.height), (200, 150))
+        with Image.open(thumbnail.image.path) as image:
+            self.assertEqual(image.format, 'WEBP')
+
+    def test_main_image_resized(self):
+        '''Test the stored recipe image is capped at MAX_SIZE'''
+        self.upload(sample_image(size=(3000, 1500)))
+
+        self.recipe.refresh_from_db()
+        with Image.open(self.recipe.image.path) as image:
+            self.assertEqual(image.size, (1000, 500))
+
+    def test_metadata_stripped(self):
+        '''Test EXIF data from the upload is not kept'''
+        exif = Image.Exif()
+        exif[0x010f] = 'Camera Maker'
+        self.upload(sample_image(exif=exif.tobytes()))
+
+        self.recipe.refresh_from_db()
+        with Image.open(self.recipe.image.path) as image:
+            self.assertNotIn('exif', image.info)
+
+    def test_variants_exposed_on_detail(self):
+        '''Test the recipe detail lists the variant urls once ready'''
+        self.upload(sample_image())
+
+        response = self.client.get(recipe_detail_url(self.recipe.id))
+
+        self.assertEqual(len(response.data['image_variants']), 4)
+        self.assertTrue(
+            response.data['image_variants'][0]['image'].startswith('http')
+        )
+
+    def test_reupload_replaces_variants(self):
+        '''Test a new upload replaces the previous variants'''
+        self.upload(sample_image())
+        self.upload(sample_image(size=(400, 400)))
+
+        self.assertEqual(self.recipe.image_variants.count(), 4)
+
+    def stored_images(self):
+        '''Return the paths of the recipe's image and variant files'''
+        self.recipe.refresh_from_db()
+        return [self.recipe.image.path] + [
+            variant.image.path for variant in self.recipe.image_variants.all()
+        ]
+
+    def media_files(self):
+        '''Return the paths of every file under MEDIA_ROOT'''
+        return {
+            os.path.join(root, name)
+            for root, _, names in os.walk(MEDIA_ROOT) for name in names
+        }
+
+    def test_reupload_deletes_replaced_files(self):
+        '''Test the replaced files are deleted once the upload commits'''
+        self.upload(sample_image())
+        replaced = self.stored_images()
+
+        with mock.patch.object(transaction, 'on_commit', lambda f: f()):
+            self.upload(sample_image(size=(400, 400)))
+
+        self.assertFalse(any(os.path.exists(path) for path in replaced))
+        self.assertTrue(all(os.path.exists(p) for p in self.stored_images()))
+
+    def test_failed_render_keeps_replaced_files(self):
+        '''Test a failed re-render keeps the old files, not the new ones'''
+        self.upload(sample_image())
+        replaced = self.stored_images()
+        before = self.media_files()
+        encode = images.encode
+
+        def fail_webp(image, image_format):
+            if image_format == 'webp':
+                raise OSError('encoder error')
+            return encode(image, image_format)
+
+        with mock.patch.object(images, 'encode', fail_webp):
+            response = self.upload(sample_image(size=(400, 400)))
+
+        self.assertEqual(response.data['status'], RecipeImageJob.FAILED)
+        self.assertEqual(self.stored_images(), replaced)
+        self.assertEqual(self.media_files(), before)
+
+    def test_oversized_image_fails_job(self):
+        '''Test images above MAX_PIXELS are rejected by the worker'''
+        options = {'ASYNC': False, 'MAX_PIXELS': 100}
+        with self.settings(IMAGE_PROCESSING=options):
+            response = self.upload(sample_image(size=(20, 20)))
+
+        self.assertEqual(response.data['status'], RecipeImageJob.FAILED)
+        self.assertIn('too large', response.data['error'])
+        self.assertEqual(self.recipe.image_variants.count(), 0)
+
+    @override_settings(IMAGE_PROCESSING={'ASYNC': True})
+    def test_async_upload_returns_pending(self):
+        '''Test uploads are accepted before the image is processed'''
+        response = self.upload(sample_image())
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data['status'], RecipeImageJob.PENDING)
+        self.assertEqual(self.recipe.image_variants.count(), 0)
+
+    def test_process_image_jobs_command(self):
+        '''Test the management command drains pending jobs'''
+        job = RecipeImageJob(recipe=self.recipe)
+        job.source.save('upload.jpg', ContentFile(sample_image().read()))
+
+        call_command('process_image_jobs', stdout=io.StringIO())
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, RecipeImageJob.DONE)
+        self.assertFalse(job.source)
+
+    def test_job_processed_once(self):
+        '''Test a job already claimed by a worker is skipped'''
+        job = RecipeImageJob(
+            recipe=self.recipe,
+            status=RecipeImageJob.PROCESSING
+        )
+        job.source.save('upload.jpg', ContentFile(sample_image().read()))
+
+        images.process_job(job.id)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, RecipeImageJob.PROCESSING)
+
+    def test_running_job_not_requeued(self):
+        '''Test a job claimed long after it was queued is not requeued'''
+        job = RecipeImageJob(recipe=self.recipe)
+        job.source.save('upload.jpg', ContentFile(sample_image().read()))
+        RecipeImageJob.objects.filter(pk=job.pk).update(
+            updated_at=timezone.now() - timedelta(hours=1)
+        )
+        load_clean_image = images.load_clean_image
+        loads = []
+
+        def load_while_draining(source):
+            '''Run the requeue command while the job is being processed'''
+            loads.append(source.name)
+            if len(loads) == 1:
+                call_command('process_image_jobs', stdout=io.StringIO())
+            return load_clean_image(source)
+
+        with mock.patch.object(
+            images, 'load_clean_image', load_while_draining
+        ):
+            images.process_job(job.id)
+
+        job.refresh_from_db()
+        self.assertEqual(len(loads), 1)
+        self.assertEqual(job.status, RecipeImageJob.DONE)
@@ -26,7 +26,7 @@ class PublicIngredientsApiTests(TestCase):
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
 
 
-class PrivateIngredientsApiTests:
+class PrivateIngredientsApiTests(TestCase):
 
     '''Test the private ingredient endpoint'''
     def setUp(self):
@@ -110,3 +110,24 @@ class PrivateIngredientsApiTests:
         serializer2 = IngredientSerializer(ingredient2)
         self.assertIn(serializer1.data, response.data)
         self.assertNotIn(serializer2.data, response.data)
+
+    def test_retrieve_ingredients_assigned_unique(self):
+        '''Test assigned_only returns an ingredient once per listing'''
+        ingredient = Ingredient.objects.create(user=self.user, title='Eggs')
+        Ingredient.objects.create(user=self.user, title='Cheese')
+        for title in ('Omelette', 'Frittata'):
+            recipe = Recipe.objects.create(
+                user=self.user,
+                title=title,
+                time_minutes=10,
+                price=4.00
+            )
+            recipe.ingredients.add(ingredient)
+
+        response = self.client.get(
+            INGREDIENTS_URL, {'assigned_only': 1, 'recipe_count': 1}
+        )
+
+        self.assertEqual(len(response.data), 1)
+        self.assertEqual(response.data[0]['id'], ingredient.id)
+        self.assertEqual(response.data[0]['recipe_count'], 2)
@@ -0,0 +1,157 @@
+import re
+from base64 import b64encode
+from urllib.parse import urlencode
+
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Tag, Recipe
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+
+
+def next_link(response, rel='next'):
+    '''Return the url of rel from the response Link header, if any'''
+    match = re.search(
+        f'<([^>]+)>; rel="{rel}"', response.get('Link', '')
+    )
+    return match.group(1) if match else None
+
+
+def encode_cursor(position):
+    '''Return a cursor token seeking past position, as the API encodes it'''
+    query = urlencode({'p': position}, doseq=True)
+    return b64encode(query.encode('ascii')).decode('ascii')
+
+
+class CursorPaginationTest(TestCase):
+
+    '''Test cursor pagination of the recipe API listings'''
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'testuser@company.com',
+            'Test1234'
+        )
+        self.client.force_authenticate(self.user)
+
+    def collect_pages(self, url, params):
+        '''Follow next links from url and return every page body'''
+        pages = []
+        response = self.client.get(url, params)
+        while True:
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            pages.append(response.data)
+            url = next_link(response)
+            if not url:
+                return pages
+            response = self.client.get(url)
+
+    def test_recipes_paged_newest_first(self):
+        '''Test walking recipe pages returns every recipe exactly once'''
+        for i in range(5):
+            Recipe.objects.create(
+                user=self.user,
+                title=f'Recipe {i}',
+                time_minutes=10,
+                price=5
+            )
+
+        pages = self.collect_pages(RECIPES_URL, {'page_size': 2})
+
+        self.assertEqual([len(page) for page in pages], [2, 2, 1])
+        ids = [recipe['id'] for page in pages for recipe in page]
+        expected = list(
+            Recipe.objects.order_by('-id').values_list('id', flat=True)
+        )
+        self.assertEqual(ids, expected)
+
+    def test_tags_with_similar_titles_paged_stably(self):
+        '''Test tags with close titles are neither skipped nor repeated'''
+        for title in ['Vegan', 'vegan', 'Vegan ', 'Dessert', 'Curry']:
+            Tag.objects.create(user=self.user, title=title)
+
+        pages = self.collect_pages(TAGS_URL, {'page_size': 2})
+
+        ids = [tag['id'] for page in pages for tag in page]
+        expected = list(
+            Tag.objects.order_by('-title', '-id').values_list('id', flat=True)
+        )
+        self.assertEqual(ids, expected)
+
+    def test_tied_usage_paged_past_offset_cutoff(self):
+        '''Test more tags tied on usage than the offset cap are all paged'''
+        Tag.objects.bulk_create([
+            Tag(user=self.user, title=f'Tag {i:04}') for i in range(1300)
+        ])
+
+        pages = self.collect_pages(
+            TAGS_URL, {'ordering': 'usage', 'page_size': 100}
+        )
+
+        titles = [tag['title'] for page in pages for tag in page]
+        self.assertEqual(len(pages), 13)
+        self.assertEqual(
+            titles, [f'Tag {i:04}' for i in reversed(range(1300))]
+        )
+
+    def test_composite_cursor_pages_backwards(self):
+        '''Test the previous link of a composite cursor page goes back'''
+        for i in range(5):
+            Tag.objects.create(user=self.user, title=f'Tag {i}')
+        first = self.client.get(
+            TAGS_URL, {'ordering': 'usage', 'page_size': 2}
+        )
+        second = self.client.get(next_link(first))
+
+        previous = self.client.get(next_link(second, 'previous'))
+
+        self.assertEqual(previous.data, first.data)
+        self.assertIsNone(next_link(previous, 'previous'))
+
+    def test_cursor_is_opaque(self):
+        '''Test the next link carries an encoded cursor, not an offset'''
+        for i in range(3):
+            Tag.objects.create(user=self.user, title=f'Tag {i}')
+
+        response = self.client.get(TAGS_URL, {'page_size': 1})
+
+        link = next_link(response)
+        self.assertIn('cursor=', link)
+        self.assertNotIn('offset=', link)
+
+    def test_single_page_has_no_link_header(self):
+        '''Test a listing that fits one page has no Link header'''
+        Tag.objects.create(user=self.user, title='Vegan')
+
+        response = self.client.get(TAGS_URL)
+
+        self.assertEqual(len(response.data), 1)
+        self.assertNotIn('Link', response)
+
+    def test_invalid_cursor(self):
+        '''Test an invalid cursor is rejected'''
+        response = self.client.get(RECIPES_URL, {'cursor': 'bogus'})
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_invalid_composite_cursor_values(self):
+        '''Test a composite cursor with values of the wrong type is rejected'''
+        Tag.objects.create(user=self.user, title='Vegan')
+
+        for position in ('["abc","x"]', '[{"a":1},"x"]', '[null,"x"]'):
+            response = self.client.get(TAGS_URL, {
+                'ordering': 'usage',
+                'cursor': encode_cursor(position),
+            })
+
+            self.assertEqual(
+                response.status_code, status.HTTP_404_NOT_FOUND, position
+            )
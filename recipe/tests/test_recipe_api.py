@@ -1,9 +1,10 @@
+import shutil
 import tempfile
 import os
 
 from PIL import Image
 
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.contrib.auth import get_user_model
 from django.urls import reverse
 
@@ -17,6 +18,8 @@ from recipe.serializers import RecipeSerializer, RecipeDetailSerializer
 
 RECIPES_URL = reverse('recipe:recipe-list')
 
+MEDIA_ROOT = tempfile.mkdtemp()
+
 
 def recipe_detail_url(recipe_id):
     '''Creates and returns recipe detail url'''
@@ -114,6 +117,7 @@ class PrivateRecipeApiTest(TestCase):
         recipe = sample_recipe(user=self.user)
         recipe.tags.add(sample_tag(user=self.user))
         recipe.ingredients.add(sample_ingredient(user=self.user))
+        recipe.refresh_from_db()
 
         url = recipe_detail_url(recipe.id)
         response = self.client.get(url)
@@ -231,6 +235,8 @@ class PrivateRecipeApiTest(TestCase):
         tag2 = sample_tag(user=self.user, title='Sea Food')
         recipe1.tags.add(tag1)
         recipe2.tags.add(tag2)
+        recipe1.refresh_from_db()
+        recipe2.refresh_from_db()
         recipe3 = sample_recipe(user=self.user, title='Chicken Combi Rice')
 
         response = self.client.get(
@@ -254,6 +260,8 @@ class PrivateRecipeApiTest(TestCase):
         ingredient2 = sample_ingredient(user=self.user, title='Crabs')
         recipe1.ingredients.add(ingredient1)
         recipe2.ingredients.add(ingredient2)
+        recipe1.refresh_from_db()
+        recipe2.refresh_from_db()
         recipe3 = sample_recipe(user=self.user, title='Chicken Combi Rice')
 
         response = self.client.get(
@@ -269,6 +277,64 @@ class PrivateRecipeApiTest(TestCase):
         self.assertIn(serializer2.data, response.data)
         self.assertNotIn(serializer3.data, response.data)
 
+    def test_filter_recipes_matching_any_tag_not_duplicated(self):
+        '''Test a recipe matching several tags is returned once'''
+        recipe = sample_recipe(user=self.user, title='Dal Tadka')
+        tag1 = sample_tag(user=self.user, title='Vegetarian')
+        tag2 = sample_tag(user=self.user, title='Indian')
+        recipe.tags.add(tag1, tag2)
+
+        response = self.client.get(
+            RECIPES_URL,
+            {'tags': f'{tag1.id},{tag2.id}', 'match': 'any'}
+        )
+
+        self.assertEqual(len(response.data), 1)
+        self.assertEqual(response.data[0]['id'], recipe.id)
+
+    def test_filter_recipes_matching_all_tags(self):
+        '''Test returning only recipes having every requested tag'''
+        recipe1 = sample_recipe(user=self.user, title='Dal Tadka')
+        recipe2 = sample_recipe(user=self.user, title='Crab Curry')
+        tag1 = sample_tag(user=self.user, title='Spicy')
+        tag2 = sample_tag(user=self.user, title='Vegetarian')
+        recipe1.tags.add(tag1, tag2)
+        recipe2.tags.add(tag1)
+
+        response = self.client.get(
+            RECIPES_URL,
+            {'tags': f'{tag1.id},{tag2.id}', 'match': 'all'}
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([r['id'] for r in response.data], [recipe1.id])
+
+    def test_filter_recipes_matching_all_tags_and_ingredients(self):
+        '''Test match=all applies to tags and ingredients together'''
+        recipe1 = sample_recipe(user=self.user, title='Dal Tadka')
+        recipe2 = sample_recipe(user=self.user, title='Crab Curry')
+        tag = sample_tag(user=self.user, title='Spicy')
+        ingredient1 = sample_ingredient(user=self.user, title='Daal')
+        ingredient2 = sample_ingredient(user=self.user, title='Chilli')
+        recipe1.tags.add(tag)
+        recipe1.ingredients.add(ingredient1, ingredient2)
+        recipe2.tags.add(tag)
+        recipe2.ingredients.add(ingredient2)
+
+        response = self.client.get(RECIPES_URL, {
+            'tags': f'{tag.id}',
+            'ingredients': f'{ingredient1.id},{ingredient2.id}',
+            'match': 'all'
+        })
+
+        self.assertEqual([r['id'] for r in response.data], [recipe1.id])
+
+    def test_filter_recipes_invalid_match(self):
+        '''Test an unknown match mode is rejected'''
+        response = self.client.get(RECIPES_URL, {'match': 'some'})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
     def test_delete_recipes(self):
         '''Test deleting recipes'''
         recipe1 = sample_recipe(user=self.user, title='Paneer Bhurji')
@@ -286,10 +352,16 @@ class PrivateRecipeApiTest(TestCase):
 
 
 # Since we have some repeated functions to test upload, hence a seperate class
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, IMAGE_PROCESSING={'ASYNC': False})
 class RecipeImageUploadTest(TestCase):
 
     '''Test uploading images for recipes'''
 
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
     def setUp(self):
         self.client = APIClient()
         self.user = get_user_model().objects.create_user(
@@ -319,8 +391,8 @@ class RecipeImageUploadTest(TestCase):
             )
 
         self.recipe.refresh_from_db()
-        self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertIn('image', response.data)
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data['status'], 'done')
         self.assertTrue(os.path.exists(self.recipe.image.path))
 
     def test_upload_img_bad_request(self):
@@ -0,0 +1,147 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import ChangeLogEntry, Tag, Ingredient, Recipe
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+'''Library sizes the query count must stay flat across'''
+SMALL_LIBRARY = 10
+LARGE_LIBRARY = 10000
+
+
+def recipe_detail_url(recipe_id):
+    '''Creates and returns recipe detail url'''
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+def seed_recipes(user, count):
+    '''Bulk creates recipes, each with two tags and two ingredients'''
+    tags = [
+        Tag.objects.get_or_create(user=user, title=f'Tag {i}')[0]
+        for i in range(2)
+    ]
+    ingredients = [
+        Ingredient.objects.get_or_create(user=user, title=f'Ingredient {i}')[0]
+        for i in range(2)
+    ]
+    Recipe.objects.bulk_create([
+        Recipe(user=user, title=f'Recipe {i}', time_minutes=10, price=5)
+        for i in range(count)
+    ])
+    recipe_ids = Recipe.objects.filter(user=user).values_list('id', flat=True)
+
+    RecipeTag = Recipe.tags.through
+    RecipeIngredient = Recipe.ingredients.through
+    RecipeTag.objects.bulk_create([
+        RecipeTag(recipe_id=recipe_id, tag_id=tag.id)
+        for recipe_id in recipe_ids for tag in tags
+    ])
+    RecipeIngredient.objects.bulk_create([
+        RecipeIngredient(recipe_id=recipe_id, ingredient_id=ingredient.id)
+        for recipe_id in recipe_ids for ingredient in ingredients
+    ])
+
+
+class RecipeQueryCountTest(TestCase):
+
+    '''Test the recipe API issues a constant number of queries'''
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'testuser@company.com',
+            'Test1234'
+        )
+        self.client.force_authenticate(self.user)
+
+    def count_queries(self, url):
+        '''Return the number of queries issued while fetching url'''
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return len(context.captured_queries)
+
+    def test_list_query_count_is_flat(self):
+        '''Test listing recipes does not query once per recipe'''
+        seed_recipes(self.user, SMALL_LIBRARY)
+        small = self.count_queries(RECIPES_URL)
+
+        Recipe.objects.all().delete()
+        seed_recipes(self.user, LARGE_LIBRARY)
+        large = self.count_queries(RECIPES_URL)
+
+        self.assertEqual(small, large)
+
+    def test_list_fetches_relations_in_one_query_each(self):
+        '''Test listing recipes prefetches tags and ingredients'''
+        seed_recipes(self.user, SMALL_LIBRARY)
+
+        '''One query for recipes, one each for ingredients and tags'''
+        with self.assertNumQueries(3):
+            self.client.get(RECIPES_URL)
+
+    def test_detail_query_count(self):
+        '''Test a recipe detail fetches its nested relations up front'''
+        seed_recipes(self.user, SMALL_LIBRARY)
+        recipe = Recipe.objects.filter(user=self.user).first()
+
+        '''The recipe, ingredients, tags, image variants and updated_at'''
+        with self.assertNumQueries(5):
+            response = self.client.get(recipe_detail_url(recipe.id))
+
+        self.assertEqual(len(response.data['tags']), 2)
+        self.assertEqual(len(response.data['ingredients']), 2)
+
+    def recipe_payload(self):
+        '''Return a recipe payload with two tags and two ingredients'''
+        seed_recipes(self.user, 0)
+        return {
+            'title': 'Recipe',
+            'time_minutes': 10,
+            'price': 5,
+            'tags': list(Tag.objects.values_list('id', flat=True)),
+            'ingredients': list(
+                Ingredient.objects.values_list('id', flat=True)
+            ),
+        }
+
+    def test_create_query_count(self):
+        '''Test a recipe is indexed and logged once when created'''
+        payload = self.recipe_payload()
+
+        '''Validating 4, saving 1, linking 4 per relation, then
+        indexing 2, logging 2 and reading the relations back 2'''
+        with self.assertNumQueries(19):
+            response = self.client.post(RECIPES_URL, payload, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(
+            ChangeLogEntry.objects.filter(model='recipe').count(), 1
+        )
+
+    def test_update_query_count(self):
+        '''Test a recipe is indexed and logged once when updated'''
+        payload = self.recipe_payload()
+        response = self.client.post(RECIPES_URL, payload, format='json')
+        url = recipe_detail_url(response.data['id'])
+        payload['title'] = 'Renamed'
+        payload['tags'] = payload['tags'][:1]
+
+        '''Loading 3, validating 3, diffing 2 and unlinking 3, saving 1,
+        then indexing 2, logging 2 and reading the relations back 2'''
+        with self.assertNumQueries(18):
+            response = self.client.put(url, payload, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            ChangeLogEntry.objects.filter(model='recipe').count(), 1
+        )
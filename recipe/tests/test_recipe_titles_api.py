@@ -0,0 +1,213 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import ChangeLogEntry, Tag, Ingredient, Recipe
+
+from recipe.titles import get_or_create_titles
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+RECIPES_BULK_URL = reverse('recipe:recipe-bulk')
+
+
+def recipe_detail_url(recipe_id):
+    '''Creates and returns recipe detail url'''
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+def payload(**kwargs):
+    '''Return a recipe payload with kwargs added'''
+    return {
+        'title': 'Curry',
+        'time_minutes': 30,
+        'price': '7.00',
+        **kwargs
+    }
+
+
+class GetOrCreateTitlesTest(TestCase):
+
+    '''Test resolving titles to a user's tags or ingredients'''
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'testuser@company.com',
+            'Test1234'
+        )
+
+    def test_existing_and_missing(self):
+        '''Test existing titles are reused and missing ones created'''
+        vegan = Tag.objects.create(user=self.user, title='Vegan')
+
+        ids = get_or_create_titles(Tag, self.user.pk, ['Vegan', 'Quick'])
+
+        self.assertEqual(ids['Vegan'], vegan.id)
+        self.assertEqual(
+            Tag.objects.get(user=self.user, title='Quick').id, ids['Quick']
+        )
+
+    def test_concurrent_insert(self):
+        '''Test a title created meanwhile by another request is reused'''
+        raced = []
+
+        def insert_first(execute, sql, params, many, context):
+            '''Create a title between the lookup and the insert'''
+            if sql.startswith('INSERT') and not raced:
+                raced.append(None)
+                raced[0] = Tag.objects.create(user=self.user, title='Hot')
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(insert_first):
+            ids = get_or_create_titles(Tag, self.user.pk, ['Hot', 'Mild'])
+
+        self.assertEqual(ids['Hot'], raced[0].id)
+        self.assertEqual(
+            Tag.objects.get(user=self.user, title='Mild').id, ids['Mild']
+        )
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+
+
+class RecipeTitlesApiTest(TestCase):
+
+    '''Test giving a recipe's tags and ingredients by title'''
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'testuser@company.com',
+            'Test1234'
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_create_with_titles(self):
+        '''Test titles and ids combine, creating only missing titles'''
+        vegan = Tag.objects.create(user=self.user, title='Vegan')
+        quick = Tag.objects.create(user=self.user, title='Quick')
+
+        response = self.client.post(RECIPES_URL, payload(
+            tags=[quick.id],
+            tag_titles=['Vegan', 'Spicy'],
+            ingredient_titles=['Rice', 'Chilli'],
+        ), format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        recipe = Recipe.objects.get(id=response.data['id'])
+        spicy = Tag.objects.get(user=self.user, title='Spicy')
+        self.assertEqual(
+            set(recipe.tags.all()), {vegan, quick, spicy}
+        )
+        self.assertEqual(
+            set(recipe.ingredients.values_list('title', flat=True)),
+            {'Rice', 'Chilli'}
+        )
+        self.assertEqual(
+            sorted(response.data['tags']),
+            sorted([vegan.id, quick.id, spicy.id])
+        )
+        self.assertNotIn('tag_titles', response.data)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 3)
+
+    def test_titles_are_per_user(self):
+        '''Test another user's object with the same title isn't used'''
+        other = get_user_model().objects.create_user(
+            'other@company.com',
+            'Test1234'
+        )
+        theirs = Ingredient.objects.create(user=other, title='Rice')
+
+        response = self.client.post(
+            RECIPES_URL, payload(ingredient_titles=['Rice']), format='json'
+        )
+
+        self.assertNotIn(theirs.id, response.data['ingredients'])
+        self.assertTrue(
+            Ingredient.objects.filter(user=self.user, title='Rice').exists()
+        )
+
+    def test_constant_queries(self):
+        '''Test queries don't grow with the number of new titles'''
+        def create(count, offset):
+            with CaptureQueriesContext(connection) as queries:
+                self.client.post(RECIPES_URL, payload(
+                    ingredient_titles=[
+                        f'Ingredient {offset + i}' for i in range(count)
+                    ]
+                ), format='json')
+            return len(queries)
+
+        self.assertEqual(create(1, 0), create(20, 100))
+
+    def test_created_objects_logged(self):
+        '''Test objects created from titles appear in the change feed'''
+        self.client.post(
+            RECIPES_URL, payload(tag_titles=['Spicy']), format='json'
+        )
+
+        spicy = Tag.objects.get(user=self.user, title='Spicy')
+        self.assertTrue(ChangeLogEntry.objects.filter(
+            model='tag', object_id=spicy.id
+        ).exists())
+
+    def test_update_with_titles(self):
+        '''Test titles replace the recipe's tags on update'''
+        recipe = Recipe.objects.create(
+            user=self.user, title='Curry', time_minutes=30, price=7
+        )
+        recipe.tags.add(Tag.objects.create(user=self.user, title='Old'))
+
+        response = self.client.patch(
+            recipe_detail_url(recipe.id), {'tag_titles': ['New']},
+            format='json'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            list(recipe.tags.values_list('title', flat=True)), ['New']
+        )
+
+    def test_title_too_long(self):
+        '''Test titles longer than the model allows are rejected'''
+        response = self.client.post(
+            RECIPES_URL, payload(tag_titles=['x' * 31]), format='json'
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('tag_titles', response.data)
+        self.assertFalse(Recipe.objects.exists())
+
+    def test_bulk_create_with_titles(self):
+        '''Test bulk items share titles created once for the batch'''
+        response = self.client.post(RECIPES_BULK_URL, [
+            payload(title='Curry', tag_titles=['Spicy', 'Dinner']),
+            payload(title='Salsa', tag_titles=['Spicy']),
+        ], format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        spicy = Tag.objects.get(user=self.user, title='Spicy')
+        self.assertEqual(
+            [item['data']['tags'] for item in response.data][1], [spicy.id]
+        )
+        self.assertEqual(spicy.recipe_set.count(), 2)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 2)
+
+    def test_bulk_update_with_titles(self):
+        '''Test bulk updates replace tags with the titled ones'''
+        recipe = Recipe.objects.create(
+            user=self.user, title='Curry', time_minutes=30, price=7
+        )
+        recipe.tags.add(Tag.objects.create(user=self.user, title='Old'))
+
+        response = self.client.patch(RECIPES_BULK_URL, [
+            {'id': recipe.id, 'tag_titles': ['New']}
+        ], format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            list(recipe.tags.values_list('title', flat=True)), ['New']
+        )
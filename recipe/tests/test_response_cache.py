@@ -0,0 +1,118 @@
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.metrics import registry
+from core.models import Tag
+
+from recipe import cache
+
+from recipe.tests.helpers import sample_recipe
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+def detail_url(recipe_id):
+    '''Return recipe detail URL'''
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+class RecipeResponseCacheTest(TestCase):
+
+    '''Test the versioned response cache on recipe reads'''
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'testuser@company.com',
+            'Test1234'
+        )
+        self.client.force_authenticate(self.user)
+        registry.reset()
+
+    def test_repeat_list_served_from_cache(self):
+        '''Test a repeated list request is a hit without database queries'''
+        sample_recipe(self.user)
+        first = self.client.get(RECIPES_URL)
+
+        with self.assertNumQueries(0):
+            second = self.client.get(RECIPES_URL)
+
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(second['ETag'], first['ETag'])
+        self.assertEqual(cache.stats(),
+                         {'hit': 1, 'miss': 1, 'not_modified': 0})
+
+    def test_query_params_cached_separately(self):
+        '''Test different filters don't share a cache entry'''
+        tag = Tag.objects.create(user=self.user, title='Vegan')
+        recipe = sample_recipe(self.user, title='Salad')
+        recipe.tags.add(tag)
+        sample_recipe(self.user, title='Steak')
+
+        all_recipes = self.client.get(RECIPES_URL)
+        vegan = self.client.get(RECIPES_URL, {'tags': f'{tag.id}'})
+
+        self.assertEqual(len(all_recipes.data), 2)
+        self.assertEqual(len(vegan.data), 1)
+        self.assertNotEqual(all_recipes['ETag'], vegan['ETag'])
+
+    def test_if_none_match_returns_not_modified(self):
+        '''Test a matching If-None-Match gets a 304 without a body'''
+        recipe = sample_recipe(self.user)
+        etag = self.client.get(detail_url(recipe.id))['ETag']
+
+        response = self.client.get(detail_url(recipe.id),
+                                   HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+        self.assertEqual(cache.stats()['not_modified'], 1)
+
+    def test_write_invalidates_cached_responses(self):
+        '''Test a write changes the ETag and the cached body'''
+        recipe = sample_recipe(self.user, title='Old title')
+        etag = self.client.get(detail_url(recipe.id))['ETag']
+
+        self.client.patch(detail_url(recipe.id), {'title': 'New title'})
+        response = self.client.get(detail_url(recipe.id),
+                                   HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['title'], 'New title')
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_tag_rename_invalidates_detail(self):
+        '''Test renaming a tag refreshes recipe details that embed it'''
+        tag = Tag.objects.create(user=self.user, title='Spicy')
+        recipe = sample_recipe(self.user)
+        recipe.tags.add(tag)
+        self.client.get(detail_url(recipe.id))
+
+        tag.title = 'Mild'
+        tag.save()
+        response = self.client.get(detail_url(recipe.id))
+
+        self.assertEqual(response.data['tags'][0]['title'], 'Mild')
+        self.assertEqual(cache.stats()['hit'], 0)
+
+    def test_cache_isolated_per_user(self):
+        '''Test users never see each other's cached responses'''
+        sample_recipe(self.user, title='Mine')
+        self.client.get(RECIPES_URL)
+
+        user2 = get_user_model().objects.create_user(
+            'testuser2@company.com',
+            'Test4567'
+        )
+        sample_recipe(user2, title='Theirs')
+        self.client.force_authenticate(user2)
+        response = self.client.get(RECIPES_URL)
+
+        self.assertEqual([r['title'] for r in response.data], ['Theirs'])
+        self.assertEqual(cache.stats()['hit'], 0)
@@ -0,0 +1,196 @@
+from unittest import mock
+
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Tag, Ingredient, Recipe
+
+from recipe import cache, search
+from recipe.tests.helpers import sample_recipe
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+RECIPES_BULK_URL = reverse('recipe:recipe-bulk')
+
+
+class RecipeSearchApiTest(TestCase):
+
+    '''Test full text search over recipes'''
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'testuser@company.com',
+            'Test1234'
+        )
+        self.client.force_authenticate(self.user)
+
+    def search(self, query, **params):
+        '''Search recipes and return the titles of the results in order'''
+        response = self.client.get(RECIPES_URL, {'search': query, **params})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [recipe['title'] for recipe in response.data]
+
+    def test_backend_uses_full_text_index(self):
+        '''Test the SQLite test database gets the FTS5 backend'''
+        self.assertIsInstance(
+            search.get_backend(),
+            search.SQLiteSearchBackend
+        )
+
+    def test_backend_writes_to_its_database(self):
+        '''Test a backend rebuilds through its own alias's connection'''
+        other = mock.MagicMock()
+        backend = search.SQLiteSearchBackend('other')
+
+        with mock.patch.object(search, 'connections', {'other': other}):
+            backend.rebuild()
+
+        self.assertEqual(other.cursor.call_count, 2)
+
+    def test_search_by_title(self):
+        '''Test searching matches words in recipe titles'''
+        sample_recipe(self.user, title='Paneer Butter Masala')
+        sample_recipe(self.user, title='Chicken Curry')
+
+        self.assertEqual(self.search('paneer'), ['Paneer Butter Masala'])
+
+    def test_search_matches_stems_and_prefixes(self):
+        '''Test searching matches word stems and prefixes'''
+        sample_recipe(self.user, title='Roasted Vegetables')
+
+        self.assertEqual(self.search('roasting'), ['Roasted Vegetables'])
+        self.assertEqual(self.search('veg'), ['Roasted Vegetables'])
+
+    def test_search_by_tag_and_ingredient(self):
+        '''Test tag and ingredient titles are searchable'''
+        recipe1 = sample_recipe(self.user, title='Dal Tadka')
+        recipe1.tags.add(Tag.objects.create(user=self.user, title='Vegan'))
+        recipe2 = sample_recipe(self.user, title='Crab Curry')
+        recipe2.ingredients.add(
+            Ingredient.objects.create(user=self.user, title='Coconut')
+        )
+
+        self.assertEqual(self.search('vegan'), ['Dal Tadka'])
+        self.assertEqual(self.search('coconut'), ['Crab Curry'])
+
+    def test_results_ranked_by_relevance(self):
+        '''Test title matches rank above ingredient matches'''
+        ingredient = Ingredient.objects.create(user=self.user, title='Lemon')
+        recipe = sample_recipe(self.user, title='Fish Fry')
+        recipe.ingredients.add(ingredient)
+        sample_recipe(self.user, title='Lemon Rice')
+
+        self.assertEqual(self.search('lemon'), ['Lemon Rice', 'Fish Fry'])
+
+    def test_index_follows_updates(self):
+        '''Test renames and relation changes are reflected in results'''
+        recipe = sample_recipe(self.user, title='Old Name')
+        tag = Tag.objects.create(user=self.user, title='Spicy')
+        recipe.tags.add(tag)
+
+        recipe.title = 'New Name'
+        recipe.save()
+        self.assertEqual(self.search('old'), [])
+        self.assertEqual(self.search('new'), ['New Name'])
+
+        tag.title = 'Mild'
+        tag.save()
+        self.assertEqual(self.search('spicy'), [])
+        self.assertEqual(self.search('mild'), ['New Name'])
+
+        recipe.tags.clear()
+        self.assertEqual(self.search('mild'), [])
+
+        tag.recipe_set.add(recipe)
+        self.assertEqual(self.search('mild'), ['New Name'])
+
+        tag.delete()
+        self.assertEqual(self.search('mild'), [])
+
+        recipe.delete()
+        self.assertEqual(self.search('new'), [])
+
+    def test_bulk_created_recipes_indexed(self):
+        '''Test recipes from the bulk endpoint are searchable'''
+        self.client.post(
+            RECIPES_BULK_URL,
+            [{'title': 'Mango Lassi', 'time_minutes': 5, 'price': '2.00'}],
+            format='json'
+        )
+
+        self.assertEqual(self.search('mango'), ['Mango Lassi'])
+
+    def test_search_limited_to_user(self):
+        '''Test other users' recipes are never returned'''
+        user2 = get_user_model().objects.create_user(
+            'testuser2@company.com',
+            'Test4567'
+        )
+        sample_recipe(user2, title='Secret Soup')
+
+        self.assertEqual(self.search('soup'), [])
+
+    def test_search_paginates_by_rank(self):
+        '''Test paging through ranked results skips and repeats nothing'''
+        for i in range(5):
+            sample_recipe(self.user, title=f'Soup {i}' + ' soup' * i)
+
+        titles = []
+        response = self.client.get(
+            RECIPES_URL, {'search': 'soup', 'page_size': 2}
+        )
+        while True:
+            titles += [recipe['title'] for recipe in response.data]
+            next_link = response.get('Link', '')
+            if 'rel="next"' not in next_link:
+                break
+            response = self.client.get(next_link.split('>')[0][1:])
+
+        self.assertEqual(len(titles), 5)
+        self.assertEqual(set(titles), set(
+            Recipe.objects.values_list('title', flat=True)
+        ))
+
+    def collect_ids(self, query):
+        '''Follow every next link of a search and return the ids in order'''
+        ids = []
+        response = self.client.get(
+            RECIPES_URL, {'search': query, 'page_size': 100}
+        )
+        while True:
+            ids += [recipe['id'] for recipe in response.data]
+            next_link = response.get('Link', '')
+            if 'rel="next"' not in next_link:
+                return ids
+            response = self.client.get(next_link.split('>')[0][1:])
+
+    def test_tied_ranks_paged_past_offset_cutoff(self):
+        '''Test more equally ranked results than the offset cap all page'''
+        Recipe.objects.bulk_create([
+            Recipe(user=self.user, title='Chicken curry', time_minutes=10,
+                   price=5)
+            for _ in range(1300)
+        ])
+        expected = list(
+            Recipe.objects.order_by('-id').values_list('id', flat=True)
+        )
+        search.index_recipes(expected)
+
+        self.assertEqual(self.collect_ids('chicken curry'), expected)
+
+        cache.bump_version(self.user.pk)
+        fallback = search.FallbackSearchBackend('default')
+        with mock.patch.object(search, 'get_backend', return_value=fallback):
+            self.assertEqual(self.collect_ids('chicken curry'), expected)
+
+    def test_search_ignores_query_syntax(self):
+        '''Test FTS operators in the query are treated as plain text'''
+        sample_recipe(self.user, title='Mac and Cheese')
+
+        self.assertEqual(self.search('"mac" AND (cheese'), ['Mac and Cheese'])
+        self.assertEqual(self.search('***'), [])
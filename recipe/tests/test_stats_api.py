@@ -0,0 +1,177 @@
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Tag, Ingredient, Recipe
+
+from recipe.tests.helpers import sample_recipe
+
+
+STATS_URL = reverse('recipe:recipe-stats')
+
+
+class PublicRecipeStatsApiTest(TestCase):
+
+    '''Test unauthenticated recipe stats access'''
+
+    def test_auth_required(self):
+        '''Test that authentication is required for stats'''
+        response = APIClient().get(STATS_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PrivateRecipeStatsApiTest(TestCase):
+
+    '''Test the recipe stats endpoint'''
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'testuser@company.com',
+            'Test1234'
+        )
+        self.client.force_authenticate(self.user)
+
+        self.vegan = Tag.objects.create(user=self.user, title='Vegan')
+        self.dessert = Tag.objects.create(user=self.user, title='Dessert')
+        self.salt = Ingredient.objects.create(user=self.user, title='Salt')
+
+        self.soup = sample_recipe(
+            self.user, title='Soup', time_minutes=10, price=4.00
+        )
+        self.curry = sample_recipe(
+            self.user, title='Curry', time_minutes=45, price=8.50
+        )
+        self.cake = sample_recipe(
+            self.user, title='Cake', time_minutes=200, price=3.00
+        )
+        self.soup.tags.add(self.vegan)
+        self.curry.tags.add(self.vegan)
+        self.cake.tags.add(self.dessert)
+        self.soup.ingredients.add(self.salt)
+
+    def test_summary(self):
+        '''Test counts and price and time aggregates'''
+        response = self.client.get(STATS_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 3)
+        self.assertEqual(
+            response.data['price'],
+            {'avg': '5.17', 'min': '3.00', 'max': '8.50'}
+        )
+        self.assertEqual(
+            response.data['time_minutes'],
+            {'avg': 85.0, 'min': 10, 'max': 200}
+        )
+
+    def test_time_histogram(self):
+        '''Test recipes are counted in their cooking time bucket'''
+        response = self.client.get(STATS_URL)
+
+        self.assertEqual(response.data['time_histogram'], [
+            {'min_minutes': 0, 'max_minutes': 15, 'count': 1},
+            {'min_minutes': 16, 'max_minutes': 30, 'count': 0},
+            {'min_minutes': 31, 'max_minutes': 60, 'count': 1},
+            {'min_minutes': 61, 'max_minutes': 120, 'count': 0},
+            {'min_minutes': 121, 'max_minutes': None, 'count': 1},
+        ])
+
+    def test_breakdowns(self):
+        '''Test per tag and per ingredient counts, most used first'''
+        response = self.client.get(STATS_URL)
+
+        self.assertEqual(response.data['tags'], [
+            {'id': self.vegan.id, 'title': 'Vegan', 'count': 2,
+             'avg_price': '6.25', 'avg_time_minutes': 27.5},
+            {'id': self.dessert.id, 'title': 'Dessert', 'count': 1,
+             'avg_price': '3.00', 'avg_time_minutes': 200.0},
+        ])
+        self.assertEqual(response.data['ingredients'], [
+            {'id': self.salt.id, 'title': 'Salt', 'count': 1,
+             'avg_price': '4.00', 'avg_time_minutes': 10.0},
+        ])
+
+    def test_filters_apply(self):
+        '''Test the list filters narrow the recipes aggregated'''
+        response = self.client.get(STATS_URL, {'tags': self.vegan.id})
+
+        self.assertEqual(response.data['count'], 2)
+        self.assertEqual(response.data['price']['max'], '8.50')
+        self.assertEqual(
+            [row['title'] for row in response.data['tags']], ['Vegan']
+        )
+
+    def test_search_applies(self):
+        '''Test a search narrows the recipes aggregated'''
+        response = self.client.get(STATS_URL, {'search': 'curry'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 1)
+        self.assertEqual(response.data['price']['max'], '8.50')
+        self.assertEqual(
+            [row['title'] for row in response.data['tags']], ['Vegan']
+        )
+
+    def test_limited_to_user(self):
+        '''Test other users' recipes are not aggregated'''
+        other = get_user_model().objects.create_user(
+            'other@company.com',
+            'Test1234'
+        )
+        sample_recipe(other, price=99.00)
+        Tag.objects.create(user=other, title='Other')
+
+        response = self.client.get(STATS_URL)
+
+        self.assertEqual(response.data['count'], 3)
+        self.assertEqual(len(response.data['tags']), 2)
+
+    def test_empty_library(self):
+        '''Test stats of a user without recipes'''
+        Recipe.objects.all().delete()
+
+        response = self.client.get(STATS_URL)
+
+        self.assertEqual(response.data['count'], 0)
+        self.assertEqual(
+            response.data['price'], {'avg': None, 'min': None, 'max': None}
+        )
+        self.assertEqual(response.data['tags'], [])
+
+    @override_settings(RECIPE_STATS={'CACHE': False})
+    def test_three_queries(self):
+        '''Test stats take one aggregate and two grouped queries'''
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(STATS_URL)
+
+        self.assertEqual(len(queries), 3)
+
+    def test_cached_until_write(self):
+        '''Test stats are served from cache and invalidated by writes'''
+        self.client.get(STATS_URL)
+
+        with CaptureQueriesContext(connection) as queries:
+            cached = self.client.get(STATS_URL)
+        sample_recipe(self.user, title='Bread', price=2.00)
+        response = self.client.get(STATS_URL)
+
+        self.assertEqual(len(queries), 0)
+        self.assertEqual(cached.data['count'], 3)
+        self.assertEqual(response.data['count'], 4)
+
+    @override_settings(RECIPE_STATS={'TIME_BUCKETS': (60,)})
+    def test_custom_buckets(self):
+        '''Test the histogram follows the configured bucket bounds'''
+        response = self.client.get(STATS_URL)
+
+        self.assertEqual(
+            [row['count'] for row in response.data['time_histogram']],
+            [2, 1]
+        )
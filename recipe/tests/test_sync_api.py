@@ -0,0 +1,230 @@
+from datetime import timedelta
+
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import ChangeLogEntry, Tag, Ingredient, Recipe
+
+from recipe.tests.helpers import sample_recipe
+
+
+SYNC_URL = reverse('recipe:sync')
+
+
+class PublicSyncApiTest(TestCase):
+
+    '''Test unauthenticated sync access'''
+
+    def test_auth_required(self):
+        '''Test that authentication is required to sync'''
+        response = APIClient().get(SYNC_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+@override_settings(SYNC={'SETTLE_SECONDS': 0})
+class PrivateSyncApiTest(TestCase):
+
+    '''Test the delta sync change feed'''
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'testuser@company.com',
+            'Test1234'
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_initial_sync_returns_everything(self):
+        '''Test a sync without a token returns the whole library'''
+        tag = Tag.objects.create(user=self.user, title='Vegan')
+        ingredient = Ingredient.objects.create(user=self.user, title='Tofu')
+        recipe = sample_recipe(self.user)
+        recipe.tags.add(tag)
+
+        response = self.client.get(SYNC_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(response.data['more'])
+        self.assertEqual(
+            [t['id'] for t in response.data['tags']['updated']], [tag.id]
+        )
+        self.assertEqual(
+            [i['id'] for i in response.data['ingredients']['updated']],
+            [ingredient.id]
+        )
+        recipes = response.data['recipes']['updated']
+        self.assertEqual([r['id'] for r in recipes], [recipe.id])
+        self.assertEqual(recipes[0]['tags'], [tag.id])
+
+    def test_sync_returns_only_changes_since_token(self):
+        '''Test a sync with a token returns only later changes'''
+        sample_recipe(self.user, title='Unchanged')
+        changed = sample_recipe(self.user, title='Before')
+        token = self.client.get(SYNC_URL).data['token']
+
+        changed.title = 'After'
+        changed.save()
+        response = self.client.get(SYNC_URL, {'token': token})
+
+        updated = response.data['recipes']['updated']
+        self.assertEqual([r['title'] for r in updated], ['After'])
+        self.assertGreater(response.data['token'], token)
+
+    def test_deletes_returned_as_tombstones(self):
+        '''Test deleted objects are reported by id'''
+        recipe = sample_recipe(self.user)
+        tag = Tag.objects.create(user=self.user, title='Vegan')
+        token = self.client.get(SYNC_URL).data['token']
+        recipe_id, tag_id = recipe.id, tag.id
+
+        recipe.delete()
+        tag.delete()
+        response = self.client.get(SYNC_URL, {'token': token})
+
+        self.assertEqual(response.data['recipes']['deleted'], [recipe_id])
+        self.assertEqual(response.data['tags']['deleted'], [tag_id])
+        self.assertEqual(response.data['recipes']['updated'], [])
+
+    def test_unchanged_token_returns_nothing(self):
+        '''Test syncing again with the latest token is empty'''
+        sample_recipe(self.user)
+        token = self.client.get(SYNC_URL).data['token']
+
+        response = self.client.get(SYNC_URL, {'token': token})
+
+        self.assertEqual(response.data['token'], token)
+        self.assertEqual(response.data['recipes'],
+                         {'updated': [], 'deleted': []})
+
+    def test_log_keeps_one_entry_per_object(self):
+        '''Test repeated changes to an object leave a single entry'''
+        recipe = sample_recipe(self.user)
+        for title in ('One', 'Two', 'Three'):
+            recipe.title = title
+            recipe.save()
+        recipe.tags.add(Tag.objects.create(user=self.user, title='Vegan'))
+
+        self.assertEqual(
+            ChangeLogEntry.objects.filter(
+                model='recipe', object_id=recipe.id
+            ).count(),
+            1
+        )
+
+    def test_sync_pages_with_more_flag(self):
+        '''Test large change sets are split across calls'''
+        for i in range(5):
+            sample_recipe(self.user, title=f'Recipe {i}')
+
+        first = self.client.get(SYNC_URL, {'page_size': 3})
+        second = self.client.get(
+            SYNC_URL, {'page_size': 3, 'token': first.data['token']}
+        )
+
+        self.assertTrue(first.data['more'])
+        self.assertFalse(second.data['more'])
+        titles = [
+            r['title'] for page in (first, second)
+            for r in page.data['recipes']['updated']
+        ]
+        self.assertEqual(titles, [f'Recipe {i}' for i in range(5)])
+
+    def test_sync_limited_to_user(self):
+        '''Test other users' changes never appear in the feed'''
+        user2 = get_user_model().objects.create_user(
+            'testuser2@company.com',
+            'Test4567'
+        )
+        sample_recipe(user2, title='Theirs')
+        Recipe.objects.get(title='Theirs').delete()
+
+        response = self.client.get(SYNC_URL)
+
+        self.assertEqual(response.data['token'], 0)
+        self.assertEqual(response.data['recipes'],
+                         {'updated': [], 'deleted': []})
+
+    def test_invalid_token_rejected(self):
+        '''Test a malformed token is a 400'''
+        response = self.client.get(SYNC_URL, {'token': 'abc'})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_deleted_user_log_cleared(self):
+        '''Test deleting a user removes their change log'''
+        sample_recipe(self.user)
+
+        self.user.delete()
+
+        self.assertFalse(ChangeLogEntry.objects.exists())
+
+
+@override_settings(SYNC={'SETTLE_SECONDS': 5})
+class SyncSettleWindowTest(TestCase):
+
+    '''Test changes are held back until earlier ids have committed'''
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'testuser@company.com',
+            'Test1234'
+        )
+        self.client.force_authenticate(self.user)
+
+    def age(self, seconds=10):
+        '''Move every change log entry seconds into the past'''
+        for entry in ChangeLogEntry.objects.all():
+            entry.created_at -= timedelta(seconds=seconds)
+            entry.save()
+
+    def test_recent_changes_held_back(self):
+        '''Test changes appear once they are older than the window'''
+        recipe = sample_recipe(self.user)
+
+        response = self.client.get(SYNC_URL)
+
+        self.assertEqual(response.data['token'], 0)
+        self.assertEqual(response.data['recipes']['updated'], [])
+
+        self.age()
+        response = self.client.get(SYNC_URL)
+
+        self.assertEqual(
+            [r['id'] for r in response.data['recipes']['updated']],
+            [recipe.id]
+        )
+
+    def test_out_of_order_commits_not_skipped(self):
+        '''Test an id committed after a later one still reaches clients
+
+        Writer one takes the next log id and commits only after writer
+        two, holding the id after it, has committed and been synced.
+        '''
+        settled = sample_recipe(self.user, title='Settled')
+        self.age()
+        first = sample_recipe(self.user, title='First')
+        second = sample_recipe(self.user, title='Second')
+        late = ChangeLogEntry.objects.get(model='recipe', object_id=first.id)
+        late_id = late.id
+        late.delete()
+
+        token = self.client.get(SYNC_URL).data['token']
+        late.id = late_id
+        late.save(force_insert=True)
+        self.age()
+        response = self.client.get(SYNC_URL, {'token': token})
+
+        self.assertEqual(
+            token,
+            ChangeLogEntry.objects.get(object_id=settled.id).id
+        )
+        self.assertEqual(
+            [r['id'] for r in response.data['recipes']['updated']],
+            [first.id, second.id]
+        )
@@ -1,3 +1,4 @@
+from django.db import connection
 from django.test import TestCase
 from django.contrib.auth import get_user_model
 from django.urls import reverse
@@ -85,6 +86,45 @@ class PrivateTagsApi(TestCase):
 
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
+    def test_create_tag_duplicate_title(self):
+        '''Test a user can't have two tags with the same title'''
+        Tag.objects.create(user=self.user, title='Vegan')
+
+        response = self.client.post(TAGS_URL, {'title': 'Vegan'})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('title', response.data)
+
+    def test_create_tag_duplicate_title_race(self):
+        '''Test a title taken between validation and insert is a 400'''
+        raced = []
+
+        def insert_first(execute, sql, params, many, context):
+            '''Create the same tag as a concurrent request would'''
+            if sql.startswith('SAVEPOINT') and not raced:
+                raced.append(None)
+                Tag.objects.create(user=self.user, title='Hot')
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(insert_first):
+            response = self.client.post(TAGS_URL, {'title': 'Hot'})
+
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('title', response.data)
+        self.assertEqual(Tag.objects.filter(user=self.user).count(), 1)
+
+    def test_create_tag_title_used_by_other_user(self):
+        '''Test titles only have to be unique for each user'''
+        user2 = get_user_model().objects.create_user(
+            'otheruser@company.com',
+            'Test1234'
+        )
+        Tag.objects.create(user=user2, title='Vegan')
+
+        response = self.client.post(TAGS_URL, {'title': 'Vegan'})
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
     def test_retrieve_tags_assigned_to_recipes(self):
         '''Test filtering only those tags assigned to recipes'''
         tag1 = Tag.objects.create(
@@ -110,3 +150,42 @@ class PrivateTagsApi(TestCase):
         serializer2 = TagSerializer(tag2)
         self.assertIn(serializer1.data, response.data)
         self.assertNotIn(serializer2.data, response.data)
+
+    def test_retrieve_tags_assigned_unique(self):
+        '''Test assigned_only returns a tag once however many recipes'''
+        tag = Tag.objects.create(user=self.user, title='Breakfast')
+        Tag.objects.create(user=self.user, title='Lunch')
+        for title in ('Pancakes', 'Porridge'):
+            recipe = Recipe.objects.create(
+                user=self.user,
+                title=title,
+                time_minutes=5,
+                price=3.00
+            )
+            recipe.tags.add(tag)
+
+        response = self.client.get(TAGS_URL, {'assigned_only': 1})
+
+        self.assertEqual([item['id'] for item in response.data], [tag.id])
+
+    def test_retrieve_tags_with_recipe_count(self):
+        '''Test recipe_count reads each tag's counter in the listing query'''
+        used = Tag.objects.create(user=self.user, title='Breakfast')
+        unused = Tag.objects.create(user=self.user, title='Lunch')
+        for title in ('Pancakes', 'Porridge'):
+            recipe = Recipe.objects.create(
+                user=self.user,
+                title=title,
+                time_minutes=5,
+                price=3.00
+            )
+            recipe.tags.add(used)
+
+        with self.assertNumQueries(1):
+            response = self.client.get(TAGS_URL, {'recipe_count': 1})
+
+        counts = {item['id']: item['recipe_count'] for item in response.data}
+        self.assertEqual(counts, {used.id: 2, unused.id: 0})
+        self.assertNotIn(
+            'recipe_count', self.client.get(TAGS_URL).data[0]
+        )
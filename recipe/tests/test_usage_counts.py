@@ -0,0 +1,210 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Tag, Ingredient, Recipe
+
+from recipe.tests.helpers import sample_recipe
+
+
+TAGS_URL = reverse('recipe:tag-list')
+RECIPES_URL = reverse('recipe:recipe-list')
+RECIPES_BULK_URL = reverse('recipe:recipe-bulk')
+
+
+class UsageCounterTest(TestCase):
+
+    '''Test tag and ingredient usage counters follow recipe links'''
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'testuser@company.com',
+            'Test1234'
+        )
+        self.vegan = Tag.objects.create(user=self.user, title='Vegan')
+        self.dessert = Tag.objects.create(user=self.user, title='Dessert')
+        self.salt = Ingredient.objects.create(user=self.user, title='Salt')
+
+    def usage(self, obj):
+        obj.refresh_from_db(fields=['usage_count'])
+        return obj.usage_count
+
+    def test_add_remove_and_clear(self):
+        '''Test counters follow add, remove, set and clear on a recipe'''
+        soup = sample_recipe(self.user, title='Soup')
+        cake = sample_recipe(self.user, title='Cake')
+
+        soup.tags.add(self.vegan, self.dessert)
+        cake.tags.add(self.vegan)
+        soup.ingredients.add(self.salt)
+        self.assertEqual(self.usage(self.vegan), 2)
+        self.assertEqual(self.usage(self.dessert), 1)
+        self.assertEqual(self.usage(self.salt), 1)
+
+        soup.tags.remove(self.dessert, self.dessert)
+        cake.tags.remove(self.dessert)
+        self.assertEqual(self.usage(self.dessert), 0)
+
+        soup.tags.set([self.dessert])
+        self.assertEqual(self.usage(self.vegan), 1)
+        self.assertEqual(self.usage(self.dessert), 1)
+
+        soup.tags.clear()
+        self.assertEqual(self.usage(self.dessert), 0)
+        self.assertEqual(self.usage(self.salt), 1)
+
+    def test_reverse_side(self):
+        '''Test counters follow changes made from the tag side'''
+        soup = sample_recipe(self.user, title='Soup')
+        cake = sample_recipe(self.user, title='Cake')
+
+        self.vegan.recipe_set.add(soup, cake)
+        self.assertEqual(self.usage(self.vegan), 2)
+
+        self.vegan.recipe_set.clear()
+        self.assertEqual(self.usage(self.vegan), 0)
+
+    def test_recipe_deletion(self):
+        '''Test deleting recipes, one or many at once, uncounts them'''
+        recipes = [
+            sample_recipe(self.user, title=f'Recipe {i}') for i in range(3)
+        ]
+        for recipe in recipes:
+            recipe.tags.add(self.vegan)
+            recipe.ingredients.add(self.salt)
+
+        recipes[0].delete()
+        self.assertEqual(self.usage(self.vegan), 2)
+
+        Recipe.objects.filter(user=self.user).delete()
+        self.assertEqual(self.usage(self.vegan), 0)
+        self.assertEqual(self.usage(self.salt), 0)
+
+    def test_bulk_writes(self):
+        '''Test bulk create, update and delete keep counters right'''
+        client = APIClient()
+        client.force_authenticate(self.user)
+
+        response = client.post(RECIPES_BULK_URL, [
+            {'title': f'Recipe {i}', 'time_minutes': 10, 'price': '5.00',
+             'tags': [self.vegan.id], 'ingredients': [self.salt.id]}
+            for i in range(3)
+        ], format='json')
+        ids = [item['data']['id'] for item in response.data]
+        self.assertEqual(self.usage(self.vegan), 3)
+
+        client.patch(RECIPES_BULK_URL, [
+            {'id': ids[0], 'tags': [self.dessert.id]}
+        ], format='json')
+        self.assertEqual(self.usage(self.vegan), 2)
+        self.assertEqual(self.usage(self.dessert), 1)
+
+        client.delete(RECIPES_BULK_URL, {'ids': ids[1:]}, format='json')
+        self.assertEqual(self.usage(self.vegan), 0)
+        self.assertEqual(self.usage(self.salt), 1)
+
+    def test_reconcile_command(self):
+        '''Test reconcile_usage repairs drifted counters'''
+        soup = sample_recipe(self.user, title='Soup')
+        soup.tags.add(self.vegan)
+        Tag.objects.filter(pk=self.vegan.pk).update(usage_count=7)
+        Tag.objects.filter(pk=self.dessert.pk).update(usage_count=2)
+
+        dry_run = StringIO()
+        call_command('reconcile_usage', '--dry-run', stdout=dry_run)
+        self.assertIn('tags: 2 counters drifted', dry_run.getvalue())
+        self.assertEqual(self.usage(self.vegan), 7)
+
+        out = StringIO()
+        call_command('reconcile_usage', '--batch-size', '1', stdout=out)
+
+        self.assertIn('tags: 2 counters reconciled', out.getvalue())
+        self.assertIn('ingredients: 0 counters reconciled', out.getvalue())
+        self.assertEqual(self.usage(self.vegan), 1)
+        self.assertEqual(self.usage(self.dessert), 0)
+
+
+class UsageListingApiTest(TestCase):
+
+    '''Test sorting and filtering tags by usage'''
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'testuser@company.com',
+            'Test1234'
+        )
+        self.client.force_authenticate(self.user)
+
+        self.tags = {
+            title: Tag.objects.create(user=self.user, title=title)
+            for title in ('Lunch', 'Vegan', 'Quick', 'Dessert')
+        }
+        for i, titles in enumerate((('Vegan', 'Quick'),
+                                    ('Vegan', 'Quick'),
+                                    ('Vegan',))):
+            recipe = sample_recipe(self.user, title=f'Recipe {i}')
+            recipe.tags.add(*(self.tags[title] for title in titles))
+
+    def test_order_by_usage(self):
+        '''Test ordering=usage lists the most used tags first'''
+        with self.assertNumQueries(1):
+            response = self.client.get(TAGS_URL, {'ordering': 'usage'})
+
+        self.assertEqual(
+            [(item['title'], item['recipe_count']) for item in response.data],
+            [('Vegan', 3), ('Quick', 2), ('Lunch', 0), ('Dessert', 0)]
+        )
+
+    def test_order_by_usage_paginates(self):
+        '''Test cursor pages ordered by usage cover every tag once'''
+        titles = []
+        url = TAGS_URL + '?ordering=usage&page_size=1'
+        while url:
+            response = self.client.get(url)
+            titles.extend(item['title'] for item in response.data)
+            links = response.get('Link', '')
+            url = None
+            for link in links.split(', '):
+                if link.endswith('rel="next"'):
+                    url = link[1:link.index('>')]
+
+        self.assertEqual(titles, ['Vegan', 'Quick', 'Lunch', 'Dessert'])
+
+    def test_min_usage(self):
+        '''Test min_usage lists tags used by at least that many recipes'''
+        response = self.client.get(TAGS_URL, {'min_usage': 2})
+
+        self.assertEqual(
+            [item['title'] for item in response.data], ['Vegan', 'Quick']
+        )
+
+    def test_invalid_params(self):
+        '''Test unknown orderings and bad minimums are rejected'''
+        ordering = self.client.get(TAGS_URL, {'ordering': 'popular'})
+        min_usage = self.client.get(TAGS_URL, {'min_usage': '-1'})
+
+        self.assertEqual(ordering.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(min_usage.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_recipe_api_writes_count(self):
+        '''Test creating a recipe through the API counts its tags'''
+        self.client.post(RECIPES_URL, {
+            'title': 'Salad',
+            'time_minutes': 5,
+            'price': '4.00',
+            'tags': [self.tags['Lunch'].id],
+        })
+
+        response = self.client.get(TAGS_URL, {'ordering': 'usage'})
+
+        self.assertEqual(
+            [(item['title'], item['recipe_count']) for item in response.data],
+            [('Vegan', 3), ('Quick', 2), ('Lunch', 1), ('Dessert', 0)]
+        )
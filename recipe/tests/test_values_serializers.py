@@ -0,0 +1,193 @@
+from unittest.mock import patch
+
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+
+from rest_framework.test import APIClient, APIRequestFactory
+
+from core.models import Tag, Ingredient, Recipe, RecipeImageVariant
+
+from recipe import serializers, values
+from recipe.views import RecipeViewSet, TagViewSet
+
+
+RECIPES_URL = reverse('recipe:recipe-list')
+TAGS_URL = reverse('recipe:tag-list')
+
+
+def detail_url(recipe_id):
+    '''Return recipe detail URL'''
+    return reverse('recipe:recipe-detail', args=[recipe_id])
+
+
+class ValuesSerializerTest(TestCase):
+
+    '''Test values serializers render exactly like the model serializers'''
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'testuser@company.com',
+            'Test1234'
+        )
+        self.tag = Tag.objects.create(user=self.user, title='Vegan')
+        self.ingredient = Ingredient.objects.create(
+            user=self.user,
+            title='Tofu'
+        )
+        self.recipe = Recipe.objects.create(
+            user=self.user,
+            title='Tofu Curry',
+            time_minutes=30,
+            price=7.5,
+            link='https://example.com/curry',
+            image='uploads/recipe/curry.jpg'
+        )
+        self.recipe.tags.add(self.tag)
+        self.recipe.ingredients.add(self.ingredient)
+        RecipeImageVariant.objects.create(
+            recipe=self.recipe,
+            name='thumbnail',
+            format='webp',
+            image='uploads/recipe/variants/curry.webp',
+            width=200,
+            height=150
+        )
+        Recipe.objects.create(
+            user=self.user,
+            title='Plain Rice',
+            time_minutes=20,
+            price=1
+        )
+        self.context = {'request': APIRequestFactory().get('/')}
+
+    def rows(self, values_class):
+        '''Return the rows a values serializer reads for the user'''
+        queryset = Recipe.objects.filter(user=self.user).order_by('id')
+        return list(values_class.prepare(queryset))
+
+    def test_recipe_list_matches_model_serializer(self):
+        '''Test list rows match RecipeSerializer output'''
+        recipes = Recipe.objects.filter(user=self.user).order_by('id')
+        expected = serializers.RecipeSerializer(recipes, many=True).data
+
+        data = values.RecipeValuesSerializer(
+            self.rows(values.RecipeValuesSerializer), many=True
+        ).data
+
+        self.assertEqual(data, expected)
+        self.assertEqual(list(data[0]), list(expected[0]))
+
+    def test_recipe_detail_matches_model_serializer(self):
+        '''Test a detail row matches RecipeDetailSerializer output'''
+        recipe = Recipe.objects.get(pk=self.recipe.pk)
+        expected = serializers.RecipeDetailSerializer(
+            recipe, context=self.context
+        ).data
+
+        row = self.rows(values.RecipeDetailValuesSerializer)[0]
+        data = values.RecipeDetailValuesSerializer(
+            row, context=self.context
+        ).data
+
+        self.assertEqual(data, expected)
+        self.assertEqual(list(data), list(expected))
+        self.assertTrue(data['image'].startswith('http://testserver/'))
+
+    def test_tag_list_matches_model_serializer(self):
+        '''Test tag rows match TagSerializer output'''
+        tags = Tag.objects.filter(user=self.user)
+        expected = serializers.TagSerializer(tags, many=True).data
+
+        data = values.TagValuesSerializer(
+            values.TagValuesSerializer.prepare(tags), many=True
+        ).data
+
+        self.assertEqual(data, expected)
+
+    def test_columns_rendered_by_default(self):
+        '''Test a subclass naming only columns renders them in order'''
+        class RecipeTimes(values.ValuesSerializer):
+            mirrors = serializers.RecipeSerializer
+            columns = ('id', 'time_minutes', 'price')
+            formatted = ('price',)
+
+        queryset = Recipe.objects.filter(user=self.user).order_by('id')
+        data = RecipeTimes(RecipeTimes.prepare(queryset), many=True).data
+
+        self.assertEqual(data, [
+            {'id': recipe.id, 'time_minutes': recipe.time_minutes,
+             'price': f'{recipe.price:.2f}'}
+            for recipe in queryset
+        ])
+        self.assertEqual(list(data[0]), ['id', 'time_minutes', 'price'])
+
+
+class ValuesReadApiTest(TestCase):
+
+    '''Test viewsets switch between values and model serializers'''
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'testuser@company.com',
+            'Test1234'
+        )
+        self.client.force_authenticate(self.user)
+        tag = Tag.objects.create(user=self.user, title='Vegan')
+        self.recipe = Recipe.objects.create(
+            user=self.user,
+            title='Salad',
+            time_minutes=5,
+            price=3
+        )
+        self.recipe.tags.add(tag)
+
+    def get_both(self, url, viewset, params=None):
+        '''Return the response data with and without the values path
+
+        Distinct query strings keep the response cache from answering
+        the second request with the first one's data.
+        '''
+        params = params or {}
+        fast = self.client.get(url, {**params, 'path': 'values'}).data
+        with patch.object(viewset, 'values_serializer_classes', {}):
+            slow = self.client.get(url, {**params, 'path': 'model'}).data
+        return fast, slow
+
+    def test_recipe_list_same_with_either_path(self):
+        '''Test the recipe list is identical on both paths'''
+        fast, slow = self.get_both(RECIPES_URL, RecipeViewSet)
+
+        self.assertEqual(fast, slow)
+
+    def test_recipe_detail_same_with_either_path(self):
+        '''Test the recipe detail is identical on both paths'''
+        fast, slow = self.get_both(detail_url(self.recipe.id), RecipeViewSet)
+
+        self.assertEqual(fast, slow)
+
+    def test_tag_list_same_with_either_path(self):
+        '''Test the tag list is identical on both paths'''
+        fast, slow = self.get_both(TAGS_URL, TagViewSet)
+
+        self.assertEqual(fast, slow)
+
+    def test_tag_counts_same_with_either_path(self):
+        '''Test annotated tag listings are identical on both paths'''
+        fast, slow = self.get_both(
+            TAGS_URL, TagViewSet, {'assigned_only': 1, 'recipe_count': 1}
+        )
+
+        self.assertEqual(fast, slow)
+        self.assertEqual(fast[0]['recipe_count'], 1)
+
+    def test_values_path_not_used_for_writes(self):
+        '''Test updates still go through the model serializer'''
+        response = self.client.patch(
+            detail_url(self.recipe.id), {'title': 'Green Salad'}
+        )
+
+        self.assertEqual(response.data['title'], 'Green Salad')
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.title, 'Green Salad')
@@ -0,0 +1,37 @@
+from recipe import cache, changes
+
+
+def _lookup(model, user_id, titles):
+    '''Return {title: id} of the user's objects with the given titles'''
+    return dict(model.objects.filter(
+        user_id=user_id, title__in=titles
+    ).values_list('title', 'pk'))
+
+
+def get_or_create_titles(model, user_id, titles):
+    '''Return {title: id} of a user's tags or ingredients, creating missing
+
+    The same few queries however many titles: one reading the existing
+    objects, then, if any are missing, one inserting them all, one
+    reading their ids back and the change log writes. The insert skips
+    titles a concurrent request created first, through the (user, title)
+    unique constraint, and the read back finds the winner's object. Those
+    are logged again too, which only replaces their entries. Created
+    objects are logged for sync and invalidate the user's cached
+    responses, as a save() would through its signals.
+    '''
+    titles = set(titles)
+    if not titles:
+        return {}
+    ids = _lookup(model, user_id, titles)
+
+    missing = titles - set(ids)
+    if missing:
+        model.objects.bulk_create([
+            model(user_id=user_id, title=title) for title in sorted(missing)
+        ], ignore_conflicts=True)
+        created = _lookup(model, user_id, missing)
+        ids.update(created)
+        changes.record(user_id, model, created.values())
+        cache.bump_version(user_id)
+    return ids
@@ -0,0 +1,101 @@
+import threading
+from contextlib import contextmanager
+
+from django.db.models import F
+
+from core.models import Recipe
+
+from recipe.filters import count_recipes
+
+
+RELATIONS = ('tags', 'ingredients')
+
+_local = threading.local()
+
+
+def relation_of(through):
+    '''Return the recipe relation name of an M2M through model'''
+    for relation in RELATIONS:
+        if Recipe._meta.get_field(relation).remote_field.through is through:
+            return relation
+    raise LookupError(f'{through.__name__} is not a recipe relation')
+
+
+def _related(relation):
+    '''Return the related model and through rows of a recipe relation'''
+    m2m = Recipe._meta.get_field(relation)
+    column = f'{m2m.m2m_reverse_field_name()}_id'
+    return m2m.related_model, m2m.remote_field.through.objects, column
+
+
+def related_ids(relation, recipe_ids):
+    '''Return the ids of the tags or ingredients on the given recipes'''
+    _, links, column = _related(relation)
+    return set(links.filter(recipe_id__in=recipe_ids).values_list(
+        column, flat=True
+    ))
+
+
+def refresh(relation, ids):
+    '''Recount the recipes using the given tags or ingredients
+
+    One UPDATE setting each counter from a count over the through table
+    index, so it is right however the links changed, whereas adding the
+    size of a change would trust remove(), which reports ids that were
+    never linked.
+    '''
+    ids = set(ids)
+    if ids:
+        model, _, _ = _related(relation)
+        model.objects.filter(pk__in=ids).update(
+            usage_count=count_recipes(relation)
+        )
+
+
+def release(recipe_id):
+    '''Uncount a recipe about to be deleted from its tags and ingredients
+
+    The links go with the recipe without an m2m_changed signal. This
+    runs from pre_delete, while they still exist, and decrements rather
+    than recounts, since every recipe in a queryset delete is signalled
+    before any of their links are deleted.
+    '''
+    if getattr(_local, 'batched', False):
+        return
+    for relation in RELATIONS:
+        model, links, column = _related(relation)
+        model.objects.filter(
+            pk__in=links.filter(recipe_id=recipe_id).values(column),
+            usage_count__gt=0
+        ).update(usage_count=F('usage_count') - 1)
+
+
+@contextmanager
+def recount_after(recipe_ids):
+    '''Recount the tags and ingredients of recipes once, after a block
+
+    For deleting many recipes at once: release() is skipped inside the
+    block and each relation is recounted with one query afterwards,
+    rather than decremented with one query per recipe.
+    '''
+    related = {
+        relation: related_ids(relation, recipe_ids)
+        for relation in RELATIONS
+    }
+    _local.batched = True
+    try:
+        yield
+    finally:
+        _local.batched = False
+    for relation, ids in related.items():
+        refresh(relation, ids)
+
+
+def drifted(relation, queryset=None):
+    '''Return the tags or ingredients whose counter disagrees with links'''
+    model, _, _ = _related(relation)
+    if queryset is None:
+        queryset = model.objects.all()
+    return queryset.annotate(
+        actual=count_recipes(relation)
+    ).exclude(usage_count=F('actual'))
@@ -0,0 +1,242 @@
+from collections import defaultdict
+
+from core.models import Recipe, RecipeImageVariant
+
+from recipe import serializers
+
+
+SAFE_METHODS = ('GET', 'HEAD')
+
+
+class ValuesSerializer:
+
+    '''Read-only serializer building output dicts from .values() rows
+
+    It skips ModelSerializer field introspection and model instances
+    entirely. Subclasses name the columns to read, which by default are
+    output in that order, and override build() where the dicts need the
+    keys, order or nesting of the model serializer they mirror. Values
+    needing a DRF format (decimals, datetimes) go through that
+    serializer's own fields, so the JSON is identical. Relations are
+    loaded by relations() for a whole page of rows at once.
+    '''
+    columns = ()
+    mirrors = None
+    formatted = ()
+
+    _formatters = None
+
+    def __init__(self, instance=None, many=False, context=None, **kwargs):
+        self.instance = instance
+        self.many = many
+        self.context = context or {}
+
+    @classmethod
+    def prepare(cls, queryset):
+        '''Turn a model queryset into one yielding the needed columns'''
+        return queryset.prefetch_related(None).values(
+            *cls.columns, *queryset.query.annotations
+        )
+
+    @classmethod
+    def formatters(cls):
+        '''Return to_representation of the mirrored serializer's fields'''
+        if cls.__dict__.get('_formatters') is None:
+            fields = cls.mirrors().fields
+            cls._formatters = {
+                name: fields[name].to_representation
+                for name in cls.formatted
+            }
+        return cls._formatters
+
+    def to_representation(self, rows):
+        '''Return a list of output dicts for a list of rows'''
+        if not rows:
+            return []
+        formatters = self.formatters()
+        relations = self.relations([row['id'] for row in rows])
+        return [self.build(row, relations, formatters) for row in rows]
+
+    def relations(self, ids):
+        '''Return related data of a page of rows, keyed by row id'''
+        return {}
+
+    def build(self, row, relations, formatters):
+        '''Return the output dict of one row, its columns in order'''
+        return {
+            name: formatters[name](row[name])
+            if name in formatters else row[name]
+            for name in self.columns
+        }
+
+    @property
+    def data(self):
+        if self.many:
+            return self.to_representation(list(self.instance))
+        return self.to_representation([self.instance])[0]
+
+
+class TitleValuesSerializer(ValuesSerializer):
+
+    '''Mirrors TagSerializer and IngredientSerializer'''
+    columns = ('id', 'title', 'updated_at')
+    formatted = ('updated_at',)
+
+    def build(self, row, relations, formatters):
+        data = super().build(row, relations, formatters)
+        if 'recipe_count' in row:
+            data['recipe_count'] = row['recipe_count']
+        return data
+
+
+class TagValuesSerializer(TitleValuesSerializer):
+    mirrors = serializers.TagSerializer
+
+
+class IngredientValuesSerializer(TitleValuesSerializer):
+    mirrors = serializers.IngredientSerializer
+
+
+class RecipeValuesSerializer(ValuesSerializer):
+
+    '''Mirrors RecipeSerializer, tags and ingredients as lists of ids'''
+    mirrors = serializers.RecipeSerializer
+    columns = ('id', 'title', 'time_minutes', 'price', 'link', 'updated_at')
+    formatted = ('price', 'updated_at')
+
+    def related_ids(self, name, recipe_ids):
+        '''Return {recipe id: [related ids]} read from the through table'''
+        field = Recipe._meta.get_field(name)
+        source = f'{field.m2m_field_name()}_id'
+        target = f'{field.m2m_reverse_field_name()}_id'
+        related = defaultdict(list)
+        rows = field.remote_field.through.objects.filter(**{
+            f'{source}__in': recipe_ids
+        }).order_by('id').values_list(source, target)
+        for recipe_id, related_id in rows:
+            related[recipe_id].append(related_id)
+        return related
+
+    def relations(self, recipe_ids):
+        '''Return the tags and ingredients of the recipes, per recipe'''
+        return {
+            name: self.related_ids(name, recipe_ids)
+            for name in ('ingredients', 'tags')
+        }
+
+    def build(self, row, relations, formatters):
+        '''Return the output dict of one recipe row'''
+        return {
+            'id': row['id'],
+            'title': row['title'],
+            'ingredients': relations['ingredients'][row['id']],
+            'tags': relations['tags'][row['id']],
+            'time_minutes': row['time_minutes'],
+            'price': formatters['price'](row['price']),
+            'link': row['link'],
+            'updated_at': formatters['updated_at'](row['updated_at']),
+        }
+
+
+class RecipeDetailValuesSerializer(RecipeValuesSerializer):
+
+    '''Mirrors RecipeDetailSerializer, with nested relations and images'''
+    mirrors = serializers.RecipeDetailSerializer
+    columns = RecipeValuesSerializer.columns + ('image',)
+
+    def related_titles(self, name, recipe_ids):
+        '''Return {recipe id: [nested dicts]} in one joined query'''
+        field = Recipe._meta.get_field(name)
+        source = f'{field.m2m_field_name()}_id'
+        target = field.m2m_reverse_field_name()
+        updated_at = self.formatters()['updated_at']
+        related = defaultdict(list)
+        rows = field.remote_field.through.objects.filter(**{
+            f'{source}__in': recipe_ids
+        }).order_by('id').values_list(
+            source, f'{target}__id', f'{target}__title',
+            f'{target}__updated_at'
+        )
+        for recipe_id, pk, title, modified in rows:
+            related[recipe_id].append({
+                'id': pk,
+                'title': title,
+                'updated_at': updated_at(modified),
+            })
+        return related
+
+    def file_url(self, name, storage):
+        '''Return a stored file's absolute url, as DRF's FileField does'''
+        if not name:
+            return None
+        url = storage.url(name)
+        request = self.context.get('request')
+        if request is not None:
+            return request.build_absolute_uri(url)
+        return url
+
+    def variants(self, recipe_ids):
+        '''Return {recipe id: [image variant dicts]}'''
+        storage = RecipeImageVariant._meta.get_field('image').storage
+        variants = defaultdict(list)
+        rows = RecipeImageVariant.objects.filter(
+            recipe_id__in=recipe_ids
+        ).order_by('id').values_list(
+            'recipe_id', 'name', 'format', 'width', 'height', 'image'
+        )
+        for recipe_id, name, image_format, width, height, image in rows:
+            variants[recipe_id].append({
+                'name': name,
+                'format': image_format,
+                'width': width,
+                'height': height,
+                'image': self.file_url(image, storage),
+            })
+        return variants
+
+    def relations(self, recipe_ids):
+        relations = {
+            name: self.related_titles(name, recipe_ids)
+            for name in ('ingredients', 'tags')
+        }
+        relations['image_variants'] = self.variants(recipe_ids)
+        return relations
+
+    def build(self, row, relations, formatters):
+        data = super().build(row, relations, formatters)
+        data['image'] = self.file_url(
+            row['image'], Recipe._meta.get_field('image').storage
+        )
+        data['image_variants'] = relations['image_variants'][row['id']]
+        return data
+
+
+class ValuesReadMixin:
+
+    '''Serve selected read actions through ValuesSerializers
+
+    `values_serializer_classes` maps actions to serializers. On GET and
+    HEAD those actions read .values() rows instead of model instances;
+    writes, and the browsable API's forms, keep the model serializers.
+    '''
+    values_serializer_classes = {}
+
+    def get_values_serializer_class(self):
+        '''Return the ValuesSerializer for this request, if any'''
+        if self.request.method not in SAFE_METHODS:
+            return None
+        return self.values_serializer_classes.get(self.action)
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        values_class = self.get_values_serializer_class()
+        if values_class is not None:
+            queryset = values_class.prepare(queryset)
+        return queryset
+
+    def get_serializer(self, *args, **kwargs):
+        values_class = self.get_values_serializer_class()
+        if values_class is None:
+            return super().get_serializer(*args, **kwargs)
+        kwargs['context'] = self.get_serializer_context()
+        return values_class(*args, **kwargs)
@@ -1,73 +1,242 @@
+from django.db.models import F
+from django.http import StreamingHttpResponse
+
 from rest_framework import viewsets, mixins, status
-from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
+from rest_framework.views import APIView
+
+
+from core.models import ChangeLogEntry, Tag, Ingredient, Recipe
+from core.replicas import ReplicaReadMixin
+
+from recipe import (cache, changes, filters, images, search, serializers,
+                    usage)
+from recipe.autocomplete import autocomplete_settings, suggest
+from recipe.bulk import BulkModelMixin
+from recipe.export import NDJSONRenderer, stream_ndjson
+from recipe.pagination import TitleCursorPagination, RecipeCursorPagination
+from recipe.signals import recipes_changed
+from recipe.stats import recipe_stats, recipe_stats_settings
+from recipe.values import (ValuesReadMixin, TagValuesSerializer,
+                           IngredientValuesSerializer,
+                           RecipeValuesSerializer,
+                           RecipeDetailValuesSerializer)
 
+from user.authentication import CachedTokenAuthentication
 
-from core.models import Tag, Ingredient, Recipe
 
-from recipe import serializers
+ORDER_TITLE = 'title'
+ORDER_USAGE = 'usage'
+ORDERINGS = (ORDER_TITLE, ORDER_USAGE)
 
 
-class BaseRecipeViewSet(viewsets.GenericViewSet,
+class BaseRecipeViewSet(ReplicaReadMixin,
+                        cache.CachedResponseMixin,
+                        ValuesReadMixin,
+                        viewsets.GenericViewSet,
                         mixins.ListModelMixin,
-                        mixins.CreateModelMixin):
+                        mixins.CreateModelMixin,
+                        BulkModelMixin):
     '''Base viewset for user owned recipe attributes'''
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
+    pagination_class = TitleCursorPagination
+    bulk_unique_fields = ('title',)
 
-    def get_queryset(self):
-        '''Return objects for the current authenticated user only'''
+    def _ordering_param(self):
+        '''Return how the listing is ordered, by title or by usage'''
+        ordering = self.request.query_params.get('ordering', ORDER_TITLE)
+        if ordering not in ORDERINGS:
+            choices = ', '.join(ORDERINGS)
+            raise ValidationError({'ordering': f'Must be one of: {choices}'})
+        return ordering
+
+    def _min_usage_param(self):
+        '''Return the least number of recipes a listed object must be on'''
+        min_usage = self.request.query_params.get('min_usage', '0')
+        if not min_usage.isdigit():
+            raise ValidationError(
+                {'min_usage': 'Must be a non-negative integer.'}
+            )
         assigned_only = bool(self.request.query_params.get('assigned_only'))
+        return max(int(min_usage), int(assigned_only))
+
+    def get_pagination_ordering(self):
+        '''Order by usage, most used first, when asked to'''
+        if self._ordering_param() == ORDER_USAGE:
+            return ('-recipe_count', '-title')
+        return None
+
+    def get_queryset(self):
+        '''Return objects for the current authenticated user only
+
+        Usage filters and counts read the denormalized usage_count
+        column, so they scan the (user, usage_count, title) index
+        instead of touching the recipe links.
+        '''
+        recipe_count = bool(self.request.query_params.get('recipe_count'))
+        modified_since = self.request.query_params.get('modified_since')
+        min_usage = self._min_usage_param()
         queryset = self.queryset
-        if assigned_only:
-            queryset = queryset.filter(recipe__isnull=False)
+        if min_usage:
+            queryset = queryset.filter(usage_count__gte=min_usage)
+        if recipe_count or self._ordering_param() == ORDER_USAGE:
+            queryset = queryset.annotate(recipe_count=F('usage_count'))
+        if modified_since:
+            queryset = filters.filter_modified_since(queryset, modified_since)
 
         return queryset.filter(user=self.request.user).order_by('-title')
 
+    def _limit_param(self):
+        '''Return how many suggestions to send, capped at MAX_LIMIT'''
+        options = autocomplete_settings()
+        limit = self.request.query_params.get('limit', str(options['LIMIT']))
+        if not limit.isdigit() or int(limit) < 1:
+            raise ValidationError({'limit': 'Must be a positive integer.'})
+        return min(int(limit), options['MAX_LIMIT'])
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(request, super().list, *args, **kwargs)
+
+    @action(methods=['GET'], detail=False)
+    def autocomplete(self, request):
+        '''Suggest titles starting with the given prefix, ignoring case'''
+        prefix = request.query_params.get('prefix', '').strip()
+        if not prefix:
+            raise ValidationError({'prefix': 'This parameter is required.'})
+        return Response(suggest(
+            self.queryset.model, request.user.pk, prefix, self._limit_param()
+        ))
+
     def perform_create(self, serializer):
         '''Create a new tag'''
         serializer.save(user=self.request.user)
 
+    def bulk_written(self, instances):
+        '''Reindex and touch the recipes using renamed tags or ingredients'''
+        cache.bump_version(self.request.user.pk)
+        changes.record(
+            self.request.user.pk,
+            self.queryset.model,
+            [instance.pk for instance in instances]
+        )
+        recipes_changed(
+            self.request.user.pk,
+            Recipe.objects.filter(**{
+                f'{self.recipe_relation}__in': instances
+            }).values_list('id', flat=True)
+        )
+
 
 class TagViewSet(BaseRecipeViewSet):
     '''Manage Tags in the database'''
     queryset = Tag.objects.all()
     serializer_class = serializers.TagSerializer
+    values_serializer_classes = {'list': TagValuesSerializer}
+    recipe_relation = 'tags'
 
 
 class IngredientViewSet(BaseRecipeViewSet):
     '''Manage Ingredients in the database'''
     queryset = Ingredient.objects.all()
     serializer_class = serializers.IngredientSerializer
+    values_serializer_classes = {'list': IngredientValuesSerializer}
+    recipe_relation = 'ingredients'
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(ReplicaReadMixin,
+                    cache.CachedResponseMixin,
+                    ValuesReadMixin,
+                    viewsets.ModelViewSet,
+                    BulkModelMixin):
     '''Manage recipes in the database'''
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
     queryset = Recipe.objects.all()
     serializer_class = serializers.RecipeSerializer
+    bulk_serializer_class = serializers.RecipeBulkSerializer
+    values_serializer_classes = {
+        'list': RecipeValuesSerializer,
+        'retrieve': RecipeDetailValuesSerializer,
+    }
+    bulk_relations = ('ingredients', 'tags')
+    bulk_title_fields = serializers.RecipeSerializer.title_fields
+    pagination_class = RecipeCursorPagination
+    export_chunk_size = 500
 
     ''' if we want to filter querysets with parameters'''
     def _params_to_ints(self, qs):
         '''Convert a list of string IDs to a list of integers'''
         return [int(str_id) for str_id in qs.split(',')]
 
+    def _match_param(self):
+        '''Return whether filters must match any or all of the given IDs'''
+        match = self.request.query_params.get('match', filters.MATCH_ANY)
+        if match not in filters.MATCH_CHOICES:
+            choices = ', '.join(filters.MATCH_CHOICES)
+            raise ValidationError({'match': f'Must be one of: {choices}'})
+        return match
+
+    def _search_param(self):
+        '''Return the full text search query, if any'''
+        return self.request.query_params.get('search', '').strip()
+
+    def get_pagination_ordering(self):
+        '''Order search results by relevance, best match first'''
+        if self._search_param():
+            return ('-search_rank', '-id')
+        return None
+
     def get_queryset(self):
         '''Retrieve the recipes for the authenticated user'''
         tags = self.request.query_params.get('tags')
         ingredients = self.request.query_params.get('ingredients')
+        modified_since = self.request.query_params.get('modified_since')
+        match = self._match_param()
+        query = self._search_param()
         queryset = self.queryset
+        if query:
+            queryset = search.search_recipes(queryset, query)
         if tags:
             tag_ids = self._params_to_ints(tags)
-            queryset = queryset.filter(tags__id__in=tag_ids)
+            queryset = filters.filter_by_related(
+                queryset, 'tags', tag_ids, match
+            )
         if ingredients:
             ingredient_ids = self._params_to_ints(ingredients)
-            queryset = queryset.filter(ingredients__id__in=ingredient_ids)
+            queryset = filters.filter_by_related(
+                queryset, 'ingredients', ingredient_ids, match
+            )
+        if modified_since:
+            queryset = filters.filter_modified_since(queryset, modified_since)
+
+        '''Load all tags and ingredients up front, one query per relation'''
+        queryset = queryset.filter(user=self.request.user).prefetch_related(
+            'ingredients', 'tags'
+        )
+        if self.action == 'retrieve':
+            queryset = queryset.prefetch_related('image_variants')
 
-        return queryset.filter(user=self.request.user)
+        return queryset.order_by('-id')
+
+    def get_last_modified(self, request):
+        '''Look up a single recipe's updated_at without serializing it'''
+        if self.action != 'retrieve':
+            return None
+        return Recipe.objects.filter(
+            user=request.user, pk=self.kwargs.get('pk')
+        ).values_list('updated_at', flat=True).first()
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(request, super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            request, super().retrieve, *args, **kwargs
+        )
 
     def get_serializer_class(self):
         '''Return appropriate serializer class'''
@@ -81,23 +250,142 @@ class RecipeViewSet(viewsets.ModelViewSet):
         '''Create a new Recipe'''
         serializer.save(user=self.request.user)
 
+    def bulk_written(self, instances):
+        '''Index and log recipes written through the bulk endpoint'''
+        cache.bump_version(self.request.user.pk)
+        search.index_recipes(instance.pk for instance in instances)
+        changes.record(
+            self.request.user.pk,
+            Recipe,
+            [instance.pk for instance in instances]
+        )
+
+    def bulk_relations_written(self, name, ids):
+        '''Recount the tags or ingredients bulk writes linked or unlinked'''
+        usage.refresh(name, ids)
+
+    def perform_bulk_destroy(self, queryset, ids):
+        '''Recount the deleted recipes' tags and ingredients once'''
+        with usage.recount_after(ids):
+            super().perform_bulk_destroy(queryset, ids)
+
     # to add our own custom actions to the ModelViewSet
     @action(methods=['POST'], detail=True, url_path='upload-image')
     def upload_image(self, request, pk=None):
+        '''Accept an image and queue it for background processing'''
         recipe = self.get_object()
-        serializer = self.get_serializer(
-            recipe,
-            data=request.data
-        )
+        serializer = self.get_serializer(data=request.data)
 
         if serializer.is_valid():
-            serializer.save()
+            job = serializer.save(recipe=recipe)
+            images.enqueue(job)
+            job.refresh_from_db()
             return Response(
-                serializer.data,
-                status=status.HTTP_200_OK
+                self.get_serializer(job).data,
+                status=status.HTTP_202_ACCEPTED
             )
 
         return Response(
             serializer.errors,
             status=status.HTTP_400_BAD_REQUEST
         )
+
+    @action(methods=['GET'], detail=False,
+            renderer_classes=(NDJSONRenderer,))
+    def export(self, request):
+        '''Stream the user's whole library as newline delimited JSON'''
+        response = StreamingHttpResponse(
+            stream_ndjson(
+                Recipe.objects.filter(user=request.user),
+                serializers.RecipeDetailSerializer,
+                self.get_serializer_context(),
+                self.export_chunk_size,
+                prefetch=('ingredients', 'tags', 'image_variants')
+            ),
+            content_type=NDJSONRenderer.media_type
+        )
+        response['Content-Disposition'] = (
+            'attachment; filename="recipes.ndjson"'
+        )
+        return response
+
+    @action(methods=['GET'], detail=False)
+    def stats(self, request):
+        '''Aggregate the recipes matching the list filters'''
+        if recipe_stats_settings()['CACHE']:
+            return self.cached_response(request, self.compute_stats)
+        return self.compute_stats(request)
+
+    def compute_stats(self, request):
+        '''Return the stats of the filtered recipes, computed in SQL'''
+        return Response(recipe_stats(self.get_queryset()))
+
+
+class SyncView(ReplicaReadMixin, APIView):
+
+    '''Change feed of a user's recipes, tags and ingredients
+
+    GET with ?token=<sync token> returns what was created, updated or
+    deleted since that token, read from the change log rather than the
+    library, along with the token to send next time. Omitting the token
+    returns everything. When `more` is true the client should call
+    again straight away with the returned token. Changes are listed
+    once they are older than the SYNC SETTLE_SECONDS window.
+    '''
+    authentication_classes = (CachedTokenAuthentication,)
+    permission_classes = (IsAuthenticated,)
+    page_size = 500
+    max_page_size = 1000
+    feeds = (
+        ('tags', Tag, serializers.TagSerializer, ()),
+        ('ingredients', Ingredient, serializers.IngredientSerializer, ()),
+        ('recipes', Recipe, serializers.RecipeSerializer,
+         ('ingredients', 'tags')),
+    )
+
+    def _int_param(self, name, default, minimum):
+        '''Return a non-negative integer query parameter'''
+        value = self.request.query_params.get(name, default)
+        try:
+            value = int(value)
+        except (TypeError, ValueError):
+            value = None
+        if value is None or value < minimum:
+            raise ValidationError(
+                {name: f'Must be an integer of at least {minimum}.'}
+            )
+        return value
+
+    def get(self, request):
+        '''Return the changes after the given sync token'''
+        token = self._int_param('token', 0, 0)
+        page_size = min(
+            self._int_param('page_size', self.page_size, 1),
+            self.max_page_size
+        )
+        entries, more = changes.changes_since(request.user, token, page_size)
+
+        data = {
+            'token': entries[-1].id if entries else token,
+            'more': more,
+        }
+        for name, model, serializer_class, prefetch in self.feeds:
+            model_name = model._meta.model_name
+            updated = [
+                entry.object_id for entry in entries
+                if entry.model == model_name and
+                entry.action == ChangeLogEntry.UPSERT
+            ]
+            objects = model.objects.filter(
+                user=request.user, pk__in=updated
+            ).prefetch_related(*prefetch).order_by('id') if updated else []
+            data[name] = {
+                'updated': serializer_class(objects, many=True).data,
+                'deleted': [
+                    entry.object_id for entry in entries
+                    if entry.model == model_name and
+                    entry.action == ChangeLogEntry.DELETE
+                ],
+            }
+
+        return Response(data)
@@ -0,0 +1,224 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+
+from django.core import signing
+from django.core.cache import caches
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+
+from core.conf import feature_settings
+
+
+TOKEN_AUTH_CACHE_DEFAULTS = {
+    'MAX_SIZE': 10000,
+    'TTL': 60,
+    'SHARED_CACHE': None,
+}
+
+
+def token_cache_settings():
+    '''Return the token cache settings merged over the defaults'''
+    return feature_settings('TOKEN_AUTH_CACHE', TOKEN_AUTH_CACHE_DEFAULTS)
+
+
+TOKEN_EXPIRY_DEFAULTS = {
+    'TTL': 14 * 24 * 60 * 60,
+    'SIGNED_ONLY': False,
+}
+
+TOKEN_SIGNING_SALT = 'user.authentication.token'
+
+
+def token_expiry_settings():
+    '''Return the token expiry settings merged over the defaults'''
+    return feature_settings('TOKEN_EXPIRY', TOKEN_EXPIRY_DEFAULTS)
+
+
+def token_expires(token):
+    '''Return when a token stops authenticating'''
+    return token.created + timedelta(seconds=token_expiry_settings()['TTL'])
+
+
+def token_expired(token):
+    '''Return whether a token is past its expiry'''
+    return token_expires(token) <= timezone.now()
+
+
+def expired_before():
+    '''Return the creation time before which tokens have expired'''
+    return timezone.now() - timedelta(seconds=token_expiry_settings()['TTL'])
+
+
+def sign_token(token):
+    '''Return the credential handed to clients: key, expiry and HMAC'''
+    expires = int(token_expires(token).timestamp())
+    return signing.Signer(salt=TOKEN_SIGNING_SALT).sign(
+        f'{token.key}:{expires}'
+    )
+
+
+def unsign_token(credential):
+    '''Return the key and expiry timestamp carried by a credential
+
+    Bare keys issued before tokens were signed have no expiry of their
+    own and are accepted unless SIGNED_ONLY is set; their expiry is
+    checked against the token row instead.
+    '''
+    if ':' not in credential:
+        if token_expiry_settings()['SIGNED_ONLY']:
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+        return credential, None
+
+    try:
+        value = signing.Signer(salt=TOKEN_SIGNING_SALT).unsign(credential)
+        key, expires = value.split(':')
+        return key, int(expires)
+    except (signing.BadSignature, ValueError):
+        raise exceptions.AuthenticationFailed(_('Invalid token.'))
+
+
+def shared_cache():
+    '''Return the shared cache tier, or None when it is not configured'''
+    alias = token_cache_settings()['SHARED_CACHE']
+    return caches[alias] if alias else None
+
+
+def shared_cache_key(key):
+    '''Return the shared cache key for a token key'''
+    return f'auth-token:{key}'
+
+
+class TokenCache:
+
+    '''Thread safe LRU of authenticated tokens, bounded in size and age'''
+
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        '''Return the cached token for key, or None if missing or expired'''
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            token, expires = entry
+            if expires <= time.monotonic():
+                del self._entries[key]
+                return None
+
+            self._entries.move_to_end(key)
+            return token
+
+    def set(self, key, token, ttl, max_size):
+        '''Cache token under key, evicting the least recently used'''
+        with self._lock:
+            self._entries[key] = (token, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key):
+        '''Drop a single token'''
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def invalidate_user(self, user_id):
+        '''Drop every token belonging to a user'''
+        with self._lock:
+            stale = [
+                key for key, (token, _) in self._entries.items()
+                if token.user_id == user_id
+            ]
+            for key in stale:
+                del self._entries[key]
+
+    def clear(self):
+        '''Drop every token'''
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+token_cache = TokenCache()
+
+
+def remember_token(token):
+    '''Cache a freshly issued token so its first use skips the DB'''
+    options = token_cache_settings()
+    shared = shared_cache()
+    if shared is not None:
+        shared.set(shared_cache_key(token.key), token, options['TTL'])
+    token_cache.set(token.key, token, options['TTL'], options['MAX_SIZE'])
+
+
+def invalidate_token(key):
+    '''Remove a token from both cache tiers'''
+    token_cache.invalidate(key)
+    shared = shared_cache()
+    if shared is not None:
+        shared.delete(shared_cache_key(key))
+
+
+def invalidate_user_tokens(user_id):
+    '''Remove all of a user's tokens from both cache tiers'''
+    from rest_framework.authtoken.models import Token
+
+    token_cache.invalidate_user(user_id)
+    shared = shared_cache()
+    if shared is not None:
+        keys = Token.objects.filter(user_id=user_id).values_list(
+            'key', flat=True
+        )
+        shared.delete_many([shared_cache_key(key) for key in keys])
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+
+    '''Token authentication that remembers recently validated tokens
+
+    Signed credentials carry their expiry, so forged and expired ones
+    are turned away by an HMAC check before any lookup. Lookups go to
+    the in-process LRU first, then to the optional shared cache, and
+    only then to the database. Both tiers are invalidated by the signal
+    handlers in user.signals when a token is deleted or its user
+    changes; the cache TTL bounds how long a revoked token can still
+    authenticate in other processes.
+    '''
+
+    def authenticate_credentials(self, credential):
+        '''Return (user, token), querying the DB only on a cache miss'''
+        key, expires = unsign_token(credential)
+        if expires is not None and expires <= time.time():
+            raise exceptions.AuthenticationFailed(_('Token has expired.'))
+
+        options = token_cache_settings()
+        token = token_cache.get(key)
+
+        if token is None:
+            shared = shared_cache()
+            if shared is not None:
+                token = shared.get(shared_cache_key(key))
+
+            if token is None:
+                token = super().authenticate_credentials(key)[1]
+                if shared is not None:
+                    shared.set(shared_cache_key(key), token, options['TTL'])
+
+            token_cache.set(key, token, options['TTL'], options['MAX_SIZE'])
+
+        if token_expired(token):
+            raise exceptions.AuthenticationFailed(_('Token has expired.'))
+
+        '''Hand each request its own copy so views can't mutate the cache'''
+        token = copy.deepcopy(token)
+        return (token.user, token)
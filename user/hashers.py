@@ -0,0 +1,114 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth import hashers
+
+from core.conf import feature_settings
+
+
+PASSWORD_HASHING_DEFAULTS = {
+    'PBKDF2_ITERATIONS': None,
+    'ARGON2_TIME_COST': None,
+    'ARGON2_MEMORY_COST': None,
+    'ARGON2_PARALLELISM': None,
+    'BCRYPT_ROUNDS': None,
+    'WORKERS': None,
+    'TIMEOUT': 30,
+}
+
+
+def password_hashing_settings():
+    '''Return the password hashing settings merged over the defaults'''
+    return feature_settings('PASSWORD_HASHING', PASSWORD_HASHING_DEFAULTS)
+
+
+def tuned(name, default):
+    '''Return a property reading a cost from the settings, or default'''
+    def cost(self):
+        value = password_hashing_settings()[name]
+        return default if value is None else value
+    return property(cost)
+
+
+class TunablePBKDF2PasswordHasher(hashers.PBKDF2PasswordHasher):
+
+    '''PBKDF2-SHA256 with its iteration count taken from the settings'''
+    iterations = tuned(
+        'PBKDF2_ITERATIONS', hashers.PBKDF2PasswordHasher.iterations
+    )
+
+
+class TunableArgon2PasswordHasher(hashers.Argon2PasswordHasher):
+
+    '''Argon2 with tunable costs, needs the argon2-cffi package'''
+    time_cost = tuned(
+        'ARGON2_TIME_COST', hashers.Argon2PasswordHasher.time_cost
+    )
+    memory_cost = tuned(
+        'ARGON2_MEMORY_COST', hashers.Argon2PasswordHasher.memory_cost
+    )
+    parallelism = tuned(
+        'ARGON2_PARALLELISM', hashers.Argon2PasswordHasher.parallelism
+    )
+
+
+class TunableBCryptSHA256PasswordHasher(hashers.BCryptSHA256PasswordHasher):
+
+    '''bcrypt with tunable rounds, needs the bcrypt package'''
+    rounds = tuned(
+        'BCRYPT_ROUNDS', hashers.BCryptSHA256PasswordHasher.rounds
+    )
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    '''Return the pool hashing runs on, sized to the CPU count by default
+
+    PBKDF2, Argon2 and bcrypt all release the GIL while hashing, so the
+    pool hashes in parallel across cores. Its fixed size keeps a burst
+    of logins from running more hashes at once than there are cores.
+    '''
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            workers = (password_hashing_settings()['WORKERS'] or
+                       os.cpu_count() or 1)
+            _executor = ThreadPoolExecutor(
+                max_workers=workers,
+                thread_name_prefix='password-hashing'
+            )
+        return _executor
+
+
+def run(function, *args):
+    '''Run a CPU bound hashing call on the pool and wait for its result'''
+    future = get_executor().submit(function, *args)
+    return future.result(password_hashing_settings()['TIMEOUT'])
+
+
+def make_password(raw_password):
+    '''Hash a password with the preferred hasher, on the pool'''
+    return run(hashers.make_password, raw_password)
+
+
+def verify(user, raw_password):
+    '''Check a user's password on the pool, upgrading an outdated hash
+
+    Django's check_password reports through its setter when the stored
+    hash was made by another hasher or with other costs. The new hash
+    is then computed on the pool too and saved from the calling thread,
+    which owns the database connection.
+    '''
+    outdated = []
+    valid = run(
+        hashers.check_password, raw_password, user.password,
+        outdated.append
+    )
+    if valid and outdated:
+        user.password = make_password(raw_password)
+        user.save(update_fields=['password'])
+    return valid
@@ -0,0 +1,70 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth import get_user_model, hashers as django_hashers
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+
+from user import hashers
+
+
+class Command(BaseCommand):
+
+    '''Benchmark password verification throughput'''
+    help = (
+        'Report logins per second verified inline in each request thread '
+        'and on the bounded hashing pool, at several concurrency levels'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--logins', type=int, default=200)
+        parser.add_argument('--concurrency', default='1,2,4,8')
+        parser.add_argument('--iterations', type=int, default=None,
+                            help='PBKDF2 iterations, default the setting')
+
+    def handle(self, *args, **options):
+        '''Time the same logins on both paths at each concurrency'''
+        overrides = {}
+        if options['iterations']:
+            overrides['PBKDF2_ITERATIONS'] = options['iterations']
+        config = {**hashers.password_hashing_settings(), **overrides}
+
+        with override_settings(PASSWORD_HASHING=config):
+            user = get_user_model()(email='bench@company.com')
+            user.password = django_hashers.make_password('bench1234')
+            self.stdout.write(f'Hash: {user.password.rsplit("$", 2)[0]}')
+            self.stdout.write(
+                f'Pool: {hashers.get_executor()._max_workers} workers'
+            )
+
+            inline = self.inline_verify(user)
+            pooled = self.pooled_verify(user)
+            for concurrency in options['concurrency'].split(','):
+                concurrency = int(concurrency)
+                self.stdout.write(
+                    f'{concurrency:>3} threads  '
+                    f'inline {self.rate(inline, options, concurrency):7.1f}'
+                    f'/s  pool {self.rate(pooled, options, concurrency):7.1f}'
+                    '/s'
+                )
+
+    def inline_verify(self, user):
+        '''Return a login check hashing in the calling thread'''
+        return lambda: django_hashers.check_password(
+            'bench1234', user.password
+        )
+
+    def pooled_verify(self, user):
+        '''Return a login check hashing on the pool'''
+        return lambda: hashers.verify(user, 'bench1234')
+
+    def rate(self, login, options, concurrency):
+        '''Return logins per second with concurrency client threads'''
+        with ThreadPoolExecutor(max_workers=concurrency) as clients:
+            start = time.perf_counter()
+            results = list(clients.map(
+                lambda _: login(), range(options['logins'])
+            ))
+            elapsed = time.perf_counter() - start
+        assert all(results)
+        return options['logins'] / elapsed
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from rest_framework.authtoken.models import Token
+
+from user.authentication import expired_before
+
+
+class Command(BaseCommand):
+
+    '''Delete expired auth tokens'''
+    help = 'Delete tokens past their expiry, meant to run periodically'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Delete this many tokens per query'
+        )
+
+    def handle(self, *args, **options):
+        '''Delete expired tokens in batches so locks stay short'''
+        expired = Token.objects.filter(created__lt=expired_before())
+        purged = 0
+        while True:
+            keys = list(expired.values_list('key', flat=True)[
+                :options['batch_size']
+            ])
+            if not keys:
+                break
+            purged += Token.objects.filter(key__in=keys).delete()[0]
+
+        self.stdout.write(f'Purged {purged} expired tokens')
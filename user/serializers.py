@@ -18,13 +18,10 @@ class UserSerializer(serializers.ModelSerializer):
     def update(self, instance, validated_data):
         '''Update a user, setting the password correctly and returning it'''
         password = validated_data.pop('password', None)
-        user = super().update(instance, validated_data)
-
         if password:
-            user.set_password(password)
-            user.save()
+            instance.set_password(password)
 
-        return user
+        return super().update(instance, validated_data)
 
 
 class AuthTokenSerializer(serializers.Serializer):
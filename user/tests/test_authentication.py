@@ -0,0 +1,123 @@
+from unittest.mock import patch
+
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from user.authentication import token_cache
+
+
+ME_URL = reverse('user:me')
+
+
+class CachedTokenAuthenticationTests(TestCase):
+
+    '''Test token lookups are cached and invalidated correctly'''
+
+    def setUp(self):
+        token_cache.clear()
+        self.user = get_user_model().objects.create_user(
+            email='testuser@company.com',
+            password='test1234',
+            name='test'
+        )
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def tearDown(self):
+        token_cache.clear()
+
+    def test_repeat_request_makes_no_queries(self):
+        '''Test a warm token authenticates without touching the database'''
+        self.client.get(ME_URL)
+
+        with self.assertNumQueries(0):
+            response = self.client.get(ME_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['email'], self.user.email)
+
+    def test_invalid_token_rejected(self):
+        '''Test an unknown token is still rejected'''
+        self.client.credentials(HTTP_AUTHORIZATION='Token invalid')
+
+        response = self.client.get(ME_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(len(token_cache), 0)
+
+    def test_deleted_token_rejected(self):
+        '''Test deleting a token evicts it from the cache'''
+        self.client.get(ME_URL)
+        self.token.delete()
+
+        response = self.client.get(ME_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_deactivated_user_rejected(self):
+        '''Test deactivating a user evicts their tokens from the cache'''
+        self.client.get(ME_URL)
+        self.user.is_active = False
+        self.user.save()
+
+        response = self.client.get(ME_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_updated_user_not_stale(self):
+        '''Test updating a user is reflected on the next request'''
+        self.client.patch(ME_URL, {'name': 'new name'})
+
+        response = self.client.get(ME_URL)
+
+        self.assertEqual(response.data['name'], 'new name')
+
+    @override_settings(TOKEN_AUTH_CACHE={'MAX_SIZE': 1})
+    def test_cache_size_bounded(self):
+        '''Test the least recently used token is evicted past MAX_SIZE'''
+        user2 = get_user_model().objects.create_user(
+            email='testuser2@company.com',
+            password='test5678'
+        )
+        token2 = Token.objects.create(user=user2)
+
+        self.client.get(ME_URL)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token2.key}')
+        self.client.get(ME_URL)
+
+        self.assertEqual(len(token_cache), 1)
+        self.assertIsNone(token_cache.get(self.token.key))
+
+    @override_settings(TOKEN_AUTH_CACHE={'TTL': 60})
+    def test_cache_entries_expire(self):
+        '''Test tokens are looked up again once their TTL has passed'''
+        with patch('user.authentication.time.monotonic', return_value=0):
+            self.client.get(ME_URL)
+
+        with patch('user.authentication.time.monotonic', return_value=61):
+            with self.assertNumQueries(1):
+                self.client.get(ME_URL)
+
+    @override_settings(TOKEN_AUTH_CACHE={'SHARED_CACHE': 'default'})
+    def test_shared_cache_tier(self):
+        '''Test a token cached by another process needs no queries'''
+        cache.clear()
+        self.client.get(ME_URL)
+        token_cache.clear()
+
+        with self.assertNumQueries(0):
+            response = self.client.get(ME_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.token.delete()
+        token_cache.clear()
+        response = self.client.get(ME_URL)
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
@@ -0,0 +1,105 @@
+import threading
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from user import hashers
+from user.authentication import token_cache
+
+
+TOKEN_URL = reverse('user:token')
+ME_URL = reverse('user:me')
+
+
+def create_user(**kwargs):
+    return get_user_model().objects.create_user(**kwargs)
+
+
+class PasswordHashingTests(TestCase):
+
+    '''Test tunable hashing, rehash on login and token priming'''
+
+    def setUp(self):
+        self.client = APIClient()
+        self.payload = {'email': 'testuser@company.com',
+                        'password': 'test1234'}
+        token_cache.clear()
+
+    @override_settings(PASSWORD_HASHING={'PBKDF2_ITERATIONS': 1000})
+    def test_iterations_from_settings(self):
+        '''Test the PBKDF2 iteration count comes from the settings'''
+        user = create_user(**self.payload)
+
+        self.assertTrue(user.password.startswith('pbkdf2_sha256$1000$'))
+
+    def test_login_rehashes_after_cost_change(self):
+        '''Test logging in upgrades a hash made with other iterations'''
+        with override_settings(PASSWORD_HASHING={'PBKDF2_ITERATIONS': 1000}):
+            create_user(**self.payload)
+
+        with override_settings(PASSWORD_HASHING={'PBKDF2_ITERATIONS': 2000}):
+            response = self.client.post(TOKEN_URL, self.payload)
+
+        user = get_user_model().objects.get()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(user.password.startswith('pbkdf2_sha256$2000$'))
+
+    def test_login_rehashes_other_algorithm(self):
+        '''Test logging in moves a legacy hash to the preferred hasher'''
+        user = create_user(**self.payload)
+        user.password = make_password(self.payload['password'],
+                                      hasher='pbkdf2_sha1')
+        user.save()
+
+        self.client.post(TOKEN_URL, self.payload)
+
+        user.refresh_from_db()
+        self.assertTrue(user.password.startswith('pbkdf2_sha256$'))
+
+    def test_wrong_password_not_rehashed(self):
+        '''Test a failed login leaves an outdated hash alone'''
+        user = create_user(**self.payload)
+        user.password = make_password(self.payload['password'],
+                                      hasher='pbkdf2_sha1')
+        user.save()
+
+        response = self.client.post(
+            TOKEN_URL, {**self.payload, 'password': 'wrong'}
+        )
+
+        user.refresh_from_db()
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertTrue(user.password.startswith('pbkdf2_sha1$'))
+
+    def test_issued_token_is_cached(self):
+        '''Test the first request with a new token skips the DB'''
+        create_user(**self.payload)
+        key = self.client.post(TOKEN_URL, self.payload).data['token']
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {key}')
+
+        with self.assertNumQueries(0):
+            response = self.client.get(ME_URL)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_hashing_runs_on_pool(self):
+        '''Test password checks run on the hashing pool threads'''
+        create_user(**self.payload)
+        threads = []
+        check = hashers.hashers.check_password
+
+        def record_thread(*args):
+            threads.append(threading.current_thread().name)
+            return check(*args)
+
+        with mock.patch.object(hashers.hashers, 'check_password',
+                               record_thread):
+            self.client.post(TOKEN_URL, self.payload)
+
+        self.assertTrue(threads)
+        self.assertTrue(threads[0].startswith('password-hashing'))
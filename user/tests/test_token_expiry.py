@@ -0,0 +1,167 @@
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from user.authentication import sign_token, token_cache
+
+
+TOKEN_URL = reverse('user:token')
+REFRESH_URL = reverse('user:token-refresh')
+REVOKE_URL = reverse('user:token-revoke')
+ME_URL = reverse('user:me')
+
+
+def expire(token):
+    '''Backdate a token past the default expiry'''
+    Token.objects.filter(key=token.key).update(
+        created=timezone.now() - timedelta(days=15)
+    )
+
+
+class TokenExpiryTests(TestCase):
+
+    '''Test signed, expiring and rotatable tokens'''
+
+    def setUp(self):
+        token_cache.clear()
+        self.payload = {'email': 'testuser@company.com',
+                        'password': 'test1234'}
+        self.user = get_user_model().objects.create_user(**self.payload)
+        self.client = APIClient()
+
+    def tearDown(self):
+        token_cache.clear()
+
+    def login(self):
+        '''Log in and authenticate the client with the issued token'''
+        response = self.client.post(TOKEN_URL, self.payload)
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Token {response.data["token"]}'
+        )
+        return response
+
+    def test_login_issues_signed_token(self):
+        '''Test the issued credential is signed and carries its expiry'''
+        response = self.login()
+        token = Token.objects.get(user=self.user)
+
+        self.assertEqual(response.data['token'], sign_token(token))
+        self.assertEqual(response.data['expires'],
+                         token.created + timedelta(days=14))
+        self.assertEqual(self.client.get(ME_URL).status_code,
+                         status.HTTP_200_OK)
+
+    def test_tampered_token_rejected_without_queries(self):
+        '''Test a credential with a bad signature never reaches the DB'''
+        key = self.login().data['token']
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {key}x')
+        token_cache.clear()
+
+        with self.assertNumQueries(0):
+            response = self.client.get(ME_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_expired_signed_token_rejected_without_queries(self):
+        '''Test a signed credential past its expiry never reaches the DB'''
+        self.login()
+        later = timezone.now() + timedelta(days=15)
+
+        with patch('user.authentication.time.time',
+                   return_value=later.timestamp()):
+            with self.assertNumQueries(0):
+                response = self.client.get(ME_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_expired_bare_key_rejected(self):
+        '''Test a bare key is rejected once its row has expired'''
+        token = Token.objects.create(user=self.user)
+        expire(token)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+        response = self.client.get(ME_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(TOKEN_EXPIRY={'SIGNED_ONLY': True})
+    def test_bare_key_rejected_when_signed_only(self):
+        '''Test bare keys are refused when SIGNED_ONLY is set'''
+        token = Token.objects.create(user=self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+        response = self.client.get(ME_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_login_replaces_expired_token(self):
+        '''Test logging in with an expired token issues a new one'''
+        old = Token.objects.create(user=self.user)
+        expire(old)
+
+        self.login()
+
+        self.assertNotEqual(Token.objects.get(user=self.user).key, old.key)
+
+    def test_login_reuses_live_token(self):
+        '''Test logging in again returns the same, cached credential'''
+        first = self.login().data['token']
+        token_cache.clear()
+
+        self.assertEqual(self.login().data['token'], first)
+        with self.assertNumQueries(0):
+            self.client.get(ME_URL)
+
+    def test_refresh_rotates_token(self):
+        '''Test refreshing replaces the token and retires the old one'''
+        old = self.login().data['token']
+
+        response = self.client.post(REFRESH_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response.data['token'], old)
+        self.assertEqual(self.client.get(ME_URL).status_code,
+                         status.HTTP_401_UNAUTHORIZED)
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Token {response.data["token"]}'
+        )
+        self.assertEqual(self.client.get(ME_URL).status_code,
+                         status.HTTP_200_OK)
+
+    def test_revoke_takes_effect_immediately(self):
+        '''Test a revoked token stops authenticating on the next request'''
+        self.login()
+        self.client.get(ME_URL)
+
+        response = self.client.post(REVOKE_URL)
+
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(Token.objects.filter(user=self.user).exists())
+        self.assertEqual(self.client.get(ME_URL).status_code,
+                         status.HTTP_401_UNAUTHORIZED)
+
+    def test_purge_deletes_only_expired_tokens(self):
+        '''Test the purge command removes expired rows only'''
+        expired = Token.objects.create(user=self.user)
+        expire(expired)
+        other = get_user_model().objects.create_user(
+            email='other@company.com', password='test1234'
+        )
+        live = Token.objects.create(user=other)
+        out = StringIO()
+
+        call_command('purge_tokens', '--batch-size', '1', stdout=out)
+
+        self.assertEqual(list(Token.objects.values_list('key', flat=True)),
+                         [live.key])
+        self.assertIn('Purged 1 expired tokens', out.getvalue())
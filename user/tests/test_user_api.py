@@ -1,3 +1,5 @@
+from unittest import mock
+
 from django.test import TestCase
 from django.contrib.auth import get_user_model
 from django.urls import reverse
@@ -41,6 +43,22 @@ class PublicUserApiTests(TestCase):
         '''Verify that password is not returned with the response obj'''
         self.assertNotIn('password', response.data)
 
+    def test_create_user_notifies_validators(self):
+        '''Test a new user's password runs the validators' hooks'''
+        payload = {
+            'email': 'testuser@company.com',
+            'password': 'test1234',
+            'name': 'Test name'
+        }
+        with mock.patch(
+            'django.contrib.auth.base_user.password_validation.'
+            'password_changed'
+        ) as password_changed:
+            self.client.post(CREATE_USER_URL, payload)
+
+        user = get_user_model().objects.get(email=payload['email'])
+        password_changed.assert_called_once_with(payload['password'], user)
+
     def test_user_exists(self):
         '''Test while creating user, user already exists'''
         payload = {
@@ -175,3 +193,13 @@ class PrivateUserApiTests(TestCase):
         self.assertTrue(self.user.check_password(payload['password']))
 
         self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_update_password_notifies_validators(self):
+        '''Test changing the password runs the validators' hooks'''
+        with mock.patch(
+            'django.contrib.auth.base_user.password_validation.'
+            'password_changed'
+        ) as password_changed:
+            self.client.patch(ME_URL, {'password': 'newpass123'})
+
+        password_changed.assert_called_once_with('newpass123', self.user)
@@ -1,10 +1,33 @@
-from rest_framework import generics, authentication, permissions
+from django.db import transaction
+
+from rest_framework import generics, permissions, status
 from rest_framework.authtoken.views import ObtainAuthToken
+from rest_framework.authtoken.models import Token
+from rest_framework.response import Response
 from rest_framework.settings import api_settings
+from rest_framework.views import APIView
 
+from user.authentication import CachedTokenAuthentication, remember_token, \
+    sign_token, token_expired, token_expires
 from user.serializers import UserSerializer, AuthTokenSerializer
 
 
+def issue_token(user):
+    '''Return a fresh token for user, replacing any existing one'''
+    Token.objects.filter(user=user).delete()
+    token = Token.objects.create(user=user)
+    remember_token(token)
+    return token
+
+
+def token_response(token):
+    '''Return the signed credential for token and when it expires'''
+    return Response({
+        'token': sign_token(token),
+        'expires': token_expires(token),
+    })
+
+
 class CreateUserView(generics.CreateAPIView):
 
     '''Create a new user instance in the system'''
@@ -17,12 +40,58 @@ class CreateTokenView(ObtainAuthToken):
     serializer_class = AuthTokenSerializer
     renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
 
+    def post(self, request, *args, **kwargs):
+        '''Issue the user's token and prime the authentication cache'''
+        serializer = self.serializer_class(
+            data=request.data,
+            context={'request': request}
+        )
+        serializer.is_valid(raise_exception=True)
+        user = serializer.validated_data['user']
+
+        token = Token.objects.filter(user=user).first()
+        if token is None or token_expired(token):
+            with transaction.atomic():
+                token = issue_token(user)
+        else:
+            token.user = user
+            remember_token(token)
+
+        return token_response(token)
+
+
+class RefreshTokenView(APIView):
+
+    '''Rotate the authenticated user's token'''
+    authentication_classes = (CachedTokenAuthentication,)
+    permission_classes = (permissions.IsAuthenticated,)
+
+    def post(self, request, *args, **kwargs):
+        '''Replace the current token with a new one and return it'''
+        with transaction.atomic():
+            token = issue_token(request.user)
+
+        return token_response(token)
+
+
+class RevokeTokenView(APIView):
+
+    '''Revoke the authenticated user's token'''
+    authentication_classes = (CachedTokenAuthentication,)
+    permission_classes = (permissions.IsAuthenticated,)
+
+    def post(self, request, *args, **kwargs):
+        '''Delete the current token, evicting it from the caches'''
+        Token.objects.filter(key=request.auth.key).delete()
+
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
 
 class ManageUserView(generics.RetrieveUpdateAPIView):
 
     '''Manage the authenticated user'''
     serializer_class = UserSerializer
-    authentication_classes = (authentication.TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (permissions.IsAuthenticated,)
 
     def get_object(self):